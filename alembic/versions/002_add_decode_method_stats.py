@@ -0,0 +1,42 @@
+"""add decode_method_stats table
+
+Revision ID: 002_add_decode_method_stats
+Revises: 001_add_columns_per_page
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '002_add_decode_method_stats'
+down_revision: Union[str, None] = '001_add_columns_per_page'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Таблица счетчиков успешных методов декодирования по характеристикам изображения
+    op.create_table(
+        'decode_method_stats',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('features', sa.String(length=100), nullable=False),
+        sa.Column('method', sa.String(length=100), nullable=False),
+        sa.Column('success_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'idx_decode_method_stats_features_method',
+        'decode_method_stats',
+        ['features', 'method'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_decode_method_stats_features_method', table_name='decode_method_stats')
+    op.drop_table('decode_method_stats')
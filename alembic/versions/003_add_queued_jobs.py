@@ -0,0 +1,59 @@
+"""add queued_jobs table
+
+Revision ID: 003_add_queued_jobs
+Revises: 002_add_decode_method_stats
+Create Date: 2024-02-15 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "003_add_queued_jobs"
+down_revision: Union[str, None] = "002_add_decode_method_stats"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Очередь задач генерации PDF, переживающая перезапуск бота
+    op.create_table(
+        "queued_jobs",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("chat_id", sa.Integer(), nullable=False),
+        sa.Column("status_message_id", sa.Integer(), nullable=True),
+        sa.Column(
+            "processing_type",
+            # Тип processingtype уже создан для processing_history
+            postgresql.ENUM("FILE", "TEXT", "QR_DECODE", name="processingtype", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("source_name", sa.String(length=500), nullable=True),
+        sa.Column("file_id", sa.Integer(), nullable=True),
+        sa.Column("payload", sa.Text(), nullable=True),
+        sa.Column(
+            "status",
+            sa.Enum("QUEUED", "RUNNING", "DONE", "FAILED", name="jobstatus"),
+            nullable=False,
+        ),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.user_id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["file_id"], ["user_files.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_queued_jobs_user_id", "queued_jobs", ["user_id"])
+    op.create_index("idx_queued_jobs_status", "queued_jobs", ["status", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_queued_jobs_status", table_name="queued_jobs")
+    op.drop_index("ix_queued_jobs_user_id", table_name="queued_jobs")
+    op.drop_table("queued_jobs")
@@ -0,0 +1,30 @@
+"""add cost to queued_jobs
+
+Revision ID: 004_add_job_cost
+Revises: 003_add_queued_jobs
+Create Date: 2024-02-20 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "004_add_job_cost"
+down_revision: Union[str, None] = "003_add_queued_jobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Оценка стоимости задачи (количество QR-кодов) для выбора полосы очереди
+    op.add_column(
+        "queued_jobs",
+        sa.Column("cost", sa.Integer(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("queued_jobs", "cost")
@@ -0,0 +1,32 @@
+"""add cancelled status to processing history and queued jobs
+
+Revision ID: 005_add_cancelled_status
+Revises: 004_add_job_cost
+Create Date: 2024-02-25 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "005_add_cancelled_status"
+down_revision: Union[str, None] = "004_add_job_cost"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # В SQLite перечисления хранятся строками, новые значения добавляются только в PostgreSQL
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    # ALTER TYPE ... ADD VALUE нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE processingstatus ADD VALUE IF NOT EXISTS 'CANCELLED'")
+        op.execute("ALTER TYPE jobstatus ADD VALUE IF NOT EXISTS 'CANCELLED'")
+
+
+def downgrade() -> None:
+    # PostgreSQL не поддерживает удаление значений перечисления
+    pass
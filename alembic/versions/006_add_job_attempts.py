@@ -0,0 +1,30 @@
+"""add attempts to queued_jobs
+
+Revision ID: 006_add_job_attempts
+Revises: 005_add_cancelled_status
+Create Date: 2024-02-27 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "006_add_job_attempts"
+down_revision: Union[str, None] = "005_add_cancelled_status"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Количество запусков задачи: прерываемая перезапусками задача не повторяется бесконечно
+    op.add_column(
+        "queued_jobs",
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("queued_jobs", "attempts")
@@ -23,7 +23,6 @@ setup(
         "python-dotenv>=1.0.0",
         "sqlalchemy>=2.0.23",
         "alembic>=1.13.0",
-        "pandas>=2.1.4",
         "openpyxl>=3.1.2",
         "xlrd>=2.0.1",
         "qrcode[pil]>=7.4.2",
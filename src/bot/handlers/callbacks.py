@@ -6,9 +6,16 @@ from telegram import Update
 from telegram.ext import ContextTypes
 
 from ...database.database import get_db
-from ...database.repositories import UserSettingsRepository
+from ...database.models import ProcessingStatus
+from ...database.repositories import (
+    JobRepository,
+    ProcessingHistoryRepository,
+    UserSettingsRepository,
+)
 from ...core.config import get_settings
 from ...core.logging_config import get_logger
+from ...services.job_scheduler import get_scheduler
+from ..keyboards.jobs import CANCEL_JOB_PREFIX
 from ..keyboards.settings import create_settings_keyboard, create_param_keyboard
 from .base import get_user_id, get_user_settings_dict
 
@@ -173,3 +180,48 @@ async def handle_settings_callback(update: Update, context: ContextTypes.DEFAULT
             await query.answer("❌ Произошла ошибка. Попробуйте позже.", show_alert=True)
         except Exception:
             pass
+
+
+async def handle_cancel_job_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Обработчик кнопки отмены задачи в очереди."""
+    query = update.callback_query
+    if not query:
+        return
+
+    user_id = get_user_id(update)
+    job_id = int(query.data[len(CANCEL_JOB_PREFIX) :])
+    logger.info(f"Пользователь {user_id} отменяет задачу {job_id}")
+
+    try:
+        db = next(get_db())
+        try:
+            job = JobRepository.get_by_id(db, job_id)
+            if job is None or job.user_id != user_id:
+                await query.answer("❌ Задача не найдена", show_alert=True)
+                return
+
+            if not await get_scheduler().cancel(job_id):
+                await query.answer("Задача уже завершена")
+                return
+
+            # Сохраняем отмену в историю
+            ProcessingHistoryRepository.create(
+                db,
+                user_id,
+                job.processing_type,
+                job.source_name,
+                0,
+                ProcessingStatus.CANCELLED,
+            )
+        finally:
+            db.close()
+
+        await query.answer("🚫 Задача отменена")
+        await query.edit_message_text("🚫 Обработка отменена")
+
+    except Exception as e:
+        logger.error(f"Ошибка в handle_cancel_job_callback: {e}", exc_info=True)
+        try:
+            await query.answer("❌ Произошла ошибка. Попробуйте позже.", show_alert=True)
+        except Exception:
+            pass
@@ -11,11 +11,16 @@ from ...database.repositories import (
     UserRepository,
     UserSettingsRepository,
     ProcessingHistoryRepository,
+    DecodeStatsRepository,
 )
 from ...core.config import get_settings
 from ...core.logging_config import get_logger
 from ...core.exceptions import QRCodeBotException
+from ...services.job_executor import get_executor
+from ...services.job_scheduler import LANE_BULK, LANE_INTERACTIVE, get_scheduler
+from ...services.decode_stats import get_decode_stats
 from ..keyboards.settings import create_settings_keyboard
+from ..update_processor import PerUserUpdateProcessor
 from .base import get_user_id, ensure_user_registered, get_user_settings_dict
 
 logger = get_logger(__name__)
@@ -88,6 +93,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             "   • Одна строка = один QR-код\n"
             "   • Несколько строк (через Enter) = несколько QR-кодов\n"
             "   • Используйте /text для явного указания режима\n\n"
+            "3️⃣ Для распознавания QR-кодов отправьте фото, альбом,\n"
+            "   изображение файлом или PDF\n\n"
             "⚙️ Настройки PDF:\n"
             "/settings - открыть меню настроек\n"
             "/width <значение> - ширина страницы в мм (по умолчанию: 75)\n"
@@ -98,6 +105,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             "📊 Дополнительно:\n"
             "/history - просмотреть историю обработки\n"
             "/stats - статистика (только для администратора)\n"
+            "/decode_stats - статистика декодирования (только для администратора)\n"
         )
         await update.message.reply_text(help_text)
     except Exception as e:
@@ -175,7 +183,7 @@ async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             history_text = "📋 История обработки (последние 10 записей):\n\n"
 
             for i, record in enumerate(history_list, 1):
-                status_emoji = "✅" if record.status.value == "success" else "❌"
+                status_emoji = {"success": "✅", "cancelled": "🚫"}.get(record.status.value, "❌")
                 type_emoji = "📄" if record.processing_type.value == "file" else "📝"
 
                 history_text += (
@@ -210,6 +218,8 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
             # Получаем статистику
             stats = ProcessingHistoryRepository.get_statistics(db)
             user_count = UserRepository.count(db)
+            executor_metrics = get_executor().get_metrics()
+            scheduler_metrics = get_scheduler().get_metrics()
 
             stats_text = (
                 "📊 Статистика бота:\n\n"
@@ -219,8 +229,34 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
                 f"  ❌ Ошибок: {stats['error_count']}\n"
                 f"📁 Обработок файлов: {stats['file_processing_count']}\n"
                 f"📝 Обработок текста: {stats['text_processing_count']}\n"
-                f"🔲 Всего QR-кодов создано: {stats['total_qr_codes']}"
+                f"🔲 Всего QR-кодов создано: {stats['total_qr_codes']}\n\n"
+                f"⚙️ Пул воркеров ({executor_metrics['pool_type']}, "
+                f"{executor_metrics['max_workers']} шт.):\n"
+                f"  ⏳ В очереди: {executor_metrics['queue_depth']}\n"
+                f"  🔄 Выполняется: {executor_metrics['running']}\n"
+                f"  ✅ Завершено: {executor_metrics['completed']}\n"
+                f"  ❌ Ошибок: {executor_metrics['failed']}\n"
+                f"  🚫 Отменено: {executor_metrics['cancelled']}\n\n"
+                f"📋 Очередь задач (до {scheduler_metrics['max_concurrent']} одновременно, "
+                f"{scheduler_metrics['per_user_concurrent']} на пользователя):\n"
+                f"  ⏳ В очереди: {scheduler_metrics['queued']}\n"
+                f"  🔄 Выполняется: {scheduler_metrics['running']}\n"
+                f"  👥 Пользователей: {scheduler_metrics['users']}"
             )
+            lane_titles = {LANE_INTERACTIVE: "⚡ Легкие задачи", LANE_BULK: "📦 Большие задачи"}
+            for lane_name, lane in scheduler_metrics["lanes"].items():
+                stats_text += (
+                    f"\n  {lane_titles.get(lane_name, lane_name)} "
+                    f"(до {lane['max_concurrent']}): в очереди {lane['queued']}, "
+                    f"выполняется {lane['running']}"
+                )
+
+            processor = context.application.update_processor
+            if isinstance(processor, PerUserUpdateProcessor):
+                stats_text += (
+                    f"\n\n📨 Обновления (до {processor.max_concurrent_updates} пользователей "
+                    f"одновременно): в очереди {processor.pending_updates}"
+                )
 
             await update.message.reply_text(stats_text)
         finally:
@@ -230,6 +266,52 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         await update.message.reply_text("❌ Произошла ошибка при получении статистики.")
 
 
+async def decode_stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Обработчик команды /decode_stats (только для администратора)."""
+    user_id = get_user_id(update)
+    logger.info(f"Команда /decode_stats от пользователя {user_id}")
+
+    try:
+        config = get_settings()
+
+        # Проверяем, является ли пользователь администратором
+        if not config.admin_id or user_id != config.admin_id:
+            await update.message.reply_text("❌ Эта команда доступна только администратору.")
+            return
+
+        db = next(get_db())
+        try:
+            totals = DecodeStatsRepository.get_method_totals(db)
+            if not totals:
+                await update.message.reply_text("📊 Статистика декодирования пока пуста.")
+                return
+
+            stats_text = "🔍 Успешные методы декодирования:\n\n"
+            for method, count in totals:
+                stats_text += f"  • {method}: {count}\n"
+
+            stats_text += "\n🖼 Лучший метод по типу изображения:\n"
+            for features, methods in sorted(get_decode_stats().get_rankings(db).items()):
+                stats_text += f"  • {features}: {methods[0]}\n"
+
+            average_passes = get_decode_stats().get_average_passes()
+            if average_passes:
+                stats_text += f"\n🔁 Среднее число попыток с запуска: {average_passes:.2f}\n"
+
+            engine_stats = get_decode_stats().get_engine_stats()
+            if engine_stats:
+                stats_text += "\n⚙️ Движки распознавания с запуска:\n"
+                for engine, (wins, latency) in sorted(engine_stats.items()):
+                    stats_text += f"  • {engine}: побед {wins}, среднее время {latency:.3f} с\n"
+
+            await update.message.reply_text(stats_text)
+        finally:
+            db.close()
+    except Exception as e:
+        logger.error(f"Ошибка в команде /decode_stats: {e}", exc_info=True)
+        await update.message.reply_text("❌ Произошла ошибка при получении статистики.")
+
+
 async def set_width_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обработчик команды /width."""
     user_id = get_user_id(update)
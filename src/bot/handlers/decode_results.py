@@ -0,0 +1,52 @@
+"""
+Отправка результатов распознавания QR-кодов нескольких изображений или страниц.
+
+Ответ отправляется через Bot по chat_id: распознавание PDF выполняется
+задачей из очереди, когда исходного обновления может уже не быть.
+"""
+
+import io
+from typing import List, Sequence, Tuple
+
+from telegram import Bot, InputFile
+
+from ...core.config import get_settings
+from ...services.file_service import rows_to_csv
+
+
+async def send_decoded_rows(
+    bot: Bot,
+    chat_id: int,
+    header: Sequence[str],
+    rows: List[Tuple[int, int, str]],
+    summary: str,
+) -> None:
+    """
+    Отправляет QR-коды нескольких изображений или страниц одним ответом.
+
+    Args:
+        bot: Бот
+        chat_id: ID чата
+        header: Заголовки столбцов CSV (источник, номер кода, данные)
+        rows: Строки (номер источника, номер кода, данные)
+        summary: Итоговая строка ответа
+    """
+    if len(rows) > get_settings().decode_csv_threshold:
+        # Много кодов - отправляем CSV-файл
+        csv_data = rows_to_csv(header, rows)
+        await bot.send_document(
+            chat_id,
+            document=InputFile(io.BytesIO(csv_data), filename="qr_codes.csv"),
+            caption=summary,
+        )
+        return
+
+    result_text = f"{summary}\n\n"
+    for source_index, code_index, data in rows:
+        preview = data[:100] + "..." if len(data) > 100 else data
+        result_text += f"{source_index}.{code_index}. `{preview}`\n\n"
+
+    if len(result_text) > 4000:
+        result_text = result_text[:4000] + "..."
+
+    await bot.send_message(chat_id, result_text, parse_mode="Markdown")
@@ -0,0 +1,317 @@
+"""
+Выполнение задач из очереди: генерация PDF и распознавание QR-кодов в PDF.
+
+Задача может быть запущена после перезапуска бота, когда исходного
+обновления уже нет, поэтому ответы отправляются через Bot по chat_id и
+сообщению о ходе обработки, сохраненным в задаче.
+"""
+
+import functools
+import io
+from typing import Optional
+
+from telegram import Bot, InputFile
+from sqlalchemy.orm import Session
+from telegram.error import BadRequest
+
+from ...core.exceptions import FileProcessingError
+from ...core.logging_config import get_logger
+from ...database.database import get_db
+from ...database.models import ProcessingStatus, ProcessingType, QueuedJob
+from ...database.repositories import (
+    JobRepository,
+    ProcessingHistoryRepository,
+    UserFileRepository,
+)
+from ...services.decode_stats import get_decode_stats
+from ...services.file_service import open_result_file, temporary_file_path
+from ...services.job_executor import run_job
+from ...services.pdf_service import export_excel_qr_pdf, export_qr_pdf
+from ...services.text_service import process_text_message
+from ...utils.cancellation import CancelToken
+from ...utils.progress import ProgressFile
+from ..keyboards.jobs import create_cancel_keyboard
+from .base import get_user_settings_dict
+from .decode_results import send_decoded_rows
+from .progress import ThrottledMessageEditor, format_progress, run_with_progress
+
+logger = get_logger(__name__)
+
+
+async def _set_status_text(
+    bot: Bot, db: Session, job: QueuedJob, text: str, cancellable: bool = True
+) -> None:
+    """
+    Обновляет сообщение о ходе обработки задачи (или отправляет новое).
+
+    ID нового сообщения сохраняется в задаче, чтобы после перезапуска бота
+    обновлялось оно, а не отправлялось еще одно.
+    """
+    # Пока задача выполняется, под сообщением остается кнопка отмены
+    reply_markup = create_cancel_keyboard(job.id) if cancellable else None
+    if job.status_message_id:
+        try:
+            await bot.edit_message_text(
+                text,
+                chat_id=job.chat_id,
+                message_id=job.status_message_id,
+                reply_markup=reply_markup,
+            )
+            return
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                return
+            logger.debug(f"Не удалось обновить сообщение задачи {job.id}: {e}")
+        except Exception as e:
+            logger.debug(f"Не удалось обновить сообщение задачи {job.id}: {e}")
+    message = await bot.send_message(job.chat_id, text, reply_markup=reply_markup)
+    JobRepository.set_status_message(db, job.id, message.message_id)
+
+
+async def _delete_status_message(bot: Bot, job: QueuedJob) -> None:
+    """Удаляет сообщение о ходе обработки задачи."""
+    if job.status_message_id:
+        try:
+            await bot.delete_message(job.chat_id, job.status_message_id)
+        except Exception as e:
+            logger.debug(f"Не удалось удалить сообщение задачи {job.id}: {e}")
+
+
+async def notify_job_position(bot: Bot, job_id: int, position: int) -> None:
+    """
+    Сообщает пользователю позицию задачи в очереди.
+
+    Args:
+        bot: Бот
+        job_id: ID задачи
+        position: Позиция в очереди
+    """
+    db = next(get_db())
+    try:
+        job = JobRepository.get_by_id(db, job_id)
+        if job is not None:
+            await _set_status_text(bot, db, job, f"⏳ Задача в очереди, позиция: {position}")
+    finally:
+        db.close()
+
+
+async def _decode_pdf_job(
+    bot: Bot, db: Session, job: QueuedJob, status: ThrottledMessageEditor
+) -> bool:
+    """
+    Распознает QR-коды на страницах PDF и отправляет результат.
+
+    Весь документ распознается одним вызовом в пуле воркеров: страницы
+    обрабатываются по очереди, поэтому PDF занимает один слот, а не все.
+
+    Args:
+        bot: Бот
+        db: Сессия БД
+        job: Задача
+        status: Сообщение о ходе обработки
+
+    Returns:
+        bool: True, если результат отправлен (иначе сообщение задачи уже обновлено)
+    """
+    # Сервис распознавания загружает pyzbar, поэтому импортируется только здесь
+    from ...services.pdf_decode_service import decode_pdf_document
+
+    user_file = UserFileRepository.get_by_id(db, job.file_id)
+    if user_file is None:
+        raise FileProcessingError("Файл задачи не найден")
+
+    decode_stats = get_decode_stats()
+    rankings = decode_stats.get_rankings(db)
+    await status.update("🔍 Декодирование QR-кодов...")
+    # При отмене задачи токен освобождается, и воркер не переходит к следующей странице
+    with temporary_file_path(suffix=".pdf") as pdf_path, CancelToken() as cancel_token:
+        pdf_path.write_bytes(user_file.file_data)
+        page_count, outcomes = await run_job(
+            decode_pdf_document, str(pdf_path), rankings=rankings, cancel_token=cancel_token
+        )
+
+    rows = []
+    failed = []
+    history = []
+    for page, outcome in enumerate(outcomes, 1):
+        source_name = f"{job.source_name} (стр. {page})"
+        if outcome.result is None:
+            failed.append(page)
+            history.append((source_name, 0, ProcessingStatus.ERROR, outcome.error))
+            continue
+
+        result = outcome.result
+        decode_stats.record(
+            db, result.features, result.method, result.passes, result.engine, result.latencies
+        )
+        rows.extend((page, code_index, data) for code_index, data in enumerate(result.data, 1))
+        history.append((source_name, len(result.data), ProcessingStatus.SUCCESS, None))
+
+    # Сохраняем историю страниц одной транзакцией
+    ProcessingHistoryRepository.create_many(db, job.user_id, ProcessingType.QR_DECODE, history)
+
+    if not rows:
+        status.close()
+        await _set_status_text(
+            bot, db, job, "❌ QR-коды не найдены ни на одной странице PDF.", cancellable=False
+        )
+        return False
+
+    summary = (
+        f"✅ Найдено {len(rows)} QR-код(ов) на {len(outcomes) - len(failed)} "
+        f"из {len(outcomes)} страниц"
+    )
+    if len(outcomes) < page_count:
+        summary += f" (всего в документе: {page_count})"
+    if failed:
+        summary += f"\nНе распознаны страницы: {', '.join(map(str, failed))}"
+
+    await send_decoded_rows(bot, job.chat_id, ("page", "code", "data"), rows, summary)
+    logger.info(
+        f"PDF {job.source_name} распознан для пользователя {job.user_id}: {len(rows)} код(ов), "
+        f"не распознано страниц: {len(failed)}"
+    )
+    return True
+
+
+async def run_queued_job(bot: Bot, job_id: int) -> None:
+    """
+    Выполняет задачу из очереди: генерацию PDF из Excel файла или текста либо
+    распознавание QR-кодов в PDF.
+
+    Args:
+        bot: Бот
+        job_id: ID задачи
+
+    Raises:
+        Exception: если задача завершилась ошибкой (пользователь уже уведомлен)
+    """
+    db = next(get_db())
+    job: Optional[QueuedJob] = None
+    status: Optional[ThrottledMessageEditor] = None
+    try:
+        job = JobRepository.get_by_id(db, job_id)
+        if job is None:
+            logger.warning(f"Задача {job_id} не найдена")
+            return
+
+        # Промежуточные статусы и ход генерации обновляются не чаще заданного интервала
+        status = ThrottledMessageEditor(functools.partial(_set_status_text, bot, db, job))
+
+        if job.processing_type == ProcessingType.QR_DECODE:
+            if await _decode_pdf_job(bot, db, job, status):
+                status.close()
+                await _delete_status_message(bot, job)
+            return
+
+        user_id = job.user_id
+        source_name = job.source_name
+        # Получаем настройки пользователя
+        settings = get_user_settings_dict(user_id, db)
+
+        if job.processing_type == ProcessingType.FILE:
+            user_file = UserFileRepository.get_by_id(db, job.file_id)
+            if user_file is None:
+                raise FileProcessingError("Файл задачи не найден")
+            await status.update("🔲 Генерация QR-кодов из Excel...")
+        else:
+            data, is_single_line = process_text_message(job.payload)
+            source_name = "text (одна строка)" if is_single_line else f"text ({len(data)} строк)"
+            await status.update(f"🔲 Генерация QR-кодов для {len(data)} записей...")
+
+        # При отмене задачи токен освобождается, и воркер прекращает генерацию;
+        # ход генерации воркер пишет в progress_file
+        with CancelToken() as cancel_token, ProgressFile() as progress_file:
+            with temporary_file_path(suffix=".pdf") as pdf_path:
+                # Большой PDF воркер записывает во временный файл, а не возвращает в памяти
+                layout = dict(
+                    width=settings["width"],
+                    height=settings["height"],
+                    rows_per_page=settings["rows_per_page"],
+                    columns_per_page=settings["columns_per_page"],
+                    cancel_token=cancel_token,
+                    progress=progress_file,
+                )
+                if job.processing_type == ProcessingType.FILE:
+                    # Excel читается потоково в том же вызове воркера, что и генерация PDF
+                    export = run_job(
+                        export_excel_qr_pdf,
+                        io.BytesIO(user_file.file_data),
+                        str(pdf_path),
+                        **layout,
+                    )
+                else:
+                    export = run_job(export_qr_pdf, data, str(pdf_path), **layout)
+                result = await run_with_progress(
+                    export, progress_file, lambda info: status.update(format_progress(info))
+                )
+
+                if job.processing_type == ProcessingType.FILE:
+                    item_count, pdf_bytes = result
+                    caption = f"✅ Создано {item_count} QR-кодов"
+                else:
+                    item_count, pdf_bytes = len(data), result
+                    caption = f"✅ Создано {item_count} QR-код{'ов' if item_count > 1 else ''}"
+
+                if not item_count:
+                    status.close()
+                    await _set_status_text(
+                        bot, db, job, "❌ Не найдено данных в первой колонке!", cancellable=False
+                    )
+                    ProcessingHistoryRepository.create(
+                        db,
+                        user_id,
+                        ProcessingType.FILE,
+                        source_name,
+                        0,
+                        ProcessingStatus.ERROR,
+                        "Не найдено данных",
+                    )
+                    return
+
+                # Сохраняем в историю
+                ProcessingHistoryRepository.create(
+                    db,
+                    user_id,
+                    job.processing_type,
+                    source_name,
+                    item_count,
+                    ProcessingStatus.SUCCESS,
+                )
+
+                # Отправляем PDF (файл читается потоком при загрузке)
+                await status.update("📤 Отправка файла...")
+                with open_result_file(pdf_bytes, pdf_path) as pdf_file:
+                    await bot.send_document(
+                        job.chat_id,
+                        document=InputFile(
+                            pdf_file, filename="qr_codes.pdf", read_file_handle=False
+                        ),
+                        caption=caption,
+                    )
+
+        status.close()
+        await _delete_status_message(bot, job)
+        logger.info(f"PDF файл задачи {job_id} отправлен пользователю {user_id}")
+
+    except Exception as e:
+        logger.error(f"Ошибка выполнения задачи {job_id}: {e}", exc_info=True)
+        if job is not None:
+            status.close()
+            await _set_status_text(
+                bot, db, job, f"❌ Ошибка обработки: {str(e)}", cancellable=False
+            )
+            ProcessingHistoryRepository.create(
+                db,
+                job.user_id,
+                job.processing_type,
+                job.source_name,
+                0,
+                ProcessingStatus.ERROR,
+                str(e),
+            )
+        raise
+    finally:
+        if status is not None:
+            status.close()
+        db.close()
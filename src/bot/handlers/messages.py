@@ -2,30 +2,48 @@
 Обработчики текстовых сообщений и файлов.
 """
 
+import asyncio
 import io
-from telegram import Update, ReplyKeyboardRemove
+from typing import Dict, List, Optional, Sequence, Tuple
+from telegram import Message, PhotoSize, Update, ReplyKeyboardRemove
 from telegram.ext import ContextTypes
 
 from ...database.database import get_db
-from ...database.repositories import UserRepository, UserFileRepository, ProcessingHistoryRepository
+from ...database.repositories import (
+    JobRepository,
+    UserRepository,
+    UserFileRepository,
+    ProcessingHistoryRepository,
+)
 from ...database.models import ProcessingType, ProcessingStatus
-from ...services.excel_service import read_data_from_excel
 from ...services.text_service import process_text_message
-from ...services.pdf_service import create_qr_pdf
-from ...services.qr_decode_service import decode_qr_from_image
-from ...services.file_service import validate_file, read_file_to_bytesio, get_safe_filename
+from ...services.excel_service import estimate_excel_rows
+from ...services.qr_decode_service import DecodeResult, decode_qr_image
+from ...services.decode_stats import DecodeStats, get_decode_stats
+from ...services.decode_cache import DecodeCache, content_hash, get_decode_cache
+from ...services.file_service import (
+    validate_file,
+    read_file_to_bytesio,
+    get_safe_filename,
+)
+from ...services.job_executor import run_job
+from ...services.job_scheduler import get_scheduler
 from ...core.exceptions import (
     FileProcessingError,
     TextProcessingError,
     ValidationError,
     QRCodeBotException,
     RateLimitError,
+    JobQueueFullError,
     QRCodeDecodeError,
 )
 from ...core.logging_config import get_logger
 from ...core.config import get_settings
 from ..middleware.rate_limit import check_rate_limit
-from .base import get_user_id, ensure_user_registered, get_user_settings_dict
+from ...utils.helpers import IMAGE_EXTENSIONS, is_image_file, is_pdf_file, select_photo_sizes
+from ..keyboards.jobs import create_cancel_keyboard
+from .base import get_user_id, ensure_user_registered
+from .decode_results import send_decoded_rows
 
 logger = get_logger(__name__)
 
@@ -58,8 +76,156 @@ async def handle_contact(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
 
 
+async def _download_file(context: ContextTypes.DEFAULT_TYPE, file_id: str) -> bytes:
+    """Скачивает файл из Telegram в память."""
+    file = await context.bot.get_file(file_id)
+    buffer = io.BytesIO()
+    await file.download_to_memory(buffer)
+    return buffer.getvalue()
+
+
+async def _send_decoded_data(message: Message, decoded_data_list: List[str]) -> None:
+    """Отправляет данные QR-кодов, найденных на одном изображении."""
+    if len(decoded_data_list) == 1:
+        # Один QR-код - отправляем данные
+        decoded_data = decoded_data_list[0]
+        # Ограничиваем длину сообщения
+        if len(decoded_data) > 4000:
+            await message.reply_text(
+                f"📄 Данные из QR-кода (первые 4000 символов):\n\n{decoded_data[:4000]}...\n\n"
+                f"Полная длина: {len(decoded_data)} символов"
+            )
+        else:
+            await message.reply_text(
+                f"📄 Данные из QR-кода:\n\n`{decoded_data}`", parse_mode="Markdown"
+            )
+    else:
+        # Несколько QR-кодов
+        result_text = f"📄 Найдено {len(decoded_data_list)} QR-код(ов):\n\n"
+        for i, decoded_data in enumerate(decoded_data_list, 1):
+            preview = decoded_data[:100] + "..." if len(decoded_data) > 100 else decoded_data
+            result_text += f"{i}. `{preview}`\n\n"
+
+        if len(result_text) > 4000:
+            result_text = result_text[:4000] + "..."
+
+        await message.reply_text(result_text, parse_mode="Markdown")
+
+
+async def _submit_pdf_decode(
+    update: Update, file_data: bytes, safe_filename: str, processing_msg: Message
+) -> None:
+    """
+    Ставит распознавание QR-кодов в PDF в очередь задач.
+
+    Документ - одна легкая задача: воркер распознает страницы по очереди,
+    поэтому большой PDF не занимает все слоты пула, а пользователь получает
+    позицию в очереди и кнопку отмены.
+
+    Args:
+        update: Обновление с документом
+        file_data: Содержимое PDF
+        safe_filename: Безопасное имя файла
+        processing_msg: Сообщение о ходе обработки
+    """
+    user_id = get_user_id(update)
+    scheduler = get_scheduler()
+    db = next(get_db())
+    try:
+        ensure_user_registered(update, db)
+
+        # Задача ссылается на сохраненный файл, чтобы пережить перезапуск бота
+        user_file = UserFileRepository.create(db, user_id, safe_filename, file_data)
+        job = JobRepository.create(
+            db,
+            user_id,
+            update.effective_chat.id,
+            ProcessingType.QR_DECODE,
+            safe_filename,
+            status_message_id=processing_msg.message_id,
+            file_id=user_file.id,
+        )
+    finally:
+        db.close()
+
+    position = await scheduler.submit(job.id, user_id)
+    if position:
+        await processing_msg.edit_text(
+            f"⏳ Файл в очереди, позиция: {position}",
+            reply_markup=create_cancel_keyboard(job.id),
+        )
+
+
+async def _decode_document(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    file_name: str,
+    processing_msg: Message,
+) -> None:
+    """
+    Распознает QR-коды из изображения, отправленного файлом, или ставит
+    распознавание PDF в очередь задач.
+
+    Файл не проходит сжатие Telegram, поэтому распознается полное разрешение.
+
+    Args:
+        update: Обновление с документом
+        context: Контекст обработчика
+        file_name: Имя файла
+        processing_msg: Сообщение о ходе обработки
+
+    Raises:
+        QRCodeDecodeError: если на изображении не найдены QR-коды
+    """
+    user_id = get_user_id(update)
+    file_data = await _download_file(context, update.message.document.file_id)
+    validate_file(file_name, file_data, IMAGE_EXTENSIONS + [".pdf"])
+    safe_filename = get_safe_filename(file_name)
+    if is_pdf_file(file_name):
+        await _submit_pdf_decode(update, file_data, safe_filename, processing_msg)
+        return
+
+    decode_stats = get_decode_stats()
+    db = next(get_db())
+    try:
+        rankings = decode_stats.get_rankings(db)
+    finally:
+        db.close()
+
+    await processing_msg.edit_text("🔍 Декодирование QR-кодов...")
+    decode_result = await run_job(decode_qr_image, file_data, rankings)
+    db = next(get_db())
+    try:
+        ensure_user_registered(update, db)
+        decode_stats.record(
+            db,
+            decode_result.features,
+            decode_result.method,
+            decode_result.passes,
+            decode_result.engine,
+            decode_result.latencies,
+        )
+        ProcessingHistoryRepository.create(
+            db,
+            user_id,
+            ProcessingType.QR_DECODE,
+            safe_filename,
+            len(decode_result.data),
+            ProcessingStatus.SUCCESS,
+        )
+    finally:
+        db.close()
+
+    await _send_decoded_data(update.message, decode_result.data)
+    await processing_msg.delete()
+    logger.info(
+        f"QR-коды из файла {safe_filename} декодированы для пользователя {user_id}: "
+        f"{len(decode_result.data)} код(ов)"
+    )
+
+
 async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Обработчик загрузки документов (Excel файлов)."""
+    """Обработчик загрузки документов (Excel файлов, изображений и PDF)."""
     user_id = get_user_id(update)
     document = update.message.document
     processing_msg = None
@@ -75,11 +241,26 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         file_name = document.file_name or "unknown"
         logger.info(f"Получен файл от пользователя {user_id}: {file_name}")
 
+        # Изображения и PDF отправляются на распознавание QR-кодов
+        if is_image_file(file_name) or is_pdf_file(file_name):
+            if is_pdf_file(file_name):
+                # Проверяем лимит задач пользователя до скачивания файла
+                get_scheduler().check_capacity(user_id)
+            processing_msg = await update.message.reply_text("⏳ Обработка файла...")
+            await _decode_document(update, context, file_name, processing_msg)
+            return
+
         # Валидация расширения
         if not file_name.lower().endswith((".xlsx", ".xls")):
-            await update.message.reply_text("❌ Поддерживаются только Excel файлы (.xlsx, .xls)")
+            await update.message.reply_text(
+                "❌ Поддерживаются Excel файлы (.xlsx, .xls), изображения и PDF"
+            )
             return
 
+        # Проверяем лимит задач пользователя до скачивания файла
+        scheduler = get_scheduler()
+        scheduler.check_capacity(user_id)
+
         # Отправляем сообщение о начале обработки
         processing_msg = await update.message.reply_text("⏳ Обработка файла...")
 
@@ -92,6 +273,9 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         # Валидация файла
         validate_file(file_name, file_data)
 
+        # Оцениваем размер задачи по числу строк для выбора полосы очереди
+        row_count = await run_job(estimate_excel_rows, io.BytesIO(file_data))
+
         # Регистрируем пользователя
         db = next(get_db())
         try:
@@ -99,61 +283,49 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
             # Сохраняем файл в БД
             safe_filename = get_safe_filename(file_name)
-            UserFileRepository.create(db, user_id, safe_filename, file_data)
-
-            # Читаем данные из Excel
-            await processing_msg.edit_text("📖 Чтение данных из Excel...")
-            file_bytes.seek(0)
-            data = read_data_from_excel(file_bytes)
-
-            if not data:
-                await processing_msg.edit_text("❌ Не найдено данных в первой колонке!")
-                ProcessingHistoryRepository.create(
-                    db,
-                    user_id,
-                    ProcessingType.FILE,
-                    safe_filename,
-                    0,
-                    ProcessingStatus.ERROR,
-                    "Не найдено данных",
-                )
-                return
-
-            logger.info(f"Прочитано {len(data)} записей из файла пользователя {user_id}")
-
-            # Получаем настройки пользователя
-            settings = get_user_settings_dict(user_id, db)
-
-            # Создаем PDF
-            await processing_msg.edit_text(f"🔲 Генерация QR-кодов для {len(data)} записей...")
-            pdf_buffer = create_qr_pdf(
-                data,
-                width=settings["width"],
-                height=settings["height"],
-                rows_per_page=settings["rows_per_page"],
-                columns_per_page=settings["columns_per_page"],
-            )
-
-            # Сохраняем в историю
-            ProcessingHistoryRepository.create(
-                db, user_id, ProcessingType.FILE, safe_filename, len(data), ProcessingStatus.SUCCESS
+            user_file = UserFileRepository.create(db, user_id, safe_filename, file_data)
+
+            # Ставим генерацию PDF в очередь: задача ссылается на сохраненный файл
+            job = JobRepository.create(
+                db,
+                user_id,
+                update.effective_chat.id,
+                ProcessingType.FILE,
+                safe_filename,
+                status_message_id=processing_msg.message_id,
+                file_id=user_file.id,
+                cost=row_count,
             )
+        finally:
+            db.close()
 
-            # Отправляем PDF
-            await processing_msg.edit_text("📤 Отправка файла...")
-            await update.message.reply_document(
-                document=pdf_buffer,
-                filename="qr_codes.pdf",
-                caption=f"✅ Создано {len(data)} QR-кодов",
+        position = await scheduler.submit(job.id, user_id, row_count)
+        if position:
+            await processing_msg.edit_text(
+                f"⏳ Файл в очереди, позиция: {position}",
+                reply_markup=create_cancel_keyboard(job.id),
             )
 
-            await processing_msg.delete()
-            logger.info(f"PDF файл успешно отправлен пользователю {user_id}")
+    except QRCodeDecodeError as e:
+        logger.error(f"Ошибка декодирования QR-кода из файла: {e}", exc_info=True)
+        await processing_msg.edit_text(f"❌ {str(e)}")
 
+        # Сохраняем ошибку в историю
+        db = next(get_db())
+        try:
+            ensure_user_registered(update, db)
+            ProcessingHistoryRepository.create(
+                db,
+                user_id,
+                ProcessingType.QR_DECODE,
+                get_safe_filename(document.file_name or "unknown"),
+                0,
+                ProcessingStatus.ERROR,
+                str(e),
+            )
         finally:
             db.close()
-
-    except RateLimitError as e:
+    except (RateLimitError, JobQueueFullError) as e:
         if processing_msg:
             await processing_msg.edit_text(f"❌ {str(e)}")
         else:
@@ -205,50 +377,39 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
         # Отправляем сообщение о начале обработки
         processing_msg = await update.message.reply_text("⏳ Обработка текста...")
 
-        # Обрабатываем текст
-        data, is_single_line = process_text_message(text)
+        # Проверяем текст (задача обработает его заново из БД)
+        data, _ = process_text_message(text)
 
-        # Регистрируем пользователя
+        # Проверяем лимит задач пользователя
+        scheduler = get_scheduler()
+        scheduler.check_capacity(user_id)
+
+        # Регистрируем пользователя и ставим генерацию PDF в очередь
         db = next(get_db())
         try:
             ensure_user_registered(update, db)
-
-            # Получаем настройки пользователя
-            settings = get_user_settings_dict(user_id, db)
-
-            # Создаем PDF
-            await processing_msg.edit_text(
-                f"🔲 Генерация QR-кодов для {len(data)} {'строки' if len(data) == 1 else 'строк'}..."
-            )
-            pdf_buffer = create_qr_pdf(
-                data,
-                width=settings["width"],
-                height=settings["height"],
-                rows_per_page=settings["rows_per_page"],
-                columns_per_page=settings["columns_per_page"],
+            job = JobRepository.create(
+                db,
+                user_id,
+                update.effective_chat.id,
+                ProcessingType.TEXT,
+                "text",
+                status_message_id=processing_msg.message_id,
+                payload=text,
+                cost=len(data),
             )
-
-            # Сохраняем в историю
-            source_name = "text (одна строка)" if is_single_line else f"text ({len(data)} строк)"
-            ProcessingHistoryRepository.create(
-                db, user_id, ProcessingType.TEXT, source_name, len(data), ProcessingStatus.SUCCESS
-            )
-
-            # Отправляем PDF
-            await processing_msg.edit_text("📤 Отправка файла...")
-            await update.message.reply_document(
-                document=pdf_buffer,
-                filename="qr_codes.pdf",
-                caption=f"✅ Создано {len(data)} QR-код{'ов' if len(data) > 1 else ''}",
-            )
-
-            await processing_msg.delete()
-            logger.info(f"PDF файл успешно отправлен пользователю {user_id}")
-
         finally:
             db.close()
 
-    except RateLimitError as e:
+        position = await scheduler.submit(job.id, user_id, len(data))
+        if position:
+            await processing_msg.edit_text(
+                f"⏳ {len(data)} {'строка' if len(data) == 1 else 'строк'} в очереди, "
+                f"позиция: {position}",
+                reply_markup=create_cancel_keyboard(job.id),
+            )
+
+    except (RateLimitError, JobQueueFullError) as e:
         if processing_msg:
             await processing_msg.edit_text(f"❌ {str(e)}")
         else:
@@ -276,6 +437,247 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
             pass
 
 
+async def _decode_photo_progressive(
+    context: ContextTypes.DEFAULT_TYPE,
+    photos: Sequence[PhotoSize],
+    processing_msg: Optional[Message],
+    decode_cache: Optional[DecodeCache],
+    decode_stats: DecodeStats,
+) -> Tuple[DecodeResult, bool]:
+    """
+    Распознает фото, начиная с уменьшенной копии.
+
+    Сначала скачивается копия среднего размера и распознается с коротким
+    лимитом времени; большие размеры скачиваются, только если копия не
+    распознана. Последний (наибольший) размер распознается с обычным лимитом.
+
+    Args:
+        context: Контекст обработчика
+        photos: Размеры фото из сообщения
+        processing_msg: Сообщение о ходе обработки (None - без обновления)
+        decode_cache: Кэш результатов декодирования (None, если отключен)
+        decode_stats: Статистика методов декодирования
+
+    Returns:
+        Tuple[DecodeResult, bool]: Результат и признак того, что он взят из кэша
+
+    Raises:
+        QRCodeDecodeError: если QR-код не найден ни на одном размере фото
+    """
+    config = get_settings()
+    cache_key = photos[-1].file_unique_id
+    attempts = select_photo_sizes(photos, config.photo_preview_min_size)
+
+    # Порядок методов обработки по статистике успешных декодирований
+    db = next(get_db())
+    try:
+        rankings = decode_stats.get_rankings(db)
+    finally:
+        db.close()
+
+    if processing_msg:
+        await processing_msg.edit_text("🔍 Декодирование QR-кода...")
+    for attempt, photo in enumerate(attempts, 1):
+        is_last = attempt == len(attempts)
+        image_data = await _download_file(context, photo.file_id)
+
+        digest = content_hash(image_data)
+        if decode_cache:
+            decode_result = decode_cache.get_by_content(cache_key, digest)
+            if decode_result is not None:
+                logger.info("Результат декодирования фото взят из кэша по содержимому")
+                return decode_result, True
+
+        time_budget = None if is_last else config.photo_preview_time_budget
+        try:
+            decode_result = await run_job(decode_qr_image, image_data, rankings, time_budget)
+        except QRCodeDecodeError as e:
+            if is_last:
+                raise
+            logger.info(
+                f"Фото {photo.width}x{photo.height} не распознано ({e}), "
+                "скачиваем больший размер"
+            )
+            continue
+
+        logger.info(
+            f"Фото распознано на размере {photo.width}x{photo.height} "
+            f"(попытка {attempt} из {len(attempts)})"
+        )
+        if decode_cache:
+            decode_cache.put(cache_key, digest, decode_result)
+        return decode_result, False
+
+
+async def _decode_photo(
+    context: ContextTypes.DEFAULT_TYPE,
+    photos: Sequence[PhotoSize],
+    processing_msg: Optional[Message],
+) -> Tuple[DecodeResult, bool]:
+    """
+    Распознает фото с учетом кэша результатов.
+
+    Args:
+        context: Контекст обработчика
+        photos: Размеры фото из сообщения
+        processing_msg: Сообщение о ходе обработки (None - без обновления)
+
+    Returns:
+        Tuple[DecodeResult, bool]: Результат и признак того, что он взят из кэша
+
+    Raises:
+        QRCodeDecodeError: если QR-код не найден
+    """
+    # Пересланное фото уже могло быть распознано: проверяем кэш до скачивания.
+    # Ключ кэша - наибольший размер фото
+    decode_cache = get_decode_cache()
+    if decode_cache:
+        decode_result = decode_cache.get_by_file_id(photos[-1].file_unique_id)
+        if decode_result is not None:
+            logger.info("Результат декодирования фото взят из кэша")
+            return decode_result, True
+
+    return await _decode_photo_progressive(
+        context, photos, processing_msg, decode_cache, get_decode_stats()
+    )
+
+
+# Фото альбомов, ожидающие распознавания: media_group_id -> обновления
+_media_groups: Dict[str, List[Update]] = {}
+
+
+async def _collect_media_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Добавляет фото альбома в буфер.
+
+    Telegram присылает каждое фото альбома отдельным обновлением. Первое фото
+    запускает задачу, которая ждет остальные фото и распознает альбом целиком.
+    """
+    media_group_id = update.message.media_group_id
+    group = _media_groups.get(media_group_id)
+    if group is not None:
+        group.append(update)
+        return
+
+    _media_groups[media_group_id] = [update]
+    context.application.create_task(_process_media_group(media_group_id, context), update=update)
+
+
+async def _process_media_group(media_group_id: str, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Ждет остальные фото альбома и распознает его."""
+    await asyncio.sleep(get_settings().media_group_window)
+    updates = _media_groups.pop(media_group_id, [])
+    if updates:
+        await handle_media_group(updates, context)
+
+
+async def handle_media_group(updates: List[Update], context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Распознает фото альбома одним пакетом.
+
+    Лимит запросов проверяется один раз на альбом, фото распознаются
+    параллельно, история сохраняется одной транзакцией, а результат
+    отправляется одним сообщением (или CSV-файлом, если кодов много).
+
+    Args:
+        updates: Обновления с фото одного альбома
+        context: Контекст обработчика
+    """
+    first = updates[0]
+    user_id = get_user_id(first)
+    processing_msg = None
+
+    try:
+        # Проверка rate limit
+        check_rate_limit(user_id)
+
+        logger.info(f"Получен альбом из {len(updates)} фото от пользователя {user_id}")
+        processing_msg = await first.message.reply_text(
+            f"⏳ Обработка альбома из {len(updates)} фото..."
+        )
+
+        outcomes = await asyncio.gather(
+            *(_decode_photo(context, update.message.photo, None) for update in updates),
+            return_exceptions=True,
+        )
+
+        decode_stats = get_decode_stats()
+        rows = []
+        failed = []
+        history = []
+        db = next(get_db())
+        try:
+            ensure_user_registered(first, db)
+            for index, outcome in enumerate(outcomes, 1):
+                source_name = f"QR decode album ({index}/{len(updates)})"
+                if isinstance(outcome, BaseException):
+                    if not isinstance(outcome, QRCodeDecodeError):
+                        logger.error(
+                            f"Ошибка при распознавании фото {index} альбома: {outcome}",
+                            exc_info=outcome,
+                        )
+                    failed.append(index)
+                    history.append((source_name, 0, ProcessingStatus.ERROR, str(outcome)))
+                    continue
+
+                decode_result, cached = outcome
+                if not cached:
+                    decode_stats.record(
+                        db,
+                        decode_result.features,
+                        decode_result.method,
+                        decode_result.passes,
+                        decode_result.engine,
+                        decode_result.latencies,
+                    )
+                rows.extend(
+                    (index, code_index, data)
+                    for code_index, data in enumerate(decode_result.data, 1)
+                )
+                history.append(
+                    (source_name, len(decode_result.data), ProcessingStatus.SUCCESS, None)
+                )
+
+            # Сохраняем историю альбома одной транзакцией
+            ProcessingHistoryRepository.create_many(db, user_id, ProcessingType.QR_DECODE, history)
+        finally:
+            db.close()
+
+        if not rows:
+            await processing_msg.edit_text("❌ QR-коды не найдены ни на одном фото альбома.")
+            return
+
+        summary = (
+            f"✅ Найдено {len(rows)} QR-код(ов) на {len(updates) - len(failed)} "
+            f"из {len(updates)} фото"
+        )
+        if failed:
+            summary += f"\nНе распознаны фото: {', '.join(map(str, failed))}"
+
+        await send_decoded_rows(
+            context.bot, first.message.chat_id, ("photo", "code", "data"), rows, summary
+        )
+
+        await processing_msg.delete()
+        logger.info(
+            f"Альбом распознан для пользователя {user_id}: {len(rows)} код(ов), "
+            f"не распознано фото: {len(failed)}"
+        )
+
+    except RateLimitError as e:
+        await first.message.reply_text(f"❌ {str(e)}")
+    except Exception as e:
+        logger.error(f"Неожиданная ошибка при обработке альбома: {e}", exc_info=True)
+        error_msg = f"❌ Ошибка при обработке альбома: {str(e)}"
+        try:
+            if processing_msg:
+                await processing_msg.edit_text(error_msg)
+            else:
+                await first.message.reply_text(error_msg)
+        except Exception:
+            pass
+
+
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обработчик получения фото с QR-кодами."""
     user_id = get_user_id(update)
@@ -283,6 +685,11 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     processing_msg = None
 
     try:
+        # Фото альбома распознаются вместе с остальными фото альбома
+        if photos and update.message.media_group_id:
+            await _collect_media_group(update, context)
+            return
+
         # Проверка rate limit
         check_rate_limit(user_id)
 
@@ -295,18 +702,11 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         # Отправляем сообщение о начале обработки
         processing_msg = await update.message.reply_text("⏳ Обработка изображения...")
 
-        # Получаем самое большое фото (обычно последнее в списке)
-        photo = photos[-1]
+        decode_result, cached = await _decode_photo(context, photos, processing_msg)
+        if cached:
+            logger.info(f"Результат декодирования фото взят из кэша для пользователя {user_id}")
 
-        # Получаем файл фото
-        file = await context.bot.get_file(photo.file_id)
-        image_bytes = io.BytesIO()
-        await file.download_to_memory(image_bytes)
-        image_data = image_bytes.getvalue()
-
-        # Декодируем QR-код
-        await processing_msg.edit_text("🔍 Декодирование QR-кода...")
-        decoded_data_list = decode_qr_from_image(image_data)
+        decoded_data_list = decode_result.data
 
         if not decoded_data_list:
             await processing_msg.edit_text("❌ QR-код не найден на изображении.")
@@ -316,6 +716,15 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         db = next(get_db())
         try:
             ensure_user_registered(update, db)
+            if not cached:
+                get_decode_stats().record(
+                    db,
+                    decode_result.features,
+                    decode_result.method,
+                    decode_result.passes,
+                    decode_result.engine,
+                    decode_result.latencies,
+                )
 
             # Сохраняем в историю
             for i, decoded_data in enumerate(decoded_data_list, 1):
@@ -327,32 +736,7 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             # Отправляем результаты
             await processing_msg.edit_text("✅ QR-код успешно декодирован!")
 
-            if len(decoded_data_list) == 1:
-                # Один QR-код - отправляем данные
-                decoded_data = decoded_data_list[0]
-                # Ограничиваем длину сообщения
-                if len(decoded_data) > 4000:
-                    await update.message.reply_text(
-                        f"📄 Данные из QR-кода (первые 4000 символов):\n\n{decoded_data[:4000]}...\n\n"
-                        f"Полная длина: {len(decoded_data)} символов"
-                    )
-                else:
-                    await update.message.reply_text(
-                        f"📄 Данные из QR-кода:\n\n`{decoded_data}`", parse_mode="Markdown"
-                    )
-            else:
-                # Несколько QR-кодов
-                result_text = f"📄 Найдено {len(decoded_data_list)} QR-код(ов):\n\n"
-                for i, decoded_data in enumerate(decoded_data_list, 1):
-                    preview = (
-                        decoded_data[:100] + "..." if len(decoded_data) > 100 else decoded_data
-                    )
-                    result_text += f"{i}. `{preview}`\n\n"
-
-                if len(result_text) > 4000:
-                    result_text = result_text[:4000] + "..."
-
-                await update.message.reply_text(result_text, parse_mode="Markdown")
+            await _send_decoded_data(update.message, decoded_data_list)
 
             await processing_msg.delete()
             logger.info(
@@ -0,0 +1,140 @@
+"""
+Отображение хода выполнения задач в сообщениях Telegram.
+
+Bot API ограничивает частоту редактирования сообщений, поэтому обновления
+проходят через ThrottledMessageEditor: он редактирует сообщение не чаще
+заданного интервала и отправляет только последний текст.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from ...core.config import get_settings
+from ...core.logging_config import get_logger
+from ...utils.progress import ProgressFile, ProgressInfo
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+def format_progress(info: ProgressInfo) -> str:
+    """
+    Форматирует ход генерации PDF для сообщения пользователю.
+
+    Args:
+        info: Ход выполнения
+
+    Returns:
+        str: Текст сообщения
+    """
+    if info.items_total:
+        text = (
+            f"🔲 Генерация QR-кодов: {info.items_done} из {info.items_total} " f"({info.percent}%)"
+        )
+    else:
+        text = f"🔲 Генерация QR-кодов: {info.items_done}"
+    text += f"\n📄 Страниц: {info.pages_done}"
+    if info.remaining is not None and info.items_done < (info.items_total or 0):
+        text += f"\n⏱ Осталось примерно {max(1, round(info.remaining))} с"
+    return text
+
+
+class ThrottledMessageEditor:
+    """Редактирует сообщение не чаще min_interval секунд, объединяя промежуточные тексты."""
+
+    def __init__(
+        self,
+        edit: Callable[[str], Awaitable[None]],
+        min_interval: Optional[float] = None,
+    ):
+        self._edit = edit
+        self._min_interval = (
+            get_settings().progress_update_interval if min_interval is None else min_interval
+        )
+        self._last_edit = float("-inf")
+        self._sent: Optional[str] = None
+        self._pending: Optional[str] = None
+        self._flush_task: Optional["asyncio.Task[None]"] = None
+
+    async def update(self, text: str) -> None:
+        """
+        Обновляет текст сообщения.
+
+        Если с прошлого редактирования прошло меньше min_interval, текст
+        откладывается и отправляется по истечении интервала; более новый текст
+        заменяет отложенный.
+
+        Args:
+            text: Новый текст сообщения
+        """
+        self._pending = text
+        delay = self._last_edit + self._min_interval - time.monotonic()
+        if delay <= 0:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later(delay))
+
+    async def _flush_later(self, delay: float) -> None:
+        """Отправляет отложенный текст после паузы."""
+        await asyncio.sleep(delay)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Сразу отправляет отложенный текст."""
+        text, self._pending = self._pending, None
+        if text is None or text == self._sent:
+            return
+        self._last_edit = time.monotonic()
+        self._sent = text
+        try:
+            await self._edit(text)
+        except Exception as e:
+            logger.debug(f"Не удалось обновить сообщение о ходе обработки: {e}")
+
+    def close(self) -> None:
+        """Отменяет отложенное обновление (перед удалением или финальным текстом)."""
+        self._pending = None
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+
+async def run_with_progress(
+    job: Awaitable[T],
+    progress_file: ProgressFile,
+    on_progress: Callable[[ProgressInfo], Awaitable[None]],
+    poll_interval: Optional[float] = None,
+) -> T:
+    """
+    Ожидает задачу воркера, периодически передавая ее ход выполнения.
+
+    Args:
+        job: Задача (например, run_job(...)), пишущая ход выполнения в progress_file
+        progress_file: Канал хода выполнения
+        on_progress: Вызывается с последним ProgressInfo
+        poll_interval: Интервал чтения канала (если None, берется из настроек)
+
+    Returns:
+        T: Результат задачи
+    """
+    if poll_interval is None:
+        poll_interval = get_settings().progress_update_interval
+
+    task = asyncio.ensure_future(job)
+    last_info: Optional[ProgressInfo] = None
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            info = progress_file.read()
+            if info is not None and info != last_info:
+                last_info = info
+                await on_progress(info)
+    finally:
+        # При отмене ожидания отменяем и саму задачу
+        if not task.done():
+            task.cancel()
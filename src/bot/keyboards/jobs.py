@@ -0,0 +1,23 @@
+"""
+Клавиатуры для задач в очереди.
+"""
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+# Префикс callback_data кнопки отмены задачи
+CANCEL_JOB_PREFIX = "cancel_job_"
+
+
+def create_cancel_keyboard(job_id: int) -> InlineKeyboardMarkup:
+    """
+    Создает клавиатуру с кнопкой отмены задачи.
+
+    Args:
+        job_id: ID задачи
+
+    Returns:
+        InlineKeyboardMarkup: Клавиатура с кнопкой отмены
+    """
+    return InlineKeyboardMarkup(
+        [[InlineKeyboardButton("🚫 Отменить", callback_data=f"{CANCEL_JOB_PREFIX}{job_id}")]]
+    )
@@ -2,6 +2,7 @@
 Главный модуль Telegram бота.
 """
 
+import functools
 import os
 import sys
 from pathlib import Path
@@ -12,7 +13,12 @@ from ..core.config import get_settings
 from ..core.exceptions import ConfigurationError
 from ..core.logging_config import setup_logging, get_logger
 from ..database.database import init_database
-from .handlers import commands, callbacks, messages
+from ..services.job_executor import get_executor, shutdown_executor
+from ..services.job_scheduler import get_scheduler, shutdown_scheduler
+from ..services.qr_service import shutdown_generation_pool
+from .handlers import commands, callbacks, jobs, messages
+from .keyboards.jobs import CANCEL_JOB_PREFIX
+from .update_processor import PerUserUpdateProcessor
 
 logger = get_logger(__name__)
 
@@ -34,8 +40,14 @@ def create_application() -> Application:
         if not token:
             raise ConfigurationError("Токен бота не указан в конфигурации")
 
-        # Создаем приложение
-        application = Application.builder().token(token).build()
+        # Создаем приложение: обновления разных пользователей обрабатываются
+        # параллельно, обновления одного пользователя - по порядку
+        builder = Application.builder().token(token)
+        if settings.update_concurrency > 1:
+            builder = builder.concurrent_updates(
+                PerUserUpdateProcessor(settings.update_concurrency)
+            )
+        application = builder.build()
 
         # Регистрируем обработчики команд
         application.add_handler(CommandHandler("start", commands.start_command))
@@ -44,12 +56,18 @@ def create_application() -> Application:
         application.add_handler(CommandHandler("reset", commands.reset_command))
         application.add_handler(CommandHandler("history", commands.history_command))
         application.add_handler(CommandHandler("stats", commands.stats_command))
+        application.add_handler(CommandHandler("decode_stats", commands.decode_stats_command))
         application.add_handler(CommandHandler("width", commands.set_width_command))
         application.add_handler(CommandHandler("height", commands.set_height_command))
         application.add_handler(CommandHandler("rows", commands.set_rows_command))
         application.add_handler(CommandHandler("columns", commands.set_columns_command))
 
         # Регистрируем обработчики callback
+        application.add_handler(
+            CallbackQueryHandler(
+                callbacks.handle_cancel_job_callback, pattern=rf"^{CANCEL_JOB_PREFIX}\d+$"
+            )
+        )
         application.add_handler(CallbackQueryHandler(callbacks.handle_settings_callback))
 
         # Регистрируем обработчики сообщений
@@ -82,6 +100,17 @@ async def post_init(application: Application) -> None:
     """
     settings = get_settings()
 
+    # Прогреваем пул воркеров, чтобы первая задача не ждала запуска процессов
+    # и загрузки модели QReader
+    if settings.worker_warmup or settings.qreader_preload:
+        await get_executor().warm_up(preload_qreader=settings.qreader_preload)
+
+    # Запускаем очередь задач; задачи, не завершенные до перезапуска, выполняются снова
+    await get_scheduler().start(
+        functools.partial(jobs.run_queued_job, application.bot),
+        functools.partial(jobs.notify_job_position, application.bot),
+    )
+
     # Отправляем уведомление администратору
     if settings.admin_id:
         try:
@@ -112,6 +141,11 @@ async def post_shutdown(application: Application) -> None:
         except Exception as e:
             logger.warning(f"Не удалось отправить уведомление администратору: {e}")
 
+    # Останавливаем очередь задач и пулы воркеров
+    await shutdown_scheduler()
+    shutdown_executor()
+    shutdown_generation_pool()
+
     logger.info("Бот остановлен")
 
 
@@ -0,0 +1,81 @@
+"""
+Параллельная обработка обновлений Telegram с сохранением порядка для пользователя.
+"""
+
+from collections import deque
+from typing import Any, Awaitable, Deque, Dict, Optional
+
+from telegram.ext import BaseUpdateProcessor
+
+from ..core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обрабатывает обновления разных пользователей параллельно, а обновления
+    одного пользователя - строго по очереди.
+
+    Пока обновление пользователя обрабатывается, следующие его обновления
+    ставятся в очередь этого пользователя и выполняются тем же вызовом по
+    порядку. Поэтому ожидающие обновления не занимают слоты: лимит
+    max_concurrent_updates ограничивает число одновременно обслуживаемых
+    пользователей, и пользователь с длинной очередью не блокирует остальных.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._queues: Dict[Any, Deque[Awaitable[Any]]] = {}
+
+    @staticmethod
+    def _get_key(update: object) -> Optional[Any]:
+        """Ключ очереди: пользователь, иначе чат; None - обновление без отправителя."""
+        user = getattr(update, "effective_user", None)
+        if user is not None:
+            return ("user", user.id)
+        chat = getattr(update, "effective_chat", None)
+        if chat is not None:
+            return ("chat", chat.id)
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self._get_key(update)
+        if key is None:
+            await coroutine
+            return
+
+        queue = self._queues.get(key)
+        if queue is not None:
+            # Обновление пользователя уже обрабатывается: выполним это после него
+            queue.append(coroutine)
+            return
+
+        self._queues[key] = queue = deque([coroutine])
+        try:
+            while queue:
+                try:
+                    await queue[0]
+                except Exception as e:
+                    logger.error(f"Ошибка обработки обновления: {e}", exc_info=True)
+                finally:
+                    queue.popleft()
+        finally:
+            # При отмене оставшиеся обновления пользователя не выполняются
+            for pending in queue:
+                pending.close()
+            del self._queues[key]
+
+    @property
+    def pending_updates(self) -> int:
+        """Количество обновлений, ожидающих в очередях пользователей."""
+        return sum(len(queue) - 1 for queue in self._queues.values())
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        # Ожидающие обновления отбрасываются, текущие завершаются
+        for queue in self._queues.values():
+            while len(queue) > 1:
+                queue.pop().close()
@@ -13,6 +13,9 @@ from .exceptions import (
     QRCodeGenerationError,
     PDFGenerationError,
     RateLimitError,
+    JobExecutionError,
+    JobCancelledError,
+    JobQueueFullError,
 )
 
 __all__ = [
@@ -30,4 +33,7 @@ __all__ = [
     "QRCodeGenerationError",
     "PDFGenerationError",
     "RateLimitError",
+    "JobExecutionError",
+    "JobCancelledError",
+    "JobQueueFullError",
 ]
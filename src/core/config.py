@@ -3,9 +3,9 @@
 """
 
 import os
-from typing import Optional
+from typing import List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field, field_validator
+from pydantic import Field, ValidationError, field_validator
 
 
 class Settings(BaseSettings):
@@ -29,6 +29,12 @@ class Settings(BaseSettings):
     max_text_length: int = Field(
         default=10000, ge=1, le=100000, description="Максимальная длина текста"
     )
+    max_excel_rows: int = Field(
+        default=100000,
+        ge=1,
+        le=1000000,
+        description="Максимальное количество строк Excel (файл длиннее отклоняется)",
+    )
     rate_limit_requests: int = Field(
         default=10, ge=1, description="Количество запросов для rate limiting"
     )
@@ -52,6 +58,175 @@ class Settings(BaseSettings):
         default=1, ge=1, le=10, description="Количество колонок на странице по умолчанию"
     )
 
+    # Worker Pool Settings
+    worker_pool_type: str = Field(
+        default="process", description="Тип пула воркеров для тяжелых задач: process или thread"
+    )
+    worker_pool_size: int = Field(
+        default=0, ge=0, le=64, description="Количество воркеров (0 - по числу CPU)"
+    )
+    worker_warmup: bool = Field(default=True, description="Прогревать воркеры при запуске бота")
+
+    # Update Processing Settings
+    update_concurrency: int = Field(
+        default=16,
+        ge=1,
+        le=256,
+        description="Пользователи, обновления которых обрабатываются одновременно "
+        "(1 - все обновления последовательно)",
+    )
+
+    # Job Queue Settings
+    job_max_concurrent: int = Field(
+        default=0,
+        ge=0,
+        le=64,
+        description="Одновременно выполняемые задачи (0 - по числу воркеров)",
+    )
+    job_per_user_concurrent: int = Field(
+        default=1,
+        ge=1,
+        le=16,
+        description="Одновременно выполняемые задачи одного пользователя (во всех полосах)",
+    )
+    job_max_queued_per_user: int = Field(
+        default=5, ge=1, le=100, description="Максимум задач одного пользователя в очереди"
+    )
+    job_max_attempts: int = Field(
+        default=3,
+        ge=1,
+        le=10,
+        description="Максимум запусков задачи, прерванной перезапуском бота",
+    )
+    job_interactive_max_cost: int = Field(
+        default=50,
+        ge=0,
+        le=100000,
+        description="Максимум QR-кодов в легкой задаче (выполняется вне очереди больших задач)",
+    )
+    job_interactive_reserved: int = Field(
+        default=1, ge=0, le=64, description="Слоты, зарезервированные для легких задач"
+    )
+    progress_update_interval: float = Field(
+        default=3.0,
+        ge=0.5,
+        le=60.0,
+        description="Минимальный интервал обновления сообщения о ходе обработки (секунды)",
+    )
+
+    # QR Generation Settings
+    qr_parallel_threshold: int = Field(
+        default=1000,
+        ge=0,
+        description="Минимальное количество QR-кодов для параллельной генерации (0 - отключено)",
+    )
+    qr_chunk_size: int = Field(
+        default=250, ge=1, le=10000, description="Размер части списка для процесса-воркера"
+    )
+    qr_parallel_workers: int = Field(
+        default=0, ge=0, le=64, description="Процессов для генерации QR-кодов (0 - по числу CPU)"
+    )
+    stream_batch_size: int = Field(
+        default=1000,
+        ge=1,
+        le=100000,
+        description="Количество QR-кодов в одной порции при потоковой генерации PDF",
+    )
+    qr_cache_max_mb: int = Field(
+        default=32, ge=0, le=1024, description="Размер кэша матриц QR-кодов в MB (0 - отключен)"
+    )
+
+    # PDF Rendering Settings
+    pdf_render_mode: str = Field(
+        default="auto",
+        description="Способ вывода QR-кодов в PDF: vector, raster или auto (raster при повторах)",
+    )
+    pdf_spool_threshold_mb: int = Field(
+        default=5,
+        ge=0,
+        le=100,
+        description="Размер PDF в MB, после которого он передается через временный файл",
+    )
+
+    # QR Decoding Settings
+    qreader_preload: bool = Field(
+        default=True, description="Загружать модель QReader при прогреве воркеров"
+    )
+    qreader_pool_size: int = Field(
+        default=1, ge=1, le=8, description="Количество экземпляров QReader в процессе"
+    )
+    decode_time_budget: float = Field(
+        default=15.0,
+        ge=0,
+        le=300,
+        description="Время на декодирование одного изображения в секундах (0 - без ограничения)",
+    )
+    decode_tiled_min_pixels: int = Field(
+        default=8_000_000,
+        ge=0,
+        description="Изображения от этого числа пикселей распознаются по плиткам (0 - отключено)",
+    )
+    decode_engines: str = Field(
+        default="pyzbar,qreader,opencv",
+        description="Движки распознавания через запятую: pyzbar, qreader, opencv",
+    )
+    decode_race: bool = Field(
+        default=False, description="Запускать движки распознавания одновременно"
+    )
+    photo_preview_min_size: int = Field(
+        default=640,
+        ge=0,
+        le=2560,
+        description="Сначала распознается копия фото от этого размера (0 - сразу оригинал)",
+    )
+    photo_preview_time_budget: float = Field(
+        default=2.0,
+        ge=0,
+        le=60,
+        description="Время на распознавание уменьшенной копии фото в секундах",
+    )
+    media_group_window: float = Field(
+        default=1.5,
+        ge=0.1,
+        le=10,
+        description="Время сбора фото одного альбома перед распознаванием в секундах",
+    )
+    decode_csv_threshold: int = Field(
+        default=10,
+        ge=1,
+        description="Результаты альбома или PDF с большим числом кодов отправляются CSV-файлом",
+    )
+    pdf_decode_dpi: int = Field(
+        default=200, ge=72, le=600, description="Разрешение отрисовки страниц PDF для распознавания"
+    )
+    pdf_decode_max_pages: int = Field(
+        default=50, ge=1, le=1000, description="Максимальное количество распознаваемых страниц PDF"
+    )
+    decode_cache_size: int = Field(
+        default=1000,
+        ge=0,
+        le=100000,
+        description="Количество результатов декодирования в кэше (0 - кэш отключен)",
+    )
+    decode_draft_min_size: int = Field(
+        default=640,
+        ge=0,
+        le=4096,
+        description="Минимальная длинная сторона уменьшенной копии JPEG (0 - без уменьшения)",
+    )
+    decode_tile_size: int = Field(
+        default=1024, ge=256, le=8192, description="Размер плитки при распознавании в пикселях"
+    )
+    decode_tile_overlap: int = Field(
+        default=384,
+        ge=0,
+        le=4096,
+        description="Перекрытие плиток в пикселях (не меньше размера QR-кода на изображении)",
+    )
+    decode_tile_workers: int = Field(
+        default=4, ge=1, le=32, description="Количество потоков для распознавания плиток"
+    )
+
     @field_validator("log_level")
     @classmethod
     def validate_log_level(cls, v: str) -> str:
@@ -61,6 +236,24 @@ class Settings(BaseSettings):
             raise ValueError(f"log_level должен быть одним из: {valid_levels}")
         return v.upper()
 
+    @field_validator("worker_pool_type")
+    @classmethod
+    def validate_worker_pool_type(cls, v: str) -> str:
+        """Валидация типа пула воркеров."""
+        valid_types = ["process", "thread"]
+        if v.lower() not in valid_types:
+            raise ValueError(f"worker_pool_type должен быть одним из: {valid_types}")
+        return v.lower()
+
+    @field_validator("pdf_render_mode")
+    @classmethod
+    def validate_pdf_render_mode(cls, v: str) -> str:
+        """Валидация способа вывода QR-кодов в PDF."""
+        valid_modes = ["vector", "raster", "auto"]
+        if v.lower() not in valid_modes:
+            raise ValueError(f"pdf_render_mode должен быть одним из: {valid_modes}")
+        return v.lower()
+
     @field_validator("telegram_bot_token")
     @classmethod
     def validate_token(cls, v: str) -> str:
@@ -73,9 +266,21 @@ class Settings(BaseSettings):
         """Возвращает максимальный размер файла в байтах."""
         return self.max_file_size_mb * 1024 * 1024
 
+    def get_decode_engines(self) -> List[str]:
+        """Возвращает список движков распознавания."""
+        return [name.strip().lower() for name in self.decode_engines.split(",") if name.strip()]
+
+    def get_pdf_spool_threshold_bytes(self) -> int:
+        """Возвращает порог сброса PDF во временный файл в байтах."""
+        return self.pdf_spool_threshold_mb * 1024 * 1024
+
 
 # Глобальный экземпляр настроек
 _settings: Optional[Settings] = None
+# Настройки со значениями по умолчанию (если настройки бота не заданы)
+_default_settings: Optional[Settings] = None
+# Токен-заглушка для настроек вне бота (сервисам генерации токен не нужен)
+_PLACEHOLDER_TOKEN = "0000000000:placeholder"
 
 
 def get_settings() -> Settings:
@@ -91,6 +296,32 @@ def get_settings() -> Settings:
     return _settings
 
 
+def get_settings_or_defaults() -> Settings:
+    """
+    Получает настройки, допуская отсутствие токена бота (TELEGRAM_BOT_TOKEN).
+
+    Используется сервисами генерации QR-кодов и PDF, чтобы их можно было
+    вызывать вне бота (скрипты, тесты) без токена. Остальные настройки и в
+    этом случае читаются из окружения и .env и проверяются; вместо токена
+    подставляется заглушка. Бот проверяет настройки при запуске через get_settings.
+
+    Returns:
+        Settings: экземпляр настроек
+
+    Raises:
+        ValidationError: если неверны другие настройки, кроме токена
+    """
+    global _default_settings
+    try:
+        return get_settings()
+    except ValidationError as e:
+        if any(error["loc"] != ("telegram_bot_token",) for error in e.errors()):
+            raise
+        if _default_settings is None:
+            _default_settings = Settings(telegram_bot_token=_PLACEHOLDER_TOKEN)
+        return _default_settings
+
+
 def reload_settings() -> Settings:
     """
     Перезагружает настройки из файла.
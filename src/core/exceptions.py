@@ -57,6 +57,12 @@ class QRCodeDecodeError(QRCodeBotException):
     pass
 
 
+class QRCodeDecodeTimeoutError(QRCodeDecodeError):
+    """Истекло время на декодирование QR-кода."""
+
+    pass
+
+
 class PDFGenerationError(QRCodeBotException):
     """Ошибка генерации PDF."""
 
@@ -67,3 +73,21 @@ class RateLimitError(QRCodeBotException):
     """Превышен лимит запросов."""
 
     pass
+
+
+class JobExecutionError(QRCodeBotException):
+    """Ошибка выполнения задачи в пуле воркеров."""
+
+    pass
+
+
+class JobCancelledError(JobExecutionError):
+    """Задача отменена."""
+
+    pass
+
+
+class JobQueueFullError(QRCodeBotException):
+    """Превышено количество задач пользователя в очереди."""
+
+    pass
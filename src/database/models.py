@@ -38,6 +38,17 @@ class ProcessingStatus(str, enum.Enum):
     SUCCESS = "success"
     ERROR = "error"
     PROCESSING = "processing"
+    CANCELLED = "cancelled"
+
+
+class JobStatus(str, enum.Enum):
+    """Статус задачи в очереди."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
 
 
 class User(Base):
@@ -120,8 +131,51 @@ class ProcessingHistory(Base):
     user = relationship("User", back_populates="processing_history")
 
 
+class QueuedJob(Base):
+    """Модель задачи в очереди (сохраняется между перезапусками)."""
+
+    __tablename__ = "queued_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(
+        Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    chat_id = Column(Integer, nullable=False)
+    status_message_id = Column(Integer)  # Сообщение о ходе обработки
+    processing_type = Column(SQLEnum(ProcessingType), nullable=False)
+    source_name = Column(String(500))  # Имя файла или "text"
+    file_id = Column(Integer, ForeignKey("user_files.id", ondelete="CASCADE"))  # Excel или PDF
+    payload = Column(Text)  # Текст сообщения для текстовых задач
+    cost = Column(Integer, nullable=False, default=1)  # Оценка: количество QR-кодов
+    attempts = Column(Integer, nullable=False, default=0)  # Количество запусков
+    status = Column(SQLEnum(JobStatus), nullable=False, default=JobStatus.QUEUED)
+    error_message = Column(Text)
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+
+class DecodeMethodStats(Base):
+    """Модель статистики успешных методов декодирования QR-кодов."""
+
+    __tablename__ = "decode_method_stats"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    features = Column(String(100), nullable=False)  # Характеристики изображения
+    method = Column(String(100), nullable=False)  # Успешный метод обработки
+    success_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
+
+
 # Создаем индексы для оптимизации
 Index(
     "idx_processing_history_user_type", ProcessingHistory.user_id, ProcessingHistory.processing_type
 )
 Index("idx_processing_history_processed_at", ProcessingHistory.processed_at)
+Index(
+    "idx_decode_method_stats_features_method",
+    DecodeMethodStats.features,
+    DecodeMethodStats.method,
+    unique=True,
+)
+Index("idx_queued_jobs_status", QueuedJob.status, QueuedJob.id)
@@ -2,7 +2,7 @@
 Репозитории для работы с данными.
 """
 
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Sequence, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
@@ -15,6 +15,9 @@ from .models import (
     ProcessingHistory,
     ProcessingType,
     ProcessingStatus,
+    DecodeMethodStats,
+    QueuedJob,
+    JobStatus,
 )
 
 logger = get_logger(__name__)
@@ -263,6 +266,43 @@ class ProcessingHistoryRepository:
         )
         return history
 
+    @staticmethod
+    def create_many(
+        db: Session,
+        user_id: int,
+        processing_type: ProcessingType,
+        entries: Sequence[Tuple[str, int, ProcessingStatus, Optional[str]]],
+    ) -> int:
+        """
+        Создает несколько записей истории в одной транзакции.
+
+        Args:
+            db: Сессия базы данных
+            user_id: ID пользователя
+            processing_type: Тип обработки
+            entries: Кортежи (source_name, qr_codes_count, status, error_message)
+
+        Returns:
+            int: Количество созданных записей
+        """
+        db.add_all(
+            ProcessingHistory(
+                user_id=user_id,
+                processing_type=processing_type,
+                source_name=source_name,
+                qr_codes_count=qr_codes_count,
+                status=status,
+                error_message=error_message,
+            )
+            for source_name, qr_codes_count, status, error_message in entries
+        )
+        db.commit()
+        logger.info(
+            f"Создано записей истории: user_id={user_id}, "
+            f"type={processing_type}, count={len(entries)}"
+        )
+        return len(entries)
+
     @staticmethod
     def get_by_user_id(
         db: Session, user_id: int, limit: int = 50, offset: int = 0
@@ -319,3 +359,124 @@ class ProcessingHistoryRepository:
             "file_processing_count": file_count,
             "text_processing_count": text_count,
         }
+
+
+class DecodeStatsRepository:
+    """Репозиторий для работы со статистикой методов декодирования."""
+
+    @staticmethod
+    def increment(db: Session, features: str, method: str) -> DecodeMethodStats:
+        """Увеличивает счетчик успешных декодирований метода."""
+        stats = (
+            db.query(DecodeMethodStats)
+            .filter(DecodeMethodStats.features == features, DecodeMethodStats.method == method)
+            .first()
+        )
+        if stats is None:
+            stats = DecodeMethodStats(features=features, method=method, success_count=0)
+            db.add(stats)
+        stats.success_count += 1
+        db.commit()
+        return stats
+
+    @staticmethod
+    def get_all(db: Session) -> List[DecodeMethodStats]:
+        """Получает всю статистику, отсортированную по убыванию успешности."""
+        return (
+            db.query(DecodeMethodStats)
+            .order_by(DecodeMethodStats.features, desc(DecodeMethodStats.success_count))
+            .all()
+        )
+
+    @staticmethod
+    def get_method_totals(db: Session) -> List[Tuple[str, int]]:
+        """Возвращает количество успешных декодирований по методам."""
+        total = func.sum(DecodeMethodStats.success_count)
+        return [
+            (method, count)
+            for method, count in db.query(DecodeMethodStats.method, total)
+            .group_by(DecodeMethodStats.method)
+            .order_by(desc(total))
+            .all()
+        ]
+
+
+class JobRepository:
+    """Репозиторий для работы с очередью задач."""
+
+    @staticmethod
+    def create(
+        db: Session,
+        user_id: int,
+        chat_id: int,
+        processing_type: ProcessingType,
+        source_name: str,
+        status_message_id: Optional[int] = None,
+        file_id: Optional[int] = None,
+        payload: Optional[str] = None,
+        cost: int = 1,
+    ) -> QueuedJob:
+        """Создает задачу в очереди."""
+        job = QueuedJob(
+            user_id=user_id,
+            chat_id=chat_id,
+            status_message_id=status_message_id,
+            processing_type=processing_type,
+            source_name=source_name,
+            file_id=file_id,
+            payload=payload,
+            cost=cost,
+            status=JobStatus.QUEUED,
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        logger.info(
+            f"Создана задача {job.id}: user_id={user_id}, type={processing_type}, cost={cost}"
+        )
+        return job
+
+    @staticmethod
+    def get_by_id(db: Session, job_id: int) -> Optional[QueuedJob]:
+        """Получает задачу по ID."""
+        return db.query(QueuedJob).filter(QueuedJob.id == job_id).first()
+
+    @staticmethod
+    def get_unfinished(db: Session) -> List[QueuedJob]:
+        """Получает незавершенные задачи (в очереди и прерванные) в порядке создания."""
+        return (
+            db.query(QueuedJob)
+            .filter(QueuedJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]))
+            .order_by(QueuedJob.id)
+            .all()
+        )
+
+    @staticmethod
+    def set_status_message(db: Session, job_id: int, message_id: int) -> Optional[QueuedJob]:
+        """Сохраняет ID сообщения о ходе обработки задачи."""
+        job = JobRepository.get_by_id(db, job_id)
+        if not job:
+            return None
+
+        job.status_message_id = message_id
+        db.commit()
+        return job
+
+    @staticmethod
+    def set_status(
+        db: Session, job_id: int, status: JobStatus, error_message: Optional[str] = None
+    ) -> Optional[QueuedJob]:
+        """Обновляет статус задачи и время начала или завершения (запуск увеличивает attempts)."""
+        job = JobRepository.get_by_id(db, job_id)
+        if not job:
+            return None
+
+        job.status = status
+        if status == JobStatus.RUNNING:
+            job.started_at = datetime.now()
+            job.attempts = (job.attempts or 0) + 1
+        elif status != JobStatus.QUEUED:
+            job.finished_at = datetime.now()
+            job.error_message = error_message
+        db.commit()
+        return job
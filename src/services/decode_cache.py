@@ -0,0 +1,117 @@
+"""
+Кэш результатов декодирования QR-кодов.
+
+Пересланные и повторно отправленные фото имеют тот же file_unique_id в
+Telegram, поэтому результат находится до скачивания файла. Если ID новый,
+а содержимое уже встречалось (фото сохранили и отправили заново), результат
+находится по хэшу содержимого после скачивания, но без декодирования.
+"""
+
+import hashlib
+from typing import Dict, Optional
+
+from ..core.config import get_settings
+from ..core.logging_config import get_logger
+from ..utils.cache import LRUCache
+
+logger = get_logger(__name__)
+
+
+def content_hash(data: bytes) -> str:
+    """
+    Вычисляет хэш содержимого файла.
+
+    Args:
+        data: Содержимое файла
+
+    Returns:
+        str: SHA-256 в hex
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class DecodeCache:
+    """Ограниченный LRU-кэш результатов декодирования по file_unique_id и хэшу."""
+
+    def __init__(self, max_entries: int):
+        # file_unique_id -> хэш содержимого
+        self._file_ids = LRUCache(max_entries)
+        # хэш содержимого -> результат декодирования
+        self._results = LRUCache(max_entries)
+
+    def get_by_file_id(self, file_unique_id: str) -> Optional[object]:
+        """
+        Ищет результат по file_unique_id (до скачивания файла).
+
+        Args:
+            file_unique_id: Уникальный ID файла в Telegram
+
+        Returns:
+            Optional[object]: Результат декодирования или None
+        """
+        digest = self._file_ids.get(file_unique_id)
+        if digest is None:
+            return None
+        return self._results.get(digest)
+
+    def get_by_content(self, file_unique_id: str, digest: str) -> Optional[object]:
+        """
+        Ищет результат по хэшу содержимого и запоминает новый file_unique_id.
+
+        Args:
+            file_unique_id: Уникальный ID файла в Telegram
+            digest: Хэш содержимого
+
+        Returns:
+            Optional[object]: Результат декодирования или None
+        """
+        result = self._results.get(digest)
+        if result is not None:
+            self._file_ids.put(file_unique_id, digest)
+        return result
+
+    def put(self, file_unique_id: str, digest: str, result: object) -> None:
+        """
+        Сохраняет результат декодирования.
+
+        Args:
+            file_unique_id: Уникальный ID файла в Telegram
+            digest: Хэш содержимого
+            result: Результат декодирования
+        """
+        self._file_ids.put(file_unique_id, digest)
+        self._results.put(digest, result)
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        self._file_ids.clear()
+        self._results.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает статистику кэша результатов.
+
+        Returns:
+            Dict[str, int]: hits, misses, evictions, entries, size, max_size
+        """
+        return self._results.stats()
+
+
+# Глобальный экземпляр кэша (None, если кэш отключен)
+_decode_cache: Optional[DecodeCache] = None
+
+
+def get_decode_cache() -> Optional[DecodeCache]:
+    """
+    Получает кэш результатов декодирования (singleton).
+
+    Returns:
+        Optional[DecodeCache]: кэш или None, если он отключен в настройках
+    """
+    global _decode_cache
+    if _decode_cache is None:
+        max_entries = get_settings().decode_cache_size
+        if max_entries <= 0:
+            return None
+        _decode_cache = DecodeCache(max_entries)
+    return _decode_cache
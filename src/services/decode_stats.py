@@ -0,0 +1,131 @@
+"""
+Статистика успешных методов декодирования QR-кодов.
+
+Для каждого набора характеристик изображения (размер, режим, яркость)
+считается, какой метод обработки дал результат. Методы упорядочиваются по
+убыванию успешности и передаются в декодер, чтобы следующие похожие
+изображения начинали с наиболее вероятного метода.
+"""
+
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..core.logging_config import get_logger
+from ..database.repositories import DecodeStatsRepository
+
+logger = get_logger(__name__)
+
+
+class DecodeStats:
+    """Счетчики успешных методов декодирования с сохранением в БД."""
+
+    def __init__(self):
+        self._counts: Optional[Dict[str, Counter]] = None
+        self._lock = threading.Lock()
+        self._decodes = 0
+        self._passes = 0
+        # Победы и суммарное время работы движков распознавания с момента запуска
+        self._engine_wins: Counter = Counter()
+        self._engine_time: Dict[str, float] = {}
+        self._engine_runs: Counter = Counter()
+
+    def _load(self, db: Session) -> Dict[str, Counter]:
+        """Загружает статистику из БД при первом обращении."""
+        if self._counts is None:
+            counts: Dict[str, Counter] = {}
+            for stats in DecodeStatsRepository.get_all(db):
+                counts.setdefault(stats.features, Counter())[stats.method] = stats.success_count
+            self._counts = counts
+            logger.info(f"Загружена статистика методов декодирования: {len(counts)} групп")
+        return self._counts
+
+    def get_rankings(self, db: Session) -> Dict[str, List[str]]:
+        """
+        Возвращает методы в порядке убывания успешности для каждой группы изображений.
+
+        Args:
+            db: Сессия базы данных
+
+        Returns:
+            Dict[str, List[str]]: Ключ характеристик -> список методов
+        """
+        with self._lock:
+            counts = self._load(db)
+            return {
+                features: [method for method, _ in counter.most_common()]
+                for features, counter in counts.items()
+            }
+
+    def record(
+        self,
+        db: Session,
+        features: str,
+        method: str,
+        passes: int,
+        engine: Optional[str] = None,
+        latencies: Optional[Dict[str, float]] = None,
+    ) -> None:
+        """
+        Учитывает успешное декодирование.
+
+        Args:
+            db: Сессия базы данных
+            features: Ключ характеристик изображения
+            method: Успешный метод
+            passes: Количество выполненных попыток декодирования
+            engine: Движок, распознавший код
+            latencies: Время работы каждого запущенного движка в секундах
+        """
+        with self._lock:
+            self._load(db).setdefault(features, Counter())[method] += 1
+            self._decodes += 1
+            self._passes += passes
+            if engine:
+                self._engine_wins[engine] += 1
+            for name, seconds in (latencies or {}).items():
+                self._engine_time[name] = self._engine_time.get(name, 0.0) + seconds
+                self._engine_runs[name] += 1
+
+        try:
+            DecodeStatsRepository.increment(db, features, method)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Не удалось сохранить статистику декодирования: {e}")
+
+    def get_average_passes(self) -> float:
+        """Среднее число попыток на успешное декодирование с момента запуска."""
+        with self._lock:
+            return self._passes / self._decodes if self._decodes else 0.0
+
+    def get_engine_stats(self) -> Dict[str, Tuple[int, float]]:
+        """
+        Возвращает статистику движков распознавания с момента запуска.
+
+        Returns:
+            Dict[str, Tuple[int, float]]: Движок -> (число побед, среднее время в секундах)
+        """
+        with self._lock:
+            return {
+                name: (self._engine_wins[name], self._engine_time[name] / runs)
+                for name, runs in self._engine_runs.items()
+            }
+
+
+# Глобальный экземпляр статистики
+_decode_stats: Optional[DecodeStats] = None
+
+
+def get_decode_stats() -> DecodeStats:
+    """
+    Получает экземпляр статистики декодирования (singleton).
+
+    Returns:
+        DecodeStats: статистика методов декодирования
+    """
+    global _decode_stats
+    if _decode_stats is None:
+        _decode_stats = DecodeStats()
+    return _decode_stats
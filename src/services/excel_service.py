@@ -1,52 +1,194 @@
 """
 Сервис для обработки Excel файлов.
+
+Файл читается потоково: .xlsx через openpyxl в режиме read_only, .xls через
+xlrd с загрузкой листов по требованию. Из листа извлекается только нужная
+колонка, поэтому время и память пропорциональны одной колонке.
 """
 
 import io
-from typing import List, Union
-import pandas as pd
+import itertools
+from typing import Iterator, List, Optional, Union
 
+from ..core.config import get_settings_or_defaults
 from ..core.exceptions import ExcelProcessingError
 from ..core.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Сигнатуры форматов: .xlsx - ZIP-архив, .xls - составной документ OLE2
+XLSX_SIGNATURE = b"PK\x03\x04"
+XLS_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
 
-def read_data_from_excel(excel_file: Union[io.BytesIO, str], column_index: int = 0) -> List[str]:
+
+def _read_signature(excel_file: Union[io.BytesIO, str]) -> bytes:
+    """Читает первые байты файла, не меняя позицию в буфере."""
+    if isinstance(excel_file, str):
+        with open(excel_file, "rb") as f:
+            return f.read(len(XLS_SIGNATURE))
+
+    position = excel_file.tell()
+    signature = excel_file.read(len(XLS_SIGNATURE))
+    excel_file.seek(position)
+    return signature
+
+
+def _cell_to_str(value: object) -> str:
     """
-    Читает данные из Excel файла.
+    Конвертирует значение ячейки в строку.
+
+    Целые числа, сохраненные как float (xlrd, формулы), выводятся без ".0".
+    """
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _iter_xlsx_column(excel_file: Union[io.BytesIO, str], column_index: int) -> Iterator[object]:
+    """Итерирует значения колонки первого листа .xlsx."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(excel_file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        column = column_index + 1
+        for (value,) in sheet.iter_rows(min_col=column, max_col=column, values_only=True):
+            yield value
+    finally:
+        workbook.close()
+
+
+def _iter_xls_column(excel_file: Union[io.BytesIO, str], column_index: int) -> Iterator[object]:
+    """Итерирует значения колонки первого листа .xls."""
+    import xlrd
+
+    if isinstance(excel_file, str):
+        book = xlrd.open_workbook(excel_file, on_demand=True)
+    else:
+        book = xlrd.open_workbook(file_contents=excel_file.getvalue(), on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0)
+        for row_index in range(sheet.nrows):
+            if column_index >= sheet.row_len(row_index):
+                yield None
+                continue
+            cell = sheet.cell(row_index, column_index)
+            yield None if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK) else cell.value
+    finally:
+        book.release_resources()
+
+
+def iter_data_from_excel(
+    excel_file: Union[io.BytesIO, str], column_index: int = 0, max_rows: Optional[int] = None
+) -> Iterator[str]:
+    """
+    Лениво читает непустые значения колонки первого листа Excel файла.
+
+    Лист длиннее max_rows строк (с учетом пустых) считается ошибкой, а не
+    обрезается: пользователь получает сообщение о лимите, а не PDF без части
+    данных. Значения до лимита уже отданы к моменту ошибки, поэтому
+    вызывающий код не должен использовать результат частично.
 
     Args:
         excel_file: Путь к файлу или BytesIO объект
         column_index: Индекс колонки для чтения (по умолчанию 0 - первая колонка)
+        max_rows: Максимальное количество строк листа (если None, берется из настроек)
 
-    Returns:
-        List[str]: Список данных из колонки
+    Yields:
+        str: Значение ячейки
 
     Raises:
-        ExcelProcessingError: если не удалось прочитать файл
+        ExcelProcessingError: если формат не поддерживается или превышен лимит строк
     """
+    if max_rows is None:
+        max_rows = get_settings_or_defaults().max_excel_rows
+
+    signature = _read_signature(excel_file)
+    if signature.startswith(XLSX_SIGNATURE):
+        cells = _iter_xlsx_column(excel_file, column_index)
+    elif signature == XLS_SIGNATURE:
+        cells = _iter_xls_column(excel_file, column_index)
+    else:
+        raise ExcelProcessingError("Неподдерживаемый формат файла. Ожидается .xlsx или .xls")
+
     try:
-        # Читаем Excel файл
-        df = pd.read_excel(excel_file, sheet_name=0, header=None)
+        for row_number, value in enumerate(cells, start=1):
+            if row_number > max_rows:
+                raise ExcelProcessingError(f"Слишком много строк в файле. Максимум: {max_rows}")
+            if value is None:
+                continue
+            item = _cell_to_str(value)
+            if item:
+                yield item
+    finally:
+        cells.close()
+
+
+def estimate_excel_rows(excel_file: Union[io.BytesIO, str], max_rows: Optional[int] = None) -> int:
+    """
+    Оценивает количество строк первого листа Excel файла без чтения ячеек.
 
-        if df.empty:
-            raise ExcelProcessingError("Excel файл пуст")
+    Для .xlsx используется размер листа из метаданных. Если он не записан
+    или больше max_rows (Excel завышает его до 1048576 строк, например, при
+    форматировании всей колонки), строки подсчитываются потоково, но не
+    более max_rows + 1. Для .xls используется число строк листа.
 
-        # Получаем данные из указанной колонки
-        if column_index >= len(df.columns):
-            raise ExcelProcessingError(
-                f"Колонка с индексом {column_index} не существует. "
-                f"Доступно колонок: {len(df.columns)}"
-            )
+    Args:
+        excel_file: Путь к файлу или BytesIO объект
+        max_rows: Максимальное количество строк листа (если None, берется из настроек)
+
+    Returns:
+        int: Оценка количества строк
 
-        column_data = df.iloc[:, column_index]
+    Raises:
+        ExcelProcessingError: если формат не поддерживается
+    """
+    if max_rows is None:
+        max_rows = get_settings_or_defaults().max_excel_rows
+
+    signature = _read_signature(excel_file)
+    if signature.startswith(XLSX_SIGNATURE):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(excel_file, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            if sheet.max_row is not None and sheet.max_row <= max_rows:
+                return sheet.max_row
+            rows = sheet.iter_rows(max_col=1, values_only=True)
+            return sum(1 for _ in itertools.islice(rows, max_rows + 1))
+        finally:
+            workbook.close()
+    if signature == XLS_SIGNATURE:
+        import xlrd
+
+        if isinstance(excel_file, str):
+            book = xlrd.open_workbook(excel_file, on_demand=True)
+        else:
+            book = xlrd.open_workbook(file_contents=excel_file.getvalue(), on_demand=True)
+        try:
+            return book.sheet_by_index(0).nrows
+        finally:
+            book.release_resources()
+    raise ExcelProcessingError("Неподдерживаемый формат файла. Ожидается .xlsx или .xls")
 
-        # Удаляем пустые значения и конвертируем в список строк
-        data_list = column_data.dropna().astype(str).tolist()
 
-        # Фильтруем пустые строки
-        data_list = [item.strip() for item in data_list if item.strip()]
+def read_data_from_excel(excel_file: Union[io.BytesIO, str], column_index: int = 0) -> List[str]:
+    """
+    Читает данные из Excel файла.
+
+    Args:
+        excel_file: Путь к файлу или BytesIO объект
+        column_index: Индекс колонки для чтения (по умолчанию 0 - первая колонка)
+
+    Returns:
+        List[str]: Список данных из колонки
+
+    Raises:
+        ExcelProcessingError: если не удалось прочитать файл
+    """
+    try:
+        data_list = list(iter_data_from_excel(excel_file, column_index))
 
         if not data_list:
             raise ExcelProcessingError("Не найдено данных в указанной колонке")
@@ -54,12 +196,8 @@ def read_data_from_excel(excel_file: Union[io.BytesIO, str], column_index: int =
         logger.info(f"Прочитано {len(data_list)} записей из Excel файла")
         return data_list
 
-    except pd.errors.EmptyDataError as e:
-        logger.error(f"Excel файл пуст: {e}")
-        raise ExcelProcessingError("Excel файл пуст или поврежден") from e
-    except pd.errors.ExcelFileError as e:
-        logger.error(f"Ошибка при чтении Excel файла: {e}")
-        raise ExcelProcessingError(f"Не удалось прочитать Excel файл: {e}") from e
+    except ExcelProcessingError:
+        raise
     except Exception as e:
         logger.error(f"Неожиданная ошибка при обработке Excel файла: {e}", exc_info=True)
         raise ExcelProcessingError(f"Ошибка при обработке Excel файла: {e}") from e
@@ -2,8 +2,12 @@
 Сервис для работы с файлами.
 """
 
+import csv
 import io
-from typing import Optional
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterable, Iterator, Optional, Sequence
 from pathlib import Path
 
 from ..core.exceptions import FileProcessingError
@@ -61,6 +65,68 @@ def read_file_to_bytesio(file_data: bytes) -> io.BytesIO:
     return buffer
 
 
+@contextmanager
+def temporary_file_path(suffix: str = "") -> Iterator[Path]:
+    """
+    Резервирует путь к временному файлу и удаляет файл при выходе.
+
+    Файл удаляется и при ошибке внутри блока, поэтому путь можно передавать
+    в процесс-воркер для записи результата.
+
+    Args:
+        suffix: Расширение файла
+
+    Yields:
+        Path: Путь к временному файлу
+    """
+    fd, name = tempfile.mkstemp(suffix=suffix, prefix="qr_bot_")
+    os.close(fd)
+    path = Path(name)
+    try:
+        yield path
+    finally:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Не удалось удалить временный файл {path}: {e}")
+
+
+def open_result_file(content: Optional[bytes], path: Path) -> BinaryIO:
+    """
+    Открывает результат воркера для отправки.
+
+    Args:
+        content: Байты результата или None, если результат записан на диск
+        path: Путь к временному файлу с результатом
+
+    Returns:
+        BinaryIO: BytesIO с данными или файл, открытый для чтения
+    """
+    if content is not None:
+        return io.BytesIO(content)
+    return open(path, "rb")
+
+
+def rows_to_csv(header: Sequence[str], rows: Iterable[Sequence[object]]) -> bytes:
+    """
+    Формирует CSV-файл.
+
+    Файл начинается с BOM, чтобы Excel распознал UTF-8.
+
+    Args:
+        header: Заголовки столбцов
+        rows: Строки данных
+
+    Returns:
+        bytes: Содержимое CSV-файла
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8-sig")
+
+
 def get_safe_filename(filename: str) -> str:
     """
     Получает безопасное имя файла.
@@ -0,0 +1,404 @@
+"""
+Предобработка изображений для декодирования QR-кодов.
+
+Варианты изображения (контраст, бинаризация, увеличение и т.д.) строятся
+лениво: каждый вариант вычисляется только когда до него дошла очередь, а
+промежуточные изображения (grayscale, увеличенные копии) вычисляются один
+раз и переиспользуются всеми вариантами.
+
+Бинаризация выполняется на массивах NumPy: глобальный порог Otsu и локальный
+порог Sauvola по интегральным изображениям. Результат - массив uint8, который
+pyzbar принимает напрямую без конвертации в PIL.
+"""
+
+import io
+import threading
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter, ImageStat
+
+from ..utils.deadline import Deadline
+
+# Изображения меньше этого размера по любой стороне дополнительно увеличиваются
+SMALL_IMAGE_SIZE = 500
+# Граница между средними и большими изображениями (по длинной стороне)
+LARGE_IMAGE_SIZE = 1500
+# Границы средней яркости grayscale для темных и светлых изображений
+DARK_BRIGHTNESS = 85
+BRIGHT_BRIGHTNESS = 170
+
+# Параметры порога Sauvola: чувствительность к локальному контрасту и
+# динамический диапазон стандартного отклонения
+SAUVOLA_K = 0.2
+SAUVOLA_R = 128.0
+# Окно Sauvola - доля короткой стороны изображения (не меньше минимального)
+SAUVOLA_WINDOW_RATIO = 8
+SAUVOLA_MIN_WINDOW = 15
+# Количество строк в полосе при вычислении порога Sauvola
+SAUVOLA_STRIP_ROWS = 256
+
+# Масштабы уменьшения JPEG в draft-режиме (от самого дешевого)
+DRAFT_SCALES = (8, 4, 2)
+
+# Вариант изображения: PIL Image или grayscale массив uint8
+DecodeImage = Union[Image.Image, np.ndarray]
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """
+    Вычисляет глобальный порог Otsu по гистограмме.
+
+    Args:
+        gray: Grayscale изображение (uint8)
+
+    Returns:
+        int: Порог, максимизирующий межклассовую дисперсию
+    """
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+
+    weight_background = np.cumsum(histogram)
+    weight_foreground = weight_background[-1] - weight_background
+    cumulative_mean = np.cumsum(histogram * levels)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_background = cumulative_mean / weight_background
+        mean_foreground = (cumulative_mean[-1] - cumulative_mean) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+
+    return int(np.nanargmax(variance)) if np.isfinite(variance).any() else 127
+
+
+def binarize_otsu(gray: np.ndarray) -> np.ndarray:
+    """
+    Бинаризует изображение глобальным порогом Otsu.
+
+    Args:
+        gray: Grayscale изображение (uint8)
+
+    Returns:
+        np.ndarray: Изображение uint8 из 0 и 255
+    """
+    return np.where(gray > otsu_threshold(gray), 255, 0).astype(np.uint8)
+
+
+def _integral_image(values: np.ndarray, squared: bool = False) -> np.ndarray:
+    """
+    Интегральное изображение (int64, точное) с нулевой первой строкой и колонкой.
+
+    При squared=True суммируются квадраты значений (uint8 в квадрате помещается в uint16).
+    """
+    integral = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=np.int64)
+    # Построчно и на месте: cumsum всего массива в срез integral создает полную копию
+    for row in range(values.shape[0]):
+        row_values = np.square(values[row], dtype=np.uint16) if squared else values[row]
+        np.cumsum(row_values, dtype=np.int64, out=integral[row + 1, 1:])
+        integral[row + 1, 1:] += integral[row, 1:]
+    return integral
+
+
+def _window_sums(
+    integral: np.ndarray, top: np.ndarray, bottom: np.ndarray, left: np.ndarray, right: np.ndarray
+) -> np.ndarray:
+    """Суммы по окнам [top, bottom) x [left, right) для полосы строк."""
+    rows = integral[bottom]
+    rows -= integral[top]
+    sums = rows[:, right]
+    sums -= rows[:, left]
+    return sums
+
+
+def binarize_sauvola(
+    gray: np.ndarray, window: Optional[int] = None, k: float = SAUVOLA_K, r: float = SAUVOLA_R
+) -> np.ndarray:
+    """
+    Бинаризует изображение локальным порогом Sauvola.
+
+    Порог для каждого пикселя T = m * (1 + k * (s / r - 1)), где m и s - среднее
+    и стандартное отклонение яркости в окне. Среднее и дисперсия считаются за
+    O(1) на пиксель по интегральным изображениям, поэтому неравномерное
+    освещение не требует перебора глобальных порогов.
+
+    Интегральные изображения хранятся точно (int64), а порог вычисляется
+    полосами по SAUVOLA_STRIP_ROWS строк во float32, поэтому временные массивы
+    занимают память одной полосы, а не всего изображения.
+
+    Args:
+        gray: Grayscale изображение (uint8)
+        window: Размер окна в пикселях (если None, зависит от размера изображения)
+        k: Чувствительность к локальному контрасту
+        r: Динамический диапазон стандартного отклонения
+
+    Returns:
+        np.ndarray: Изображение uint8 из 0 и 255
+    """
+    if window is None:
+        window = max(SAUVOLA_MIN_WINDOW, min(gray.shape) // SAUVOLA_WINDOW_RATIO)
+    window |= 1
+    radius = window // 2
+    height, width = gray.shape
+
+    sums_integral = _integral_image(gray)
+    squares_integral = _integral_image(gray, squared=True)
+
+    # Окна у границ обрезаются, поэтому площадь окна зависит от позиции
+    cols = np.arange(width)
+    left = np.clip(cols - radius, 0, width)
+    right = np.clip(cols + radius + 1, 0, width)
+    widths = right - left
+
+    binary = np.empty((height, width), dtype=np.uint8)
+    for start in range(0, height, SAUVOLA_STRIP_ROWS):
+        rows = np.arange(start, min(start + SAUVOLA_STRIP_ROWS, height))
+        top = np.clip(rows - radius, 0, height)
+        bottom = np.clip(rows + radius + 1, 0, height)
+        area = np.outer(bottom - top, widths)
+
+        sums = _window_sums(sums_integral, top, bottom, left, right)
+        squares = _window_sums(squares_integral, top, bottom, left, right)
+
+        # Дисперсия n^2 * var = n * sum(x^2) - sum(x)^2 точно в целых числах
+        squares *= area
+        squares -= sums * sums
+        variance = squares.astype(np.float32)
+        area_f = area.astype(np.float32)
+        variance /= area_f * area_f
+        std = np.sqrt(variance, out=variance)
+
+        mean = sums.astype(np.float32)
+        mean /= area_f
+        # Порог mean * (1 + k * (std / r - 1)) вычисляется на месте массива std
+        threshold = std
+        threshold *= k / r
+        threshold += 1.0 - k
+        threshold *= mean
+
+        strip = slice(start, start + len(rows))
+        np.greater(gray[strip], threshold, out=binary[strip])
+    binary *= 255
+    return binary
+
+
+class ImageVariants:
+    """
+    Лениво вычисляемые и мемоизированные варианты одного изображения.
+
+    Варианты можно запрашивать из нескольких потоков (гонка движков):
+    каждый вариант строится один раз под блокировкой.
+    """
+
+    def __init__(self, image: Image.Image):
+        self.image = image
+        self._cache: Dict[str, Any] = {}
+        # Реентерабельная: строители запрашивают промежуточные варианты через get
+        self._lock = threading.RLock()
+
+    @property
+    def is_small(self) -> bool:
+        """Проверяет, нужно ли пробовать увеличенные варианты."""
+        width, height = self.image.size
+        return width < SMALL_IMAGE_SIZE or height < SMALL_IMAGE_SIZE
+
+    @property
+    def built(self) -> List[str]:
+        """Имена уже вычисленных вариантов и промежуточных изображений."""
+        return list(self._cache)
+
+    def get(self, name: str) -> Any:
+        """
+        Возвращает вариант изображения, вычисляя его при первом обращении.
+
+        Args:
+            name: Имя варианта или промежуточного изображения
+
+        Returns:
+            Any: Изображение (или промежуточный объект)
+        """
+        with self._lock:
+            if name not in self._cache:
+                self._cache[name] = _BUILDERS[name](self)
+            return self._cache[name]
+
+
+class DecodeStage(NamedTuple):
+    """Вариант изображения, на котором пробуется декодирование."""
+
+    name: str
+    small_only: bool = False
+
+
+_BUILDERS: Dict[str, Callable[[ImageVariants], Any]] = {}
+
+
+def _register(name: str, builder: Callable[[ImageVariants], Any]) -> None:
+    """Регистрирует функцию построения варианта."""
+    _BUILDERS[name] = builder
+
+
+def _contrast(source: str, factor: float) -> Callable[[ImageVariants], Image.Image]:
+    """Строитель варианта с измененным контрастом."""
+    return lambda v: v.get(f"{source}_contrast_enhancer").enhance(factor)
+
+
+def _resized(scale: int) -> Callable[[ImageVariants], Image.Image]:
+    """Строитель увеличенного grayscale варианта."""
+    return lambda v: v.get("grayscale").resize(
+        (v.image.size[0] * scale, v.image.size[1] * scale), Image.Resampling.LANCZOS
+    )
+
+
+# Промежуточные объекты (используются несколькими вариантами)
+_register("grayscale", lambda v: v.image.convert("L"))
+_register("grayscale_array", lambda v: np.asarray(v.get("grayscale"), dtype=np.uint8))
+_register("grayscale_contrast_enhancer", lambda v: ImageEnhance.Contrast(v.get("grayscale")))
+_register(
+    "inverted_grayscale_contrast_enhancer",
+    lambda v: ImageEnhance.Contrast(v.get("inverted_grayscale")),
+)
+
+# Основные варианты
+_register("high_contrast_grayscale", _contrast("grayscale", 2.0))
+_register("max_contrast_grayscale", _contrast("grayscale", 3.0))
+_register("sharp_grayscale", lambda v: ImageEnhance.Sharpness(v.get("grayscale")).enhance(2.0))
+_register("otsu_threshold", lambda v: binarize_otsu(v.get("grayscale_array")))
+_register("sauvola_threshold", lambda v: binarize_sauvola(v.get("grayscale_array")))
+_register("inverted_grayscale", lambda v: v.get("grayscale").point(lambda x: 255 - x))
+_register("inverted_high_contrast", _contrast("inverted_grayscale", 2.0))
+_register("RGB", lambda v: v.image if v.image.mode == "RGB" else v.image.convert("RGB"))
+_register("sharpened_filter", lambda v: v.get("grayscale").filter(ImageFilter.SHARPEN))
+
+# Увеличенные варианты для маленьких изображений
+for _scale in (2, 3, 4, 5):
+    _register(f"resized_{_scale}x_grayscale", _resized(_scale))
+    _register(
+        f"resized_{_scale}x_grayscale_contrast_enhancer",
+        lambda v, s=_scale: ImageEnhance.Contrast(v.get(f"resized_{s}x_grayscale")),
+    )
+_register("resized_2x_high_contrast", _contrast("resized_2x_grayscale", 2.0))
+for _scale in (3, 4, 5):
+    for _level in (1.5, 2.0, 3.0):
+        _register(
+            f"resized_{_scale}x_contrast_{_level}",
+            _contrast(f"resized_{_scale}x_grayscale", _level),
+        )
+
+# Порядок вариантов по умолчанию: от дешевых к дорогим
+DEFAULT_STAGES: Tuple[DecodeStage, ...] = (
+    DecodeStage("grayscale"),
+    DecodeStage("high_contrast_grayscale"),
+    DecodeStage("max_contrast_grayscale"),
+    DecodeStage("sharp_grayscale"),
+    DecodeStage("sauvola_threshold"),
+    DecodeStage("otsu_threshold"),
+    DecodeStage("inverted_grayscale"),
+    DecodeStage("inverted_high_contrast"),
+    DecodeStage("RGB"),
+    DecodeStage("sharpened_filter"),
+    DecodeStage("resized_2x_grayscale", small_only=True),
+    DecodeStage("resized_2x_high_contrast", small_only=True),
+) + tuple(
+    DecodeStage(f"resized_{scale}x_contrast_{level}", small_only=True)
+    for scale in (3, 4, 5)
+    for level in (1.5, 2.0, 3.0)
+)
+
+
+def iter_decode_variants(
+    variants: ImageVariants,
+    order: Optional[Sequence[str]] = None,
+    deadline: Optional[Deadline] = None,
+) -> Iterator[Tuple[str, DecodeImage]]:
+    """
+    Лениво перебирает варианты изображения для декодирования.
+
+    Очередной вариант вычисляется только при запросе следующего элемента,
+    поэтому при успехе на первом варианте строится лишь grayscale.
+
+    Args:
+        variants: Варианты изображения
+        order: Предпочтительный порядок имен вариантов; остальные варианты
+            перебираются после них в порядке по умолчанию
+        deadline: Крайний срок; после его истечения новые варианты не строятся
+
+    Yields:
+        Tuple[str, DecodeImage]: Имя варианта и изображение (PIL или массив uint8)
+    """
+    stages = {stage.name: stage for stage in DEFAULT_STAGES}
+    names = [name for name in (order or ()) if name in stages]
+    names += [name for name in stages if name not in names]
+
+    for name in dict.fromkeys(names):
+        if stages[name].small_only and not variants.is_small:
+            continue
+        if deadline is not None and deadline.expired():
+            return
+        yield name, variants.get(name)
+
+
+def image_features(variants: ImageVariants, original: Optional[Image.Image] = None) -> str:
+    """
+    Вычисляет характеристики изображения для статистики методов декодирования.
+
+    Args:
+        variants: Варианты изображения
+        original: Исходное изображение, если variants построены по уменьшенной
+            копии (размер и режим берутся из него, яркость - из копии)
+
+    Returns:
+        str: Ключ вида "размер:режим:яркость", например "small:RGB:dark"
+    """
+    image = original or variants.image
+    width, height = image.size
+    if width < SMALL_IMAGE_SIZE or height < SMALL_IMAGE_SIZE:
+        size_bucket = "small"
+    elif max(width, height) < LARGE_IMAGE_SIZE:
+        size_bucket = "medium"
+    else:
+        size_bucket = "large"
+
+    brightness = ImageStat.Stat(variants.get("grayscale")).mean[0]
+    if brightness < DARK_BRIGHTNESS:
+        brightness_bucket = "dark"
+    elif brightness > BRIGHT_BRIGHTNESS:
+        brightness_bucket = "bright"
+    else:
+        brightness_bucket = "normal"
+
+    return f"{size_bucket}:{image.mode}:{brightness_bucket}"
+
+
+def iter_jpeg_drafts(
+    image_bytes: bytes, image: Image.Image, min_size: int
+) -> Iterator[Tuple[int, Image.Image]]:
+    """
+    Перебирает уменьшенные копии JPEG от самой маленькой к самой большой.
+
+    Копии декодируются сразу в уменьшенном масштабе и в grayscale (draft-режим
+    JPEG), без декодирования полного изображения.
+
+    Args:
+        image_bytes: Изображение в виде байтов
+        image: Открытое (еще не декодированное) изображение
+        min_size: Минимальная длинная сторона копии (0 - копии не создаются)
+
+    Yields:
+        Tuple[int, Image.Image]: Коэффициент уменьшения и копия изображения
+    """
+    if image.format != "JPEG" or not min_size:
+        return
+
+    width, height = image.size
+    for scale in DRAFT_SCALES:
+        if max(width, height) // scale < min_size:
+            continue
+        draft = Image.open(io.BytesIO(image_bytes))
+        draft.draft("L", (width // scale, height // scale))
+        yield scale, draft
+
+
+def describe_image(image: DecodeImage) -> str:
+    """Краткое описание варианта изображения для логов."""
+    if isinstance(image, np.ndarray):
+        return f"размер={image.shape[1]}x{image.shape[0]}, массив={image.dtype}"
+    return f"размер={image.size}, режим={image.mode}"
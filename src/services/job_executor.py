@@ -0,0 +1,384 @@
+"""
+Сервис для выполнения тяжелых задач вне event loop.
+
+Генерация PDF, чтение Excel и декодирование изображений выполняются в пуле
+воркеров (процессы или потоки), а обработчики бота только ожидают результат.
+"""
+
+import asyncio
+import functools
+import itertools
+import multiprocessing
+import multiprocessing.util
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from ..core.config import get_settings_or_defaults
+from ..core.exceptions import JobCancelledError, JobExecutionError
+from ..core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+
+
+# Количество выполняющихся задач пула (общее для процессов-воркеров)
+_busy_workers: Optional[Any] = None
+
+
+def _get_idle_cores(cpu_count: Optional[int] = None) -> int:
+    """
+    Возвращает количество ядер, не занятых другими задачами пула.
+
+    Args:
+        cpu_count: Количество ядер (если None, определяется по системе)
+    """
+    if cpu_count is None:
+        cpu_count = os.cpu_count() or 1
+    busy = _busy_workers.value if _busy_workers is not None else 1
+    # Ядро текущей задачи тоже свободно, пока она ждет пакетную генерацию
+    return max(cpu_count - busy + 1, 1)
+
+
+def _init_worker(busy_workers: Optional[Any] = None) -> None:
+    """
+    Инициализирует процесс-воркер (логирование, пакетная генерация).
+
+    Args:
+        busy_workers: Общий счетчик выполняющихся задач (multiprocessing.Value)
+    """
+    from ..core.logging_config import setup_logging
+    from .qr_service import set_idle_cores_provider, shutdown_generation_pool
+
+    global _busy_workers
+    setup_logging()
+
+    # Пакетная генерация в воркере использует только ядра, свободные от других задач
+    _busy_workers = busy_workers
+    set_idle_cores_provider(_get_idle_cores)
+    # Пул генерации останавливается до выхода воркера: иначе процесс при
+    # завершении ждет свои дочерние процессы, и остановка пула задач зависает.
+    # Приоритет выше, чем у финализаторов очередей multiprocessing (10), чтобы
+    # команды остановки успели уйти в пул до закрытия его очереди
+    multiprocessing.util.Finalize(None, shutdown_generation_pool, exitpriority=100)
+
+
+def _warm_up_worker(preload_qreader: bool = False) -> int:
+    """
+    Прогревает воркер: импортирует сервисы и генерирует тестовый QR-код.
+
+    Args:
+        preload_qreader: Загрузить модель QReader для декодирования фото
+
+    Returns:
+        int: PID процесса воркера
+    """
+    from .pdf_service import create_qr_pdf
+
+    create_qr_pdf(["warm-up"])
+
+    if preload_qreader:
+        try:
+            from .qr_decode_service import preload_qreader as load_qreader
+        except ImportError as e:
+            logger.warning(f"Сервис декодирования недоступен, QReader не загружен: {e}")
+        else:
+            load_qreader()
+
+    return os.getpid()
+
+
+class Job:
+    """Задача, отправленная в пул воркеров."""
+
+    def __init__(self, job_id: int, task: "asyncio.Task[Any]"):
+        self.job_id = job_id
+        self._task = task
+
+    def cancel(self) -> bool:
+        """Отменяет задачу. Возвращает False, если задача уже завершена."""
+        return self._task.cancel()
+
+    def done(self) -> bool:
+        """Проверяет, завершена ли задача."""
+        return self._task.done()
+
+    async def result(self) -> Any:
+        """
+        Ожидает результат задачи.
+
+        Returns:
+            Any: Результат функции
+
+        Raises:
+            JobCancelledError: если задача была отменена
+        """
+        try:
+            return await asyncio.shield(self._task)
+        except asyncio.CancelledError:
+            if self._task.cancelled():
+                raise JobCancelledError(f"Задача {self.job_id} отменена") from None
+            # Отменен ожидающий код - отменяем и саму задачу
+            self._task.cancel()
+            raise
+
+
+class JobExecutor:
+    """Пул воркеров для CPU-bound задач с ограничением параллелизма и метриками."""
+
+    def __init__(self, max_workers: Optional[int] = None, pool_type: Optional[str] = None):
+        settings = get_settings_or_defaults()
+        self._max_workers = max_workers or settings.worker_pool_size or os.cpu_count() or 1
+        self._pool_type = pool_type or settings.worker_pool_type
+        self._pool: Optional[Executor] = None
+        self._busy_workers: Optional[Any] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._job_ids = itertools.count(1)
+        self._jobs: Dict[int, Job] = {}
+        self._states: Dict[int, str] = {}
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._warmed_up = False
+
+    @property
+    def pool_type(self) -> str:
+        """Фактический тип пула (process или thread)."""
+        return self._pool_type
+
+    @property
+    def max_workers(self) -> int:
+        """Количество воркеров."""
+        return self._max_workers
+
+    def _get_pool(self) -> Executor:
+        """Получает или создает пул воркеров (с откатом на потоки)."""
+        if self._pool is None:
+            if self._pool_type == "process":
+                try:
+                    # spawn: не копируем потоки и состояние event loop в дочерние процессы
+                    context = multiprocessing.get_context("spawn")
+                    if self._busy_workers is None:
+                        self._busy_workers = context.Value("i", 0)
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self._max_workers,
+                        mp_context=context,
+                        initializer=_init_worker,
+                        initargs=(self._busy_workers,),
+                    )
+                except (OSError, NotImplementedError, ImportError) as e:
+                    logger.warning(f"Не удалось создать пул процессов, используются потоки: {e}")
+                    self._pool_type = "thread"
+
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix="qr-worker"
+                )
+
+            logger.info(f"Пул воркеров создан: тип={self._pool_type}, воркеров={self._max_workers}")
+
+        return self._pool
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Получает семафор, ограничивающий число одновременно выполняемых задач."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_workers)
+        return self._semaphore
+
+    def _add_busy(self, delta: int) -> None:
+        """Обновляет общий для процессов-воркеров счетчик выполняющихся задач."""
+        if self._busy_workers is not None:
+            with self._busy_workers.get_lock():
+                self._busy_workers.value += delta
+
+    def _reset_pool(self) -> None:
+        """Сбрасывает сломанный пул, чтобы следующая задача создала новый."""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, job_id: int, func: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        """Выполняет задачу в пуле, дожидаясь свободного воркера."""
+        async with self._get_semaphore():
+            self._states[job_id] = JOB_RUNNING
+            future = self._get_pool().submit(func, *args, **kwargs)
+            self._add_busy(1)
+            try:
+                return await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                if not future.cancel():
+                    # Запущенную задачу нельзя прервать: держим слот до ее завершения
+                    await asyncio.wait({asyncio.wrap_future(future)})
+                raise
+            except BrokenProcessPool as e:
+                logger.error(f"Пул воркеров поврежден при выполнении задачи {job_id}: {e}")
+                self._reset_pool()
+                raise JobExecutionError(f"Воркер аварийно завершился: {e}") from e
+            finally:
+                self._add_busy(-1)
+
+    def _on_job_done(self, job_id: int, task: "asyncio.Task[Any]") -> None:
+        """Обновляет счетчики и удаляет завершенную задачу из реестра."""
+        self._states.pop(job_id, None)
+        self._jobs.pop(job_id, None)
+        if task.cancelled():
+            self._cancelled += 1
+            logger.info(f"Задача {job_id} отменена")
+        elif task.exception() is not None:
+            self._failed += 1
+        else:
+            self._completed += 1
+
+    def submit(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Job:
+        """
+        Отправляет задачу в пул воркеров.
+
+        Должна вызываться из работающего event loop. В режиме process функция и
+        аргументы должны поддерживать pickle.
+
+        Args:
+            func: Функция для выполнения
+            *args: Позиционные аргументы функции
+            **kwargs: Именованные аргументы функции
+
+        Returns:
+            Job: Дескриптор задачи
+        """
+        job_id = next(self._job_ids)
+        task = asyncio.get_running_loop().create_task(
+            self._run(job_id, func, args, kwargs), name=f"job-{job_id}"
+        )
+        task.add_done_callback(functools.partial(self._on_job_done, job_id))
+        job = Job(job_id, task)
+        self._jobs[job_id] = job
+        self._states[job_id] = JOB_QUEUED
+        logger.debug(f"Задача {job_id} ({getattr(func, '__name__', func)}) поставлена в очередь")
+        return job
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Выполняет функцию в пуле воркеров и ожидает результат.
+
+        Returns:
+            Any: Результат функции
+
+        Raises:
+            JobCancelledError: если задача была отменена
+            JobExecutionError: если воркер аварийно завершился
+        """
+        return await self.submit(func, *args, **kwargs).result()
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        Отменяет задачу по ID.
+
+        Задача в очереди снимается сразу, запущенная - освобождает слот после
+        завершения воркера.
+
+        Args:
+            job_id: ID задачи
+
+        Returns:
+            bool: True если задача найдена и отменена
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        return job.cancel()
+
+    async def warm_up(self, preload_qreader: Optional[bool] = None) -> None:
+        """
+        Запускает все воркеры заранее и прогревает импорты и генерацию QR-кодов.
+
+        Args:
+            preload_qreader: Загрузить модель QReader в воркерах
+                (если None, берется из настроек)
+        """
+        if preload_qreader is None:
+            preload_qreader = get_settings_or_defaults().qreader_preload
+
+        pool = self._get_pool()
+        futures = [
+            asyncio.wrap_future(pool.submit(_warm_up_worker, preload_qreader))
+            for _ in range(self._max_workers)
+        ]
+        try:
+            pids = await asyncio.gather(*futures)
+            self._warmed_up = True
+            logger.info(f"Пул воркеров прогрет: процессов={len(set(pids))}")
+        except BrokenProcessPool as e:
+            logger.warning(f"Пул воркеров поврежден при прогреве: {e}")
+            self._reset_pool()
+        except Exception as e:
+            logger.warning(f"Не удалось прогреть пул воркеров: {e}", exc_info=True)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Возвращает метрики пула.
+
+        Returns:
+            Dict[str, Any]: тип пула, размер, глубина очереди, счетчики задач
+        """
+        states = list(self._states.values())
+        return {
+            "pool_type": self._pool_type,
+            "max_workers": self._max_workers,
+            "queue_depth": states.count(JOB_QUEUED),
+            "running": states.count(JOB_RUNNING),
+            "completed": self._completed,
+            "failed": self._failed,
+            "cancelled": self._cancelled,
+            "warmed_up": self._warmed_up,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Останавливает пул воркеров."""
+        for job in list(self._jobs.values()):
+            job.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+            logger.info("Пул воркеров остановлен")
+
+
+# Глобальный экземпляр пула воркеров
+_executor: Optional[JobExecutor] = None
+
+
+def get_executor() -> JobExecutor:
+    """
+    Получает экземпляр пула воркеров (singleton).
+
+    Returns:
+        JobExecutor: пул воркеров
+    """
+    global _executor
+    if _executor is None:
+        _executor = JobExecutor()
+    return _executor
+
+
+async def run_job(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Выполняет функцию в глобальном пуле воркеров.
+
+    Args:
+        func: Функция для выполнения
+        *args: Позиционные аргументы функции
+        **kwargs: Именованные аргументы функции
+
+    Returns:
+        Any: Результат функции
+    """
+    return await get_executor().run(func, *args, **kwargs)
+
+
+def shutdown_executor(wait: bool = True) -> None:
+    """Останавливает глобальный пул воркеров."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
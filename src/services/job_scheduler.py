@@ -0,0 +1,459 @@
+"""
+Планировщик задач генерации PDF.
+
+Обработчики бота не генерируют PDF сами, а ставят задачу в очередь.
+Планировщик ограничивает число одновременно выполняемых задач (всего и на
+одного пользователя) и выбирает следующую задачу по кругу между
+пользователями, поэтому пользователь с десятью большими файлами не
+задерживает остальных. Задачи хранятся в БД и после перезапуска бота
+ставятся в очередь снова.
+
+Задачи разделены на полосы по оценке стоимости (количество QR-кодов):
+легкие задачи запускаются первыми, а большие не занимают зарезервированные
+для легких слоты, поэтому короткое сообщение не ждет генерации большого
+файла.
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from ..core.config import get_settings
+from ..core.exceptions import JobQueueFullError
+from ..core.logging_config import get_logger
+from ..database.database import get_db
+from ..database.models import JobStatus
+from ..database.repositories import JobRepository
+from .job_executor import get_executor
+
+logger = get_logger(__name__)
+
+# Выполняет задачу по ID
+JobRunner = Callable[[int], Awaitable[None]]
+# Сообщает пользователю позицию задачи в очереди
+PositionNotifier = Callable[[int, int], Awaitable[None]]
+
+
+# Полосы очереди: легкие задачи не ждут завершения больших
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+
+
+class _Lane:
+    """Полоса очереди: задачи пользователей, выбираемые по кругу."""
+
+    def __init__(self, name: str, max_concurrent: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        # Очереди задач пользователей и порядок обхода пользователей
+        self.queues: Dict[int, Deque[int]] = {}
+        self.turns: Deque[int] = deque()
+        # Количество выполняемых задач полосы
+        self.active = 0
+
+    @property
+    def queued(self) -> int:
+        """Количество задач в очереди."""
+        return sum(len(queue) for queue in self.queues.values())
+
+    def user_jobs(self, user_id: int) -> int:
+        """Количество задач пользователя в очереди."""
+        return len(self.queues.get(user_id, ()))
+
+    def enqueue(self, job_id: int, user_id: int) -> None:
+        """Добавляет задачу в очередь пользователя."""
+        self.queues.setdefault(user_id, deque()).append(job_id)
+        if user_id not in self.turns:
+            self.turns.append(user_id)
+
+    def remove(self, job_id: int) -> bool:
+        """Убирает задачу из очереди. Возвращает False, если задачи нет в очереди."""
+        for user_id, queue in self.queues.items():
+            if job_id in queue:
+                queue.remove(job_id)
+                if not queue:
+                    del self.queues[user_id]
+                    self.turns.remove(user_id)
+                return True
+        return False
+
+    def planned_order(self) -> List[int]:
+        """Порядок запуска задач: по одной задаче каждого пользователя по кругу."""
+        queues = [list(self.queues[user_id]) for user_id in self.turns]
+        order = []
+        for index in range(max(map(len, queues), default=0)):
+            order.extend(queue[index] for queue in queues if index < len(queue))
+        return order
+
+    def next_job(
+        self, running: Dict[int, int], per_user_concurrent: int
+    ) -> Optional[Tuple[int, int]]:
+        """
+        Выбирает следующую задачу: первый по кругу пользователь, не достигший лимита.
+
+        Args:
+            running: Количество выполняемых задач пользователей во всех полосах
+            per_user_concurrent: Лимит одновременных задач одного пользователя
+        """
+        if self.active >= self.max_concurrent:
+            return None
+
+        for _ in range(len(self.turns)):
+            user_id = self.turns[0]
+            self.turns.rotate(-1)
+            if running.get(user_id, 0) >= per_user_concurrent:
+                continue
+
+            queue = self.queues[user_id]
+            job_id = queue.popleft()
+            if not queue:
+                del self.queues[user_id]
+                self.turns.remove(user_id)
+            return job_id, user_id
+        return None
+
+
+class JobScheduler:
+    """Очередь задач с ограничением параллелизма и справедливой очередностью."""
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        per_user_concurrent: Optional[int] = None,
+        max_queued_per_user: Optional[int] = None,
+        interactive_max_cost: Optional[int] = None,
+        interactive_reserved: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        settings = get_settings()
+        self._max_concurrent = (
+            max_concurrent or settings.job_max_concurrent or get_executor().max_workers
+        )
+        self._per_user_concurrent = per_user_concurrent or settings.job_per_user_concurrent
+        self._max_queued_per_user = max_queued_per_user or settings.job_max_queued_per_user
+        self._max_attempts = max_attempts or settings.job_max_attempts
+        self._interactive_max_cost = (
+            settings.job_interactive_max_cost
+            if interactive_max_cost is None
+            else interactive_max_cost
+        )
+        if interactive_reserved is None:
+            interactive_reserved = settings.job_interactive_reserved
+        if interactive_reserved >= self._max_concurrent:
+            logger.warning(
+                f"Нельзя зарезервировать {interactive_reserved} из {self._max_concurrent} "
+                f"слотов для легких задач: большим задачам оставлен один слот"
+            )
+
+        # Легкие задачи могут занять все слоты, большие - все, кроме резерва
+        self._lanes: Dict[str, _Lane] = {
+            LANE_INTERACTIVE: _Lane(LANE_INTERACTIVE, self._max_concurrent),
+            LANE_BULK: _Lane(LANE_BULK, max(self._max_concurrent - interactive_reserved, 1)),
+        }
+        # Выполняемые задачи: job_id -> task и (полоса, пользователь)
+        self._tasks: Dict[int, "asyncio.Task[None]"] = {}
+        self._owners: Dict[int, Tuple[_Lane, int]] = {}
+        # Количество выполняемых задач по пользователям во всех полосах: лимит
+        # на пользователя общий, а не отдельный для каждой полосы
+        self._running: Dict[int, int] = {}
+        self._positions: Dict[int, int] = {}
+        # Задачи, отмененные пользователем во время выполнения
+        self._cancelled: Set[int] = set()
+        self._runner: Optional[JobRunner] = None
+        self._notifier: Optional[PositionNotifier] = None
+        self._stopping = False
+
+    async def start(self, runner: JobRunner, notifier: Optional[PositionNotifier] = None) -> int:
+        """
+        Запускает планировщик и восстанавливает незавершенные задачи из БД.
+
+        Задачи, прерванные остановкой бота, запускаются заново, пока число
+        запусков не достигнет max_attempts: задача, на которой бот каждый раз
+        падает, завершается с ошибкой, а не перезапускается бесконечно.
+
+        Args:
+            runner: Функция выполнения задачи
+            notifier: Функция уведомления о позиции в очереди
+
+        Returns:
+            int: Количество восстановленных задач
+        """
+        self._runner = runner
+        self._notifier = notifier
+        self._stopping = False
+
+        db = next(get_db())
+        try:
+            pending = []
+            for job in JobRepository.get_unfinished(db):
+                if job.status == JobStatus.RUNNING and job.attempts >= self._max_attempts:
+                    logger.warning(
+                        f"Задача {job.id} прервана {job.attempts} раз и больше не запускается"
+                    )
+                    JobRepository.set_status(
+                        db,
+                        job.id,
+                        JobStatus.FAILED,
+                        f"Задача прервана перезапуском бота {job.attempts} раз",
+                    )
+                    continue
+                pending.append((job.id, job.user_id, job.cost))
+        finally:
+            db.close()
+
+        for job_id, user_id, cost in pending:
+            self._lanes[self.lane_for_cost(cost)].enqueue(job_id, user_id)
+        if pending:
+            logger.info(f"Восстановлено задач из очереди: {len(pending)}")
+
+        await self._dispatch()
+        return len(pending)
+
+    def lane_for_cost(self, cost: int) -> str:
+        """
+        Определяет полосу очереди по оценке стоимости задачи.
+
+        Args:
+            cost: Оценка стоимости (количество QR-кодов)
+
+        Returns:
+            str: LANE_INTERACTIVE или LANE_BULK
+        """
+        return LANE_INTERACTIVE if cost <= self._interactive_max_cost else LANE_BULK
+
+    def check_capacity(self, user_id: int) -> None:
+        """
+        Проверяет, может ли пользователь поставить еще одну задачу.
+
+        Args:
+            user_id: ID пользователя
+
+        Raises:
+            JobQueueFullError: если у пользователя слишком много задач
+        """
+        active = self._running.get(user_id, 0) + sum(
+            lane.user_jobs(user_id) for lane in self._lanes.values()
+        )
+        if active >= self._max_queued_per_user:
+            raise JobQueueFullError(
+                f"У вас уже {active} задач(и) в обработке. Дождитесь их завершения."
+            )
+
+    async def submit(self, job_id: int, user_id: int, cost: int = 1) -> int:
+        """
+        Ставит задачу в очередь.
+
+        Args:
+            job_id: ID задачи в БД
+            user_id: ID пользователя
+            cost: Оценка стоимости (количество QR-кодов)
+
+        Returns:
+            int: Позиция в очереди (0 - задача уже запущена)
+        """
+        lane = self.lane_for_cost(cost)
+        self._lanes[lane].enqueue(job_id, user_id)
+        await self._dispatch()
+        position = self.position(job_id)
+        if position:
+            self._positions[job_id] = position
+        logger.info(
+            f"Задача {job_id} пользователя {user_id} (стоимость {cost}, полоса {lane}) "
+            f"в очереди, позиция: {position}"
+        )
+        return position
+
+    async def cancel(self, job_id: int) -> bool:
+        """
+        Отменяет задачу.
+
+        Задача из очереди снимается сразу. У выполняемой задачи отменяется
+        корутина: исполнитель задачи освобождает свой CancelToken, и воркер
+        прекращает работу перед следующей порцией.
+
+        Args:
+            job_id: ID задачи
+
+        Returns:
+            bool: True если задача была в очереди или выполнялась
+        """
+        for lane in self._lanes.values():
+            if lane.remove(job_id):
+                self._positions.pop(job_id, None)
+                _set_job_status(job_id, JobStatus.CANCELLED)
+                logger.info(f"Задача {job_id} снята с очереди")
+                await self._notify_positions()
+                return True
+
+        task = self._tasks.get(job_id)
+        if task is None:
+            return False
+        self._cancelled.add(job_id)
+        task.cancel()
+        await asyncio.wait({task})
+        # Если корутина задачи не успела начать работу, слот освобождается здесь
+        await self._finish(job_id)
+        return True
+
+    def position(self, job_id: int) -> int:
+        """
+        Возвращает позицию задачи в очереди.
+
+        Args:
+            job_id: ID задачи
+
+        Returns:
+            int: Позиция с 1 или 0, если задача не в очереди
+        """
+        order = self._planned_order()
+        return order.index(job_id) + 1 if job_id in order else 0
+
+    def _planned_order(self) -> List[int]:
+        """Порядок запуска задач из очереди: сначала легкие, затем большие."""
+        return [job_id for lane in self._lanes.values() for job_id in lane.planned_order()]
+
+    async def _dispatch(self) -> None:
+        """Запускает задачи, пока есть свободные слоты."""
+        if self._runner is None or self._stopping:
+            return
+
+        started = False
+        while len(self._tasks) < self._max_concurrent:
+            for lane in self._lanes.values():
+                next_job = lane.next_job(self._running, self._per_user_concurrent)
+                if next_job is not None:
+                    break
+            else:
+                break
+
+            job_id, user_id = next_job
+            lane.active += 1
+            self._running[user_id] = self._running.get(user_id, 0) + 1
+            self._owners[job_id] = (lane, user_id)
+            self._positions.pop(job_id, None)
+            self._tasks[job_id] = asyncio.get_running_loop().create_task(
+                self._run(job_id), name=f"queued-job-{job_id}"
+            )
+            started = True
+
+        if started:
+            await self._notify_positions()
+
+    async def _notify_positions(self) -> None:
+        """Сообщает пользователям новые позиции задач в очереди."""
+        for position, job_id in enumerate(self._planned_order(), 1):
+            if self._positions.get(job_id) == position:
+                continue
+            self._positions[job_id] = position
+            if self._notifier is not None:
+                try:
+                    await self._notifier(job_id, position)
+                except Exception as e:
+                    logger.warning(f"Не удалось сообщить позицию задачи {job_id}: {e}")
+
+    async def _run(self, job_id: int) -> None:
+        """Выполняет задачу и обновляет ее статус в БД."""
+        try:
+            _set_job_status(job_id, JobStatus.RUNNING)
+            await self._runner(job_id)
+            _set_job_status(job_id, JobStatus.DONE)
+        except asyncio.CancelledError:
+            # При остановке бота задача остается в статусе running и будет
+            # запущена заново после перезапуска
+            raise
+        except Exception as e:
+            logger.error(f"Задача {job_id} завершилась с ошибкой: {e}", exc_info=True)
+            _set_job_status(job_id, JobStatus.FAILED, str(e))
+        finally:
+            await self._finish(job_id)
+
+    async def _finish(self, job_id: int) -> None:
+        """Освобождает слот завершенной задачи и запускает следующие."""
+        if self._tasks.pop(job_id, None) is None:
+            return
+        lane, user_id = self._owners.pop(job_id)
+        lane.active -= 1
+        self._running[user_id] -= 1
+        if not self._running[user_id]:
+            del self._running[user_id]
+        if job_id in self._cancelled:
+            self._cancelled.discard(job_id)
+            logger.info(f"Задача {job_id} отменена во время выполнения")
+            _set_job_status(job_id, JobStatus.CANCELLED)
+        await self._dispatch()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Возвращает метрики очереди.
+
+        Returns:
+            Dict[str, Any]: лимиты, количество задач в очереди и выполняемых задач
+            (всего и по полосам)
+        """
+        lanes = self._lanes.values()
+        return {
+            "max_concurrent": self._max_concurrent,
+            "per_user_concurrent": self._per_user_concurrent,
+            "queued": sum(lane.queued for lane in lanes),
+            "running": len(self._tasks),
+            "users": len(set().union(*(set(lane.queues) for lane in lanes), self._running)),
+            "lanes": {
+                lane.name: {
+                    "max_concurrent": lane.max_concurrent,
+                    "queued": lane.queued,
+                    "running": lane.active,
+                }
+                for lane in lanes
+            },
+        }
+
+    async def shutdown(self) -> None:
+        """
+        Останавливает планировщик; незавершенные задачи остаются в БД.
+
+        Выполняемые задачи отменяются, и планировщик дожидается их завершения,
+        чтобы они освободили ресурсы до остановки пула воркеров и БД.
+        """
+        self._stopping = True
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info("Планировщик задач остановлен")
+
+
+def _set_job_status(job_id: int, status: JobStatus, error_message: Optional[str] = None) -> None:
+    """Сохраняет статус задачи в БД."""
+    db = next(get_db())
+    try:
+        JobRepository.set_status(db, job_id, status, error_message)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Не удалось сохранить статус задачи {job_id}: {e}")
+    finally:
+        db.close()
+
+
+# Глобальный экземпляр планировщика
+_scheduler: Optional[JobScheduler] = None
+
+
+def get_scheduler() -> JobScheduler:
+    """
+    Получает экземпляр планировщика задач (singleton).
+
+    Returns:
+        JobScheduler: планировщик задач
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = JobScheduler()
+    return _scheduler
+
+
+async def shutdown_scheduler() -> None:
+    """Останавливает глобальный планировщик задач."""
+    global _scheduler
+    if _scheduler is not None:
+        scheduler, _scheduler = _scheduler, None
+        await scheduler.shutdown()
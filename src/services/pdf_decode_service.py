@@ -0,0 +1,177 @@
+"""
+Сервис для декодирования QR-кодов из PDF-документов.
+
+Документ распознается одной задачей в одном воркере: страницы отрисовываются
+и распознаются по очереди, поэтому в памяти одновременно находится только
+одна отрисованная страница, а большой PDF занимает один слот пула воркеров.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from PIL import Image
+
+# pypdfium2 - опциональная библиотека для отрисовки PDF
+try:
+    import pypdfium2 as pdfium
+
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+    pdfium = None
+
+from ..core.config import get_settings
+from ..core.exceptions import QRCodeDecodeError
+from ..core.logging_config import get_logger
+from ..utils.cancellation import CancelToken
+from .qr_decode_service import DecodeResult, decode_qr_image
+
+logger = get_logger(__name__)
+
+# Разрешение PDF в точках на дюйм
+PDF_POINTS_PER_INCH = 72
+
+
+class PageOutcome(NamedTuple):
+    """Результат распознавания страницы PDF."""
+
+    result: Optional[DecodeResult]
+    error: Optional[str] = None
+
+
+def _open_pdf(pdf_path: str):
+    """Открывает PDF-документ."""
+    if not PDFIUM_AVAILABLE:
+        raise QRCodeDecodeError(
+            "Распознавание PDF недоступно: библиотека pypdfium2 не установлена."
+        )
+    try:
+        return pdfium.PdfDocument(pdf_path)
+    except Exception as e:
+        raise QRCodeDecodeError(f"Не удалось открыть PDF: {e}") from e
+
+
+def count_pdf_pages(pdf_path: str) -> int:
+    """
+    Возвращает количество страниц PDF.
+
+    Args:
+        pdf_path: Путь к PDF-файлу
+
+    Returns:
+        int: Количество страниц
+
+    Raises:
+        QRCodeDecodeError: если PDF не удалось открыть
+    """
+    document = _open_pdf(pdf_path)
+    try:
+        return len(document)
+    finally:
+        document.close()
+
+
+def render_pdf_page(pdf_path: str, page_index: int, dpi: Optional[int] = None) -> Image.Image:
+    """
+    Отрисовывает страницу PDF в изображение.
+
+    Args:
+        pdf_path: Путь к PDF-файлу
+        page_index: Номер страницы (с нуля)
+        dpi: Разрешение (если None, берется из настроек)
+
+    Returns:
+        Image.Image: Страница в оттенках серого
+
+    Raises:
+        QRCodeDecodeError: если PDF не удалось открыть
+    """
+    if dpi is None:
+        dpi = get_settings().pdf_decode_dpi
+
+    document = _open_pdf(pdf_path)
+    try:
+        page = document[page_index]
+        try:
+            bitmap = page.render(scale=dpi / PDF_POINTS_PER_INCH, grayscale=True)
+            return bitmap.to_pil().convert("L")
+        finally:
+            page.close()
+    finally:
+        document.close()
+
+
+def decode_pdf_page(
+    pdf_path: str,
+    page_index: int,
+    dpi: Optional[int] = None,
+    rankings: Optional[Dict[str, Sequence[str]]] = None,
+) -> DecodeResult:
+    """
+    Отрисовывает страницу PDF и распознает QR-коды на ней.
+
+    Args:
+        pdf_path: Путь к PDF-файлу
+        page_index: Номер страницы (с нуля)
+        dpi: Разрешение (если None, берется из настроек)
+        rankings: Методы в порядке убывания успешности (см. decode_qr_image)
+
+    Returns:
+        DecodeResult: Результат декодирования страницы
+
+    Raises:
+        QRCodeDecodeError: если на странице не найдены QR-коды
+    """
+    image = render_pdf_page(pdf_path, page_index, dpi)
+    logger.info(f"Страница {page_index + 1} PDF отрисована: размер={image.size}")
+    return decode_qr_image(image, rankings)
+
+
+def decode_pdf_document(
+    pdf_path: str,
+    max_pages: Optional[int] = None,
+    dpi: Optional[int] = None,
+    rankings: Optional[Dict[str, Sequence[str]]] = None,
+    cancel_token: Optional[CancelToken] = None,
+) -> Tuple[int, List[PageOutcome]]:
+    """
+    Распознает QR-коды на страницах PDF по очереди.
+
+    Ошибка на одной странице не прерывает распознавание остальных. Перед
+    каждой страницей проверяется отмена задачи.
+
+    Args:
+        pdf_path: Путь к PDF-файлу
+        max_pages: Максимум распознаваемых страниц (если None, берется из настроек)
+        dpi: Разрешение (если None, берется из настроек)
+        rankings: Методы в порядке убывания успешности (см. decode_qr_image)
+        cancel_token: Признак отмены задачи
+
+    Returns:
+        Tuple[int, List[PageOutcome]]: Количество страниц в документе и
+            результаты распознанных страниц
+
+    Raises:
+        QRCodeDecodeError: если PDF не удалось открыть
+        JobCancelledError: если задача отменена
+    """
+    if max_pages is None:
+        max_pages = get_settings().pdf_decode_max_pages
+
+    page_count = count_pdf_pages(pdf_path)
+    if page_count > max_pages:
+        logger.warning(f"PDF содержит {page_count} страниц, распознаются первые {max_pages}")
+
+    outcomes = []
+    for page_index in range(min(page_count, max_pages)):
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        try:
+            outcomes.append(PageOutcome(decode_pdf_page(pdf_path, page_index, dpi, rankings)))
+        except QRCodeDecodeError as e:
+            outcomes.append(PageOutcome(None, str(e)))
+        except Exception as e:
+            logger.error(
+                f"Ошибка при распознавании страницы {page_index + 1} PDF: {e}", exc_info=True
+            )
+            outcomes.append(PageOutcome(None, str(e)))
+    return page_count, outcomes
@@ -3,158 +3,325 @@
 """
 
 import io
-from typing import List, Optional, Union
+import itertools
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sized, Tuple, Union
 from fpdf import FPDF
-from qrcode.image.pil import PilImage
 
-from ..core.exceptions import PDFGenerationError
+from ..core.config import get_settings_or_defaults
+from ..core.exceptions import FileProcessingError, JobCancelledError, PDFGenerationError
 from ..core.logging_config import get_logger
-from .qr_service import generate_qr_codes, qr_image_to_bytes
+from ..utils.cancellation import CancelToken
+from ..utils.progress import ProgressCallback, ProgressTracker
+from .excel_service import iter_data_from_excel
+from .qr_service import generate_qr_codes, generate_qr_matrices, qr_image_to_bytes, unpack_matrix
 
 logger = get_logger(__name__)
 
+# Прямоугольник в единицах модулей: (колонка, строка, ширина, высота)
+ModuleRect = Tuple[int, int, int, int]
 
-def create_qr_pdf(
-    data_items: List[str],
+# В режиме auto PDF выводится растровым, если повторы составляют не меньше этой доли записей
+AUTO_RASTER_DUPLICATE_SHARE = 0.5
+
+
+def matrix_to_rects(matrix: List[List[bool]]) -> List[ModuleRect]:
+    """
+    Сворачивает матрицу модулей в закрашенные прямоугольники.
+
+    Темные модули объединяются в горизонтальные отрезки по строкам, а одинаковые
+    отрезки соседних строк - в один прямоугольник.
+
+    Args:
+        matrix: Матрица модулей (True - темный модуль)
+
+    Returns:
+        List[ModuleRect]: Список прямоугольников (колонка, строка, ширина, высота)
+    """
+    rects: List[ModuleRect] = []
+    # Открытые прямоугольники: (начало, длина) -> (строка начала, высота)
+    open_runs: dict = {}
+
+    for row_index, row in enumerate(matrix):
+        runs = []
+        col = 0
+        size = len(row)
+        while col < size:
+            if row[col]:
+                start = col
+                while col < size and row[col]:
+                    col += 1
+                runs.append((start, col - start))
+            else:
+                col += 1
+
+        next_open = {}
+        for run in runs:
+            if run in open_runs:
+                start_row, height = open_runs.pop(run)
+                next_open[run] = (start_row, height + 1)
+            else:
+                next_open[run] = (row_index, 1)
+        for (start, length), (start_row, height) in open_runs.items():
+            rects.append((start, start_row, length, height))
+        open_runs = next_open
+
+    for (start, length), (start_row, height) in open_runs.items():
+        rects.append((start, start_row, length, height))
+    return rects
+
+
+def draw_qr_vector(
+    pdf: FPDF, rects: List[ModuleRect], modules: int, x: float, y: float, size: float
+) -> None:
+    """
+    Рисует QR-код векторными прямоугольниками прямо в поток страницы.
+
+    Args:
+        pdf: Документ FPDF
+        rects: Прямоугольники модулей (см. matrix_to_rects)
+        modules: Количество модулей по стороне (с рамкой)
+        x: Позиция X левого верхнего угла в мм
+        y: Позиция Y левого верхнего угла в мм
+        size: Размер QR-кода в мм
+    """
+    module = size / modules
+    for col, row, run_width, run_height in rects:
+        pdf.rect(
+            x + col * module, y + row * module, run_width * module, run_height * module, style="F"
+        )
+
+
+def _calculate_layout(
+    width: float, height: float, rows_per_page: int, columns_per_page: int
+) -> Tuple[float, List[Tuple[float, float]]]:
+    """
+    Рассчитывает размер QR-кода и позиции ячеек сетки на странице.
+
+    Args:
+        width: Ширина страницы в мм
+        height: Высота страницы в мм
+        rows_per_page: Количество строк на странице
+        columns_per_page: Количество колонок на странице
+
+    Returns:
+        Tuple[float, List[Tuple[float, float]]]: (размер QR-кода, позиции (x, y) по порядку
+            заполнения страницы - слева направо, сверху вниз)
+    """
+    # Отступы от краев страницы
+    margin_x = 5
+    top_margin = 10  # Отступ сверху
+    bottom_margin = 5
+
+    # Рассчитываем доступное пространство
+    available_width = width - (2 * margin_x)
+    available_height = height - top_margin - bottom_margin
+
+    # Рассчитываем размер QR-кода (квадратный)
+    # Для равномерного распределения используем весь доступный размер
+    qr_size_by_width = (
+        available_width / columns_per_page if columns_per_page > 0 else available_width
+    )
+    qr_size_by_height = available_height / rows_per_page if rows_per_page > 0 else available_height
+    qr_size = min(qr_size_by_width, qr_size_by_height)
+
+    # Распределение колонок по горизонтали
+    column_positions = []
+    if columns_per_page == 1:
+        # 1 колонка - по центру
+        column_positions = [margin_x + (available_width - qr_size) / 2]
+    elif columns_per_page == 2:
+        # 2 колонки - первая у левого края, вторая у правого края
+        column_positions = [margin_x, width - margin_x - qr_size]
+    else:
+        # 3+ колонки - крайние у краев, остальные равномерно между ними
+        total_columns_width = qr_size * columns_per_page
+        total_horizontal_spacing = available_width - total_columns_width
+        horizontal_spacing = (
+            total_horizontal_spacing / (columns_per_page - 1) if columns_per_page > 1 else 0
+        )
+
+        # Первая колонка у левого края
+        column_positions.append(margin_x)
+
+        # Промежуточные колонки равномерно распределены
+        for col in range(1, columns_per_page - 1):
+            x_pos = margin_x + col * (qr_size + horizontal_spacing)
+            column_positions.append(x_pos)
+
+        # Последняя колонка у правого края
+        column_positions.append(width - margin_x - qr_size)
+
+    # Распределение строк по вертикали
+    if rows_per_page > 1:
+        # Равномерно распределяем строки с одинаковыми промежутками
+        # между top_margin и bottom_margin
+        total_rows_height = qr_size * rows_per_page
+        total_spacing_height = available_height - total_rows_height
+        vertical_spacing = total_spacing_height / (rows_per_page - 1)
+        row_positions = [
+            top_margin + row * (qr_size + vertical_spacing) for row in range(rows_per_page)
+        ]
+    else:
+        # Если одна строка, центрируем по вертикали
+        row_positions = [top_margin + (available_height - qr_size) / 2]
+
+    slots = [(x_pos, y_pos) for y_pos in row_positions for x_pos in column_positions]
+    return qr_size, slots
+
+
+def _iter_batches(data_items: Iterable[str], batch_size: int) -> Iterator[List[str]]:
+    """Разбивает поток данных на списки по batch_size элементов."""
+    iterator = iter(data_items)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _resolve_render_mode(render_mode: str, data_items: Iterable[str]) -> str:
+    """
+    Выбирает способ вывода для режима auto.
+
+    Векторный вывод рисует каждый код заново, даже повторный, а растровый
+    встраивает одинаковые PNG одним изображением. Поэтому при большом
+    количестве повторов растровый PDF заметно меньше. Для источников без
+    длины (генераторы) повторы заранее неизвестны, и выбирается vector.
+
+    Args:
+        render_mode: "vector", "raster" или "auto"
+        data_items: Данные для QR-кодов
+
+    Returns:
+        str: "vector" или "raster"
+    """
+    if render_mode != "auto":
+        return render_mode
+    if not isinstance(data_items, Sized) or not len(data_items):
+        return "vector"
+    duplicate_share = 1 - len(set(data_items)) / len(data_items)
+    return "raster" if duplicate_share >= AUTO_RASTER_DUPLICATE_SHARE else "vector"
+
+
+def create_qr_pdf_stream(
+    data_items: Iterable[str],
     width: float = 75.0,
     height: float = 120.0,
     rows_per_page: int = 5,
     columns_per_page: int = 1,
-    output_file: Optional[io.BytesIO] = None,
-) -> io.BytesIO:
+    output_file: Optional[BinaryIO] = None,
+    render_mode: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    cancel_token: Optional[CancelToken] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> BinaryIO:
     """
-    Создает PDF файл с QR-кодами в виде сетки.
+    Создает PDF файл с QR-кодами, генерируя коды порциями по мере раскладки.
+
+    Данные читаются из итератора порциями (целое число страниц): матрицы или
+    изображения QR-кодов порции генерируются, размещаются на страницах и
+    освобождаются до перехода к следующей порции, поэтому в памяти не
+    накапливаются ни данные, ни коды всех записей. Сам документ FPDF (потоки
+    страниц, а в режиме raster - изображения) хранится в памяти до вывода и
+    растет с количеством записей.
 
     Args:
-        data_items: Список данных для QR-кодов
+        data_items: Итерируемый источник данных для QR-кодов (список, генератор)
         width: Ширина страницы в мм
         height: Высота страницы в мм
         rows_per_page: Количество строк на странице
         columns_per_page: Количество колонок на странице
-        output_file: BytesIO объект для вывода (если None, создается новый)
+        output_file: Файловый объект для вывода (если None, создается новый BytesIO)
+        render_mode: "vector" - прямоугольники в потоке страницы, "raster" - PNG-изображения
+            (повторы встраиваются одним изображением), "auto" - raster при большом
+            количестве повторов (если None, берется из настроек)
+        batch_size: Количество кодов в порции, округляется вверх до целых страниц
+            (если None, берется из настроек)
+        cancel_token: Признак отмены, проверяемый перед каждой порцией
+        progress: Callback хода выполнения: готовые QR-коды (по частям генерации),
+            страницы и оценка оставшегося времени
 
     Returns:
-        io.BytesIO: BytesIO объект с PDF
+        BinaryIO: Файловый объект с PDF, позиция в начале
 
     Raises:
         PDFGenerationError: если не удалось создать PDF
+        JobCancelledError: если задача отменена
     """
     try:
-        if not data_items:
-            raise PDFGenerationError("Список данных пуст")
+        settings = get_settings_or_defaults()
+        if render_mode is None:
+            render_mode = settings.pdf_render_mode
+        render_mode = _resolve_render_mode(render_mode, data_items)
+        if batch_size is None:
+            batch_size = settings.stream_batch_size
 
-        # Генерируем QR-коды
-        logger.info(f"Генерация {len(data_items)} QR-кодов...")
-        qr_images = generate_qr_codes(data_items)
+        qr_size, slots = _calculate_layout(width, height, rows_per_page, columns_per_page)
+        per_page = len(slots)
+        pages_per_batch = max(1, -(-batch_size // per_page))
 
         # Создаем PDF
         pdf = FPDF(orientation="P", unit="mm", format=(width, height))
+        pdf.set_fill_color(0, 0, 0)
 
-        # Отступы от краев страницы
-        margin_x = 5
-        top_margin = 10  # Отступ сверху
-        bottom_margin = 5
-
-        # Рассчитываем доступное пространство
-        available_width = width - (2 * margin_x)
-        available_height = height - top_margin - bottom_margin
-
-        # Рассчитываем размер QR-кода (квадратный)
-        # Для равномерного распределения используем весь доступный размер
-        qr_size_by_width = (
-            available_width / columns_per_page if columns_per_page > 0 else available_width
-        )
-        qr_size_by_height = (
-            available_height / rows_per_page if rows_per_page > 0 else available_height
+        total_items = 0
+        page_count = 0
+        tracker = ProgressTracker(
+            progress, len(data_items) if isinstance(data_items, Sized) else None
         )
-        qr_size = min(qr_size_by_width, qr_size_by_height)
-
-        # Равномерное распределение строк по вертикали
-        # Используем весь доступный промежуток между top_margin и bottom_margin
-        if rows_per_page > 1:
-            # Равномерно распределяем строки с одинаковыми промежутками
-            total_rows_height = qr_size * rows_per_page
-            total_spacing_height = available_height - total_rows_height
-            vertical_spacing = (
-                total_spacing_height / (rows_per_page - 1) if rows_per_page > 1 else 0
-            )
-        else:
-            vertical_spacing = 0
-
-        # Распределение колонок по горизонтали
-        column_positions = []
-        if columns_per_page == 1:
-            # 1 колонка - по центру
-            column_positions = [margin_x + (available_width - qr_size) / 2]
-        elif columns_per_page == 2:
-            # 2 колонки - первая у левого края, вторая у правого края
-            column_positions = [margin_x, width - margin_x - qr_size]
-        else:
-            # 3+ колонки - крайние у краев, остальные равномерно между ними
-            total_columns_width = qr_size * columns_per_page
-            total_horizontal_spacing = available_width - total_columns_width
-            horizontal_spacing = (
-                total_horizontal_spacing / (columns_per_page - 1) if columns_per_page > 1 else 0
-            )
-
-            # Первая колонка у левого края
-            column_positions.append(margin_x)
-
-            # Промежуточные колонки равномерно распределены
-            for col in range(1, columns_per_page - 1):
-                x_pos = margin_x + col * (qr_size + horizontal_spacing)
-                column_positions.append(x_pos)
-
-            # Последняя колонка у правого края
-            column_positions.append(width - margin_x - qr_size)
 
-        # Начальная позиция Y для первой строки
-        start_y = top_margin
+        for batch in _iter_batches(data_items, per_page * pages_per_batch):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
 
-        # Счетчики для позиционирования
-        current_row = 0
-        current_col = 0
-        page_count = 0
-
-        # Создаем первую страницу
-        pdf.add_page()
-        page_count = 1
-        logger.debug("Создана первая страница")
-
-        for i, qr_image in enumerate(qr_images, 1):
-            # Если текущая строка заполнена, создаем новую страницу
-            if current_row >= rows_per_page:
-                pdf.add_page()
-                current_row = 0
-                current_col = 0
-                page_count += 1
-                logger.debug(f"Создана страница {page_count}")
-
-            # Рассчитываем позицию QR-кода
-            # X позиция из предварительно рассчитанных позиций колонок
-            x_pos = column_positions[current_col]
-
-            # Y позиция - равномерное распределение строк
-            if rows_per_page > 1:
-                y_pos = start_y + current_row * (qr_size + vertical_spacing)
+            # Генерируем QR-коды порции один раз на каждое уникальное значение
+            unique_items = list(dict.fromkeys(batch))
+            logger.debug(
+                f"Генерация {len(unique_items)} уникальных QR-кодов для {len(batch)} "
+                f"записей ({render_mode})"
+            )
+            if render_mode == "vector":
+                # Прямоугольники модулей и количество модулей по стороне
+                qr_codes = {
+                    data: (matrix_to_rects(unpack_matrix(packed)), packed.size)
+                    for data, packed in zip(
+                        unique_items, generate_qr_matrices(unique_items, progress=tracker)
+                    )
+                }
             else:
-                # Если одна строка, центрируем по вертикали
-                y_pos = top_margin + (available_height - qr_size) / 2
-
-            # Конвертируем QR-код в байты
-            img_bytes = qr_image_to_bytes(qr_image)
-
-            # Сохраняем во временный файл для FPDF
-            temp_file = io.BytesIO(img_bytes)
-
-            # Добавляем QR-код на страницу
-            pdf.image(temp_file, x=x_pos, y=y_pos, w=qr_size, h=qr_size)
-
-            # Переходим к следующей позиции
-            current_col += 1
-            if current_col >= columns_per_page:
-                current_col = 0
-                current_row += 1
+                # PNG кодируется один раз; одинаковые байты FPDF встраивает одним XObject
+                qr_codes = {
+                    data: qr_image_to_bytes(img)
+                    for data, img in zip(
+                        unique_items, generate_qr_codes(unique_items, progress=tracker)
+                    )
+                }
+
+            for i, data in enumerate(batch):
+                slot = i % per_page
+                if slot == 0:
+                    pdf.add_page()
+                    page_count += 1
+                    logger.debug(f"Создана страница {page_count}")
+
+                x_pos, y_pos = slots[slot]
+                if render_mode == "vector":
+                    # Рисуем модули прямоугольниками без PNG-кодирования
+                    rects, modules = qr_codes[data]
+                    draw_qr_vector(pdf, rects, modules, x_pos, y_pos, qr_size)
+                else:
+                    # Добавляем QR-код на страницу (повторы ссылаются на тот же XObject)
+                    pdf.image(io.BytesIO(qr_codes[data]), x=x_pos, y=y_pos, w=qr_size, h=qr_size)
+
+            total_items += len(batch)
+            # Освобождаем коды порции до генерации следующей
+            del qr_codes
+            # Повторы порции готовы вместе с первым вхождением
+            tracker.advance(items=len(batch) - len(unique_items), pages=-(-len(batch) // per_page))
+
+        if total_items == 0:
+            raise PDFGenerationError("Список данных пуст")
 
         # Создаем выходной буфер
         if output_file is None:
@@ -164,14 +331,161 @@ def create_qr_pdf(
         pdf.output(output_file)
         output_file.seek(0)
 
-        total_pages = page_count
         logger.info(
-            f"PDF файл создан: {len(data_items)} QR-кодов на {total_pages} страницах (сетка {rows_per_page}x{columns_per_page})"
+            f"PDF файл создан: {total_items} QR-кодов на {page_count} страницах "
+            f"(сетка {rows_per_page}x{columns_per_page}, {render_mode})"
         )
         return output_file
 
-    except PDFGenerationError:
+    except (PDFGenerationError, JobCancelledError, FileProcessingError):
+        # Ошибки источника данных (например, лимит строк Excel) передаются как есть
         raise
     except Exception as e:
         logger.error(f"Ошибка при создании PDF: {e}", exc_info=True)
         raise PDFGenerationError(f"Не удалось создать PDF файл: {e}") from e
+
+
+def create_qr_pdf(
+    data_items: List[str],
+    width: float = 75.0,
+    height: float = 120.0,
+    rows_per_page: int = 5,
+    columns_per_page: int = 1,
+    output_file: Optional[BinaryIO] = None,
+    render_mode: Optional[str] = None,
+) -> BinaryIO:
+    """
+    Создает PDF файл с QR-кодами в виде сетки.
+
+    Args:
+        data_items: Список данных для QR-кодов
+        width: Ширина страницы в мм
+        height: Высота страницы в мм
+        rows_per_page: Количество строк на странице
+        columns_per_page: Количество колонок на странице
+        output_file: Файловый объект для вывода (если None, создается новый BytesIO)
+        render_mode: "vector" - прямоугольники в потоке страницы, "raster" - PNG-изображения
+            (повторы встраиваются одним изображением), "auto" - raster при большом
+            количестве повторов (если None, берется из настроек)
+
+    Returns:
+        BinaryIO: Файловый объект с PDF, позиция в начале
+
+    Raises:
+        PDFGenerationError: если не удалось создать PDF
+    """
+    if not data_items:
+        raise PDFGenerationError("Список данных пуст")
+
+    logger.info(f"Генерация {len(data_items)} QR-кодов...")
+    return create_qr_pdf_stream(
+        data_items,
+        width=width,
+        height=height,
+        rows_per_page=rows_per_page,
+        columns_per_page=columns_per_page,
+        output_file=output_file,
+        render_mode=render_mode,
+    )
+
+
+def export_qr_pdf(
+    data_items: Iterable[str],
+    spool_path: str,
+    spool_threshold: Optional[int] = None,
+    **layout,
+) -> Optional[bytes]:
+    """
+    Создает PDF и передает его из воркера в памяти или через файл на диске.
+
+    PDF выводится сразу в spool_path, без промежуточного буфера в памяти.
+    Небольшой PDF затем читается и возвращается байтами; PDF больше порога
+    остается на диске, чтобы не копировать его между процессами и не держать
+    целиком в памяти бота при отправке. Если задача отменена или PDF не
+    создан, файл в spool_path не остается.
+
+    Args:
+        data_items: Данные для QR-кодов
+        spool_path: Путь к временному файлу для больших PDF
+        spool_threshold: Порог в байтах (если None, берется из настроек)
+        **layout: Параметры create_qr_pdf_stream (размеры, сетка, render_mode,
+            cancel_token, progress)
+
+    Returns:
+        Optional[bytes]: Байты PDF или None, если PDF записан в spool_path
+
+    Raises:
+        PDFGenerationError: если не удалось создать PDF
+        JobCancelledError: если задача отменена (см. cancel_token)
+    """
+    if spool_threshold is None:
+        spool_threshold = get_settings_or_defaults().get_pdf_spool_threshold_bytes()
+
+    # Задача, отмененная в очереди, не создает файл заново: владелец его уже удалил
+    cancel_token = layout.get("cancel_token")
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
+    try:
+        with open(spool_path, "w+b") as spool_file:
+            create_qr_pdf_stream(data_items, output_file=spool_file, **layout)
+            size = spool_file.seek(0, io.SEEK_END)
+            if size <= spool_threshold:
+                spool_file.seek(0)
+                return spool_file.read()
+    except OSError as e:
+        Path(spool_path).unlink(missing_ok=True)
+        logger.error(f"Ошибка записи PDF во временный файл {spool_path}: {e}")
+        raise PDFGenerationError(f"Не удалось сохранить PDF файл: {e}") from e
+    except (PDFGenerationError, JobCancelledError):
+        # Недописанный PDF не остается во временном каталоге
+        Path(spool_path).unlink(missing_ok=True)
+        raise
+
+    logger.info(f"PDF ({size} байт) записан во временный файл")
+    return None
+
+
+def export_excel_qr_pdf(
+    excel_file: Union[io.BytesIO, str],
+    spool_path: str,
+    spool_threshold: Optional[int] = None,
+    **layout,
+) -> Tuple[int, Optional[bytes]]:
+    """
+    Создает PDF с QR-кодами из первой колонки Excel файла одним вызовом.
+
+    Значения читаются из листа потоково и сразу передаются в генерацию PDF,
+    поэтому список всех записей не создается и не передается между процессами.
+
+    Args:
+        excel_file: Путь к файлу или BytesIO объект
+        spool_path: Путь к временному файлу для больших PDF
+        spool_threshold: Порог в байтах (если None, берется из настроек)
+        **layout: Параметры create_qr_pdf_stream (см. export_qr_pdf)
+
+    Returns:
+        Tuple[int, Optional[bytes]]: Количество записей (0 - в колонке нет
+            данных, PDF не создан) и результат export_qr_pdf
+
+    Raises:
+        ExcelProcessingError: если файл не удалось прочитать или превышен лимит строк
+        PDFGenerationError: если не удалось создать PDF
+        JobCancelledError: если задача отменена (см. cancel_token)
+    """
+    items = iter_data_from_excel(excel_file)
+    first = next(items, None)
+    if first is None:
+        return 0, None
+
+    count = 0
+
+    def counted() -> Iterator[str]:
+        nonlocal count
+        for item in itertools.chain([first], items):
+            count += 1
+            yield item
+
+    pdf_bytes = export_qr_pdf(counted(), spool_path, spool_threshold, **layout)
+    logger.info(f"Прочитано {count} записей из Excel файла")
+    return count, pdf_bytes
@@ -2,9 +2,15 @@
 Сервис для декодирования QR-кодов из изображений.
 """
 
+import abc
 import io
-from typing import List, Optional
-from PIL import Image, ImageEnhance, ImageFilter
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+from PIL import Image
 from pyzbar import pyzbar
 from pyzbar.pyzbar import ZBarSymbol
 
@@ -17,8 +23,28 @@ except ImportError:
     QRREADER_AVAILABLE = False
     QReader = None
 
-from ..core.exceptions import QRCodeDecodeError
+# OpenCV устанавливается вместе с qreader, но не является обязательным
+try:
+    import cv2
+
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+    cv2 = None
+
+from ..core.config import get_settings
+from ..core.exceptions import QRCodeDecodeError, QRCodeDecodeTimeoutError
 from ..core.logging_config import get_logger
+from ..utils.deadline import Deadline
+from .image_preprocessing import (
+    ImageVariants,
+    binarize_sauvola,
+    describe_image,
+    image_features,
+    iter_decode_variants,
+    iter_jpeg_drafts,
+)
+from .tiling import DetectedCode, TileBox, make_tiles, merge_detections, reading_order
 
 logger = get_logger(__name__)
 
@@ -52,186 +78,560 @@ def _check_dependencies():
 # Выполняем проверку при импорте модуля
 _dependencies_ok = _check_dependencies()
 
+# Пул экземпляров QReader процесса: модель загружается один раз и переиспользуется
+_qreader_pool: "queue.Queue[QReader]" = queue.Queue()
+_qreader_lock = threading.Lock()
+_qreader_count = 0
 
-def decode_qr_from_image(image_bytes: bytes) -> List[str]:
+
+def _create_qreader() -> Optional["QReader"]:
+    """Создает экземпляр QReader, если размер пула это позволяет."""
+    global _qreader_count
+    with _qreader_lock:
+        if _qreader_count >= get_settings().qreader_pool_size:
+            return None
+        _qreader_count += 1
+
+    try:
+        logger.info("Загрузка модели QReader...")
+        return QReader()
+    except Exception:
+        with _qreader_lock:
+            _qreader_count -= 1
+        raise
+
+
+@contextmanager
+def _acquire_qreader() -> Iterator["QReader"]:
     """
-    Декодирует QR-коды из изображения.
+    Выдает экземпляр QReader из пула процесса.
 
-    Args:
-        image_bytes: Изображение в виде байтов
+    Экземпляры создаются лениво, пока не достигнут размер пула, затем
+    ожидается освобождение одного из них.
 
-    Returns:
-        List[str]: Список данных, извлеченных из QR-кодов
+    Yields:
+        QReader: экземпляр детектора
+    """
+    try:
+        qreader = _qreader_pool.get_nowait()
+    except queue.Empty:
+        qreader = _create_qreader() or _qreader_pool.get()
 
-    Raises:
-        QRCodeDecodeError: если не удалось декодировать QR-коды
+    try:
+        yield qreader
+    finally:
+        _qreader_pool.put(qreader)
+
+
+def preload_qreader() -> bool:
     """
+    Загружает модель QReader и прогоняет пустое изображение через детектор.
+
+    Returns:
+        bool: True если QReader загружен
+    """
+    if not QRREADER_AVAILABLE:
+        logger.debug("qreader не доступен, предзагрузка пропущена")
+        return False
+
     try:
-        # Проверяем доступность зависимостей
-        if not _dependencies_ok:
-            logger.error("Библиотеки для декодирования QR-кодов не установлены")
-            raise QRCodeDecodeError(
-                "Библиотеки для декодирования QR-кодов не установлены. Установите pyzbar."
-            )
+        import numpy as np
 
-        # Открываем изображение
-        image = Image.open(io.BytesIO(image_bytes))
-        logger.info(
-            f"Открыто изображение: размер={image.size}, режим={image.mode}, формат={image.format}"
-        )
+        with _acquire_qreader() as qreader:
+            qreader.detect_and_decode(np.full((64, 64, 3), 255, dtype=np.uint8))
+        logger.info("Модель QReader загружена")
+        return True
+    except Exception as e:
+        logger.warning(f"Не удалось загрузить модель QReader: {e}", exc_info=True)
+        return False
 
-        # Пробуем разные варианты обработки
-        decode_attempts = []
 
-        # Конвертируем в grayscale для всех вариантов
-        gray_image = image.convert("L")
+class DecodeResult(NamedTuple):
+    """Результат декодирования изображения."""
 
-        # Вариант 1: Простое grayscale
-        decode_attempts.append(("grayscale", gray_image))
+    data: List[str]
+    method: str
+    features: str
+    passes: int
+    engine: str = "pyzbar"
+    # Время работы каждого запущенного движка в секундах
+    latencies: Optional[Dict[str, float]] = None
 
-        # Вариант 2: Увеличенный контраст в grayscale
-        enhancer = ImageEnhance.Contrast(gray_image)
-        high_contrast = enhancer.enhance(2.0)
-        decode_attempts.append(("high_contrast_grayscale", high_contrast))
 
-        # Вариант 3: Максимальный контраст
-        max_contrast = enhancer.enhance(3.0)
-        decode_attempts.append(("max_contrast_grayscale", max_contrast))
+class EngineResult(NamedTuple):
+    """Результат одного движка распознавания."""
 
-        # Вариант 4: Увеличенная резкость в grayscale
-        sharpness_enhancer = ImageEnhance.Sharpness(gray_image)
-        sharp_image = sharpness_enhancer.enhance(2.0)
-        decode_attempts.append(("sharp_grayscale", sharp_image))
+    data: List[str]
+    method: str
+    passes: int
 
-        # Вариант 5: Бинаризация (черно-белое с порогом)
-        try:
-            # Пробуем разные пороги для бинаризации
-            for threshold in [128, 100, 150]:
-                binary = gray_image.point(lambda x: 255 if x > threshold else 0, mode="1")
-                # Конвертируем обратно в L для pyzbar
-                binary_l = binary.convert("L")
-                decode_attempts.append((f"binary_threshold_{threshold}", binary_l))
-        except Exception as e:
-            logger.debug(f"Ошибка при бинаризации: {e}")
 
-        # Вариант 6: Инверсия цветов (на случай белого QR на черном фоне)
-        inverted = Image.eval(gray_image, lambda x: 255 - x)
-        decode_attempts.append(("inverted_grayscale", inverted))
+class DecodeEngine(abc.ABC):
+    """Движок распознавания QR-кодов на вариантах изображения."""
 
-        # Вариант 7: Инверсия с высоким контрастом
-        inverted_contrast = ImageEnhance.Contrast(inverted).enhance(2.0)
-        decode_attempts.append(("inverted_high_contrast", inverted_contrast))
+    name = ""
 
-        # Вариант 8: RGB (если grayscale не сработал)
-        if image.mode != "RGB":
-            rgb_image = image.convert("RGB")
-            decode_attempts.append(("RGB", rgb_image))
-        else:
-            decode_attempts.append(("RGB", image))
+    def available(self) -> bool:
+        """Проверяет, установлены ли библиотеки движка."""
+        return True
 
-        # Вариант 9: Применение фильтра резкости
-        sharpened = gray_image.filter(ImageFilter.SHARPEN)
-        decode_attempts.append(("sharpened_filter", sharpened))
+    @abc.abstractmethod
+    def decode(
+        self, variants: ImageVariants, order: Optional[Sequence[str]], deadline: Deadline
+    ) -> Optional[EngineResult]:
+        """
+        Распознает QR-коды.
 
-        # Вариант 10: Увеличенное изображение с улучшенной обработкой
-        if image.size[0] < 500 or image.size[1] < 500:
-            large_gray = gray_image.resize(
-                (image.size[0] * 2, image.size[1] * 2), Image.Resampling.LANCZOS
-            )
-            decode_attempts.append(("resized_2x_grayscale", large_gray))
+        Движок проверяет deadline между попытками и прекращает работу после
+        его истечения или отмены. Один вызов библиотеки прервать нельзя.
+
+        Args:
+            variants: Варианты изображения
+            order: Предпочтительный порядок вариантов обработки
+            deadline: Крайний срок (отменяется, когда другой движок нашел код)
+
+        Returns:
+            Optional[EngineResult]: Результат или None, если код не найден
+        """
 
-            # С увеличенным контрастом
-            large_contrast = ImageEnhance.Contrast(large_gray).enhance(2.0)
-            decode_attempts.append(("resized_2x_high_contrast", large_contrast))
 
-        # Пробуем декодировать с каждым вариантом
-        decoded_objects = None
-        successful_method = None
+class PyzbarEngine(DecodeEngine):
+    """pyzbar на лениво построенных вариантах обработки."""
 
-        for method_name, processed_image in decode_attempts:
+    name = "pyzbar"
+
+    def decode(
+        self, variants: ImageVariants, order: Optional[Sequence[str]], deadline: Deadline
+    ) -> Optional[EngineResult]:
+        passes = 0
+        for method_name, processed_image in iter_decode_variants(variants, order, deadline):
+            passes += 1
             try:
-                logger.debug(
-                    f"Пробуем метод: {method_name}, размер={processed_image.size}, режим={processed_image.mode}"
-                )
+                logger.debug(f"Пробуем метод: {method_name}, {describe_image(processed_image)}")
                 decoded_objects = pyzbar.decode(processed_image, symbols=[ZBarSymbol.QRCODE])
-                if decoded_objects:
-                    successful_method = method_name
-                    logger.info(f"QR-код успешно декодирован методом: {method_name}")
-                    break
-                else:
-                    logger.debug(f"Метод {method_name}: QR-код не найден")
             except Exception as e:
                 logger.debug(f"Метод {method_name} не сработал: {e}")
                 continue
 
-        # Если ничего не сработало, пробуем еще более агрессивные методы
-        if not decoded_objects:
-            logger.debug("Пробуем дополнительные методы обработки")
+            if not decoded_objects:
+                logger.debug(f"Метод {method_name}: QR-код не найден")
+                continue
+
+            payloads = (_decode_payload(obj.data) for obj in decoded_objects)
+            data_list = [data for data in payloads if data is not None]
+            if data_list:
+                logger.info(f"QR-код успешно декодирован методом: {method_name}")
+                return EngineResult(data_list, method_name, passes)
+            logger.warning(f"Метод {method_name}: не удалось извлечь данные из QR-кодов")
+
+        return None
+
+
+class QReaderEngine(DecodeEngine):
+    """Нейросетевой детектор QReader (модель берется из пула процесса)."""
+
+    name = "qreader"
+
+    def available(self) -> bool:
+        return QRREADER_AVAILABLE
+
+    def decode(
+        self, variants: ImageVariants, order: Optional[Sequence[str]], deadline: Deadline
+    ) -> Optional[EngineResult]:
+        import numpy as np
+
+        if deadline.expired():
+            return None
+        with _acquire_qreader() as qreader:
+            # qreader ожидает RGB-изображение в виде numpy array
+            decoded_text = qreader.detect_and_decode(np.asarray(variants.get("RGB")))
+
+        data_list = [text for text in decoded_text or () if text is not None]
+        if not data_list:
+            return None
+        logger.info("QR-код успешно декодирован с помощью qreader")
+        return EngineResult(data_list, "qreader", 1)
+
+
+class OpenCVEngine(DecodeEngine):
+    """Детектор QRCodeDetector из OpenCV."""
+
+    name = "opencv"
+
+    def available(self) -> bool:
+        return OPENCV_AVAILABLE
+
+    def decode(
+        self, variants: ImageVariants, order: Optional[Sequence[str]], deadline: Deadline
+    ) -> Optional[EngineResult]:
+        if deadline.expired():
+            return None
+        detector = cv2.QRCodeDetector()
+        found, decoded_info, _, _ = detector.detectAndDecodeMulti(variants.get("grayscale_array"))
+
+        data_list = [text for text in decoded_info or () if text] if found else []
+        if not data_list:
+            return None
+        logger.info("QR-код успешно декодирован с помощью OpenCV")
+        return EngineResult(data_list, "opencv", 1)
+
+
+# Движки распознавания по имени
+ENGINES: Dict[str, DecodeEngine] = {
+    engine.name: engine for engine in (PyzbarEngine(), QReaderEngine(), OpenCVEngine())
+}
+
+
+def get_engines(names: Optional[Sequence[str]] = None) -> List[DecodeEngine]:
+    """
+    Возвращает установленные движки в заданном порядке.
 
-            # Очень большое увеличение для маленьких изображений
-            if image.size[0] < 500 or image.size[1] < 500:
-                logger.debug("Попытка большого увеличения изображения")
-                for scale in [3, 4, 5]:
-                    large_gray = gray_image.resize(
-                        (image.size[0] * scale, image.size[1] * scale), Image.Resampling.LANCZOS
+    Args:
+        names: Имена движков (если None, берутся из настроек)
+
+    Returns:
+        List[DecodeEngine]: Доступные движки
+    """
+    if names is None:
+        names = get_settings().get_decode_engines()
+    engines = []
+    for name in names:
+        engine = ENGINES.get(name)
+        if engine is None:
+            logger.warning(f"Неизвестный движок распознавания: {name}")
+        elif engine.available():
+            engines.append(engine)
+    return engines
+
+
+def _run_engine(
+    engine: DecodeEngine,
+    variants: ImageVariants,
+    order: Optional[Sequence[str]],
+    deadline: Deadline,
+) -> Tuple[Optional[EngineResult], float]:
+    """Запускает движок и измеряет время его работы."""
+    started = time.perf_counter()
+    try:
+        result = engine.decode(variants, order, deadline)
+    except Exception as e:
+        logger.warning(f"Движок {engine.name} не сработал: {e}", exc_info=True)
+        result = None
+    return result, time.perf_counter() - started
+
+
+def run_engines_sequential(
+    engines: Sequence[DecodeEngine],
+    variants: ImageVariants,
+    order: Optional[Sequence[str]],
+    deadline: Deadline,
+) -> Tuple[Optional[EngineResult], Optional[str], Dict[str, float]]:
+    """
+    Запускает движки по очереди до первого результата.
+
+    Args:
+        engines: Движки в порядке приоритета
+        variants: Варианты изображения
+        order: Предпочтительный порядок вариантов обработки
+        deadline: Крайний срок
+
+    Returns:
+        Tuple: Результат, имя успешного движка и время работы каждого движка
+    """
+    latencies: Dict[str, float] = {}
+    for engine in engines:
+        if deadline.expired():
+            break
+        result, latencies[engine.name] = _run_engine(engine, variants, order, deadline)
+        if result is not None:
+            return result, engine.name, latencies
+    return None, None, latencies
+
+
+def race_engines(
+    engines: Sequence[DecodeEngine],
+    variants: ImageVariants,
+    order: Optional[Sequence[str]],
+    deadline: Deadline,
+) -> Tuple[Optional[EngineResult], Optional[str], Dict[str, float]]:
+    """
+    Запускает движки одновременно в потоках; побеждает первый результат.
+
+    После победы остальные движки отменяются: они прекращают работу на
+    ближайшей проверке срока, а результат возвращается, не дожидаясь их.
+    Срок проверяется только между вызовами библиотек: pyzbar останавливается
+    после текущего прохода, а уже начатый вызов QReader или OpenCV (один
+    проход) доработает в фоновом потоке и займет CPU до своего завершения.
+    Поэтому гонка имеет смысл, когда у воркера есть свободные ядра.
+
+    Args:
+        engines: Движки для гонки
+        variants: Варианты изображения
+        order: Предпочтительный порядок вариантов обработки
+        deadline: Крайний срок
+
+    Returns:
+        Tuple: Результат, имя победившего движка и время работы завершившихся движков
+    """
+    if deadline.expired():
+        return None, None, {}
+    race = Deadline(deadline.remaining())
+    latencies: Dict[str, float] = {}
+    pool = ThreadPoolExecutor(max_workers=len(engines), thread_name_prefix="qr-engine")
+    try:
+        pending = {
+            pool.submit(_run_engine, engine, variants, order, race): engine.name
+            for engine in engines
+        }
+        while pending:
+            done, _ = wait(pending, timeout=race.remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                name = pending.pop(future)
+                result, latencies[name] = future.result()
+                if result is not None:
+                    logger.info(
+                        f"Гонку движков выиграл {name} за {latencies[name]:.3f} с, "
+                        f"отменены: {', '.join(pending.values()) or '-'}"
                     )
-                    # С разными уровнями контраста
-                    for contrast_level in [1.5, 2.0, 3.0]:
-                        enhanced = ImageEnhance.Contrast(large_gray).enhance(contrast_level)
-                        try:
-                            decoded_objects = pyzbar.decode(enhanced, symbols=[ZBarSymbol.QRCODE])
-                            if decoded_objects:
-                                successful_method = f"resized_{scale}x_contrast_{contrast_level}"
-                                logger.info(f"QR-код декодирован методом: {successful_method}")
-                                break
-                        except:
-                            continue
-                    if decoded_objects:
-                        break
-
-        # Если pyzbar не сработал, пробуем qreader (если доступен)
-        if not decoded_objects and QRREADER_AVAILABLE:
-            logger.info("pyzbar не распознал QR-код, пробуем qreader...")
-            try:
-                qreader = QReader()
-                # qreader работает с numpy array или PIL Image
-                decoded_text = qreader.detect_and_decode(image)
-                if decoded_text and len(decoded_text) > 0 and decoded_text[0] is not None:
-                    data_list = [decoded_text[0]]
-                    successful_method = "qreader"
-                    logger.info("QR-код успешно декодирован с помощью qreader")
-                    # Пропускаем извлечение данных, так как qreader уже вернул текст
-                    return data_list
-            except Exception as e:
-                logger.warning(f"qreader не сработал: {e}", exc_info=True)
+                    return result, name, latencies
+        return None, None, latencies
+    finally:
+        race.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
 
-        if not decoded_objects:
-            raise QRCodeDecodeError("QR-код не найден на изображении")
 
-        # Извлекаем данные
-        data_list = []
-        for obj in decoded_objects:
-            try:
-                data = obj.data.decode("utf-8")
-                data_list.append(data)
-                logger.debug(f"Декодирован QR-код: {data[:50]}...")
-            except UnicodeDecodeError:
-                # Пробуем другие кодировки
+def _decode_payload(raw: bytes) -> Optional[str]:
+    """Декодирует данные QR-кода в строку (UTF-8, затем latin-1)."""
+    try:
+        data = raw.decode("utf-8")
+        logger.debug(f"Декодирован QR-код: {data[:50]}...")
+        return data
+    except UnicodeDecodeError:
+        # Пробуем другие кодировки
+        try:
+            data = raw.decode("latin-1")
+            logger.debug(f"Декодирован QR-код (latin-1): {data[:50]}...")
+            return data
+        except Exception as e:
+            logger.warning(f"Не удалось декодировать данные QR-кода: {e}")
+            return None
+
+
+def _decode_tile(gray: Image.Image, box: TileBox) -> List[DetectedCode]:
+    """
+    Распознает QR-коды на одной плитке.
+
+    Сначала пробуется grayscale, при неудаче - локальная бинаризация.
+
+    Args:
+        gray: Grayscale изображение целиком
+        box: Границы плитки
+
+    Returns:
+        List[DetectedCode]: Коды в координатах исходного изображения
+    """
+    import numpy as np
+
+    tile = np.asarray(gray.crop(box), dtype=np.uint8)
+    decoded_objects = pyzbar.decode(tile, symbols=[ZBarSymbol.QRCODE])
+    if not decoded_objects:
+        decoded_objects = pyzbar.decode(binarize_sauvola(tile), symbols=[ZBarSymbol.QRCODE])
+
+    codes = []
+    for obj in decoded_objects:
+        data = _decode_payload(obj.data)
+        if data is not None:
+            left, top, width, height = obj.rect
+            codes.append(DetectedCode(data, box.left + left, box.top + top, width, height))
+    return codes
+
+
+def decode_qr_tiled(
+    variants: ImageVariants, deadline: Optional[Deadline] = None
+) -> Tuple[List[DetectedCode], int]:
+    """
+    Распознает все QR-коды большого изображения по перекрывающимся плиткам.
+
+    Плитки распознаются параллельно в потоках (pyzbar освобождает GIL). Если
+    время истекло, возвращаются коды из уже обработанных плиток.
+
+    Args:
+        variants: Варианты изображения
+        deadline: Крайний срок распознавания
+
+    Returns:
+        Tuple[List[DetectedCode], int]: Коды в порядке чтения и число обработанных плиток
+    """
+    settings = get_settings()
+    gray = variants.get("grayscale")
+    tiles = make_tiles(*gray.size, settings.decode_tile_size, settings.decode_tile_overlap)
+    logger.info(f"Распознавание по плиткам: {len(tiles)} плиток, размер={gray.size}")
+
+    codes: List[DetectedCode] = []
+    processed = 0
+    with ThreadPoolExecutor(
+        max_workers=settings.decode_tile_workers, thread_name_prefix="qr-tile"
+    ) as pool:
+        pending = {pool.submit(_decode_tile, gray, box) for box in tiles}
+        while pending:
+            timeout = deadline.remaining() if deadline is not None else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                processed += 1
                 try:
-                    data = obj.data.decode("latin-1")
-                    data_list.append(data)
-                    logger.debug(f"Декодирован QR-код (latin-1): {data[:50]}...")
+                    codes.extend(future.result())
                 except Exception as e:
-                    logger.warning(f"Не удалось декодировать данные QR-кода: {e}")
-                    continue
+                    logger.debug(f"Плитка не распознана: {e}")
+            if deadline is not None and deadline.expired():
+                for future in pending:
+                    future.cancel()
+                if pending:
+                    logger.warning(f"Время истекло: обработано {processed} из {len(tiles)} плиток")
+                break
+
+    return reading_order(merge_detections(codes)), processed
+
+
+# Варианты, которые пробуются на уменьшенных копиях JPEG
+DRAFT_STAGES = ("grayscale", "sauvola_threshold")
+
+
+def _decode_drafts(
+    image_bytes: bytes, image: Image.Image, deadline: Deadline
+) -> Tuple[Optional[DecodeResult], int]:
+    """
+    Пробует распознать QR-коды на уменьшенных копиях JPEG.
+
+    Args:
+        image_bytes: Изображение в виде байтов
+        image: Открытое (еще не декодированное) изображение
+        deadline: Крайний срок распознавания
+
+    Returns:
+        Tuple[Optional[DecodeResult], int]: Результат (None при неудаче) и число попыток
+    """
+    passes = 0
+    min_size = get_settings().decode_draft_min_size
+    for scale, draft in iter_jpeg_drafts(image_bytes, image, min_size):
+        draft_variants = ImageVariants(draft)
+        for stage in DRAFT_STAGES:
+            if deadline.expired():
+                return None, passes
+            passes += 1
+            method_name = f"draft_1/{scale}_{stage}"
+            try:
+                processed_image = draft_variants.get(stage)
+                logger.debug(f"Пробуем метод: {method_name}, {describe_image(processed_image)}")
+                decoded_objects = pyzbar.decode(processed_image, symbols=[ZBarSymbol.QRCODE])
+            except Exception as e:
+                logger.debug(f"Метод {method_name} не сработал: {e}")
+                continue
+
+            payloads = (_decode_payload(obj.data) for obj in decoded_objects)
+            data_list = [data for data in payloads if data is not None]
+            if data_list:
+                logger.info(f"QR-код декодирован на уменьшенной копии методом: {method_name}")
+                features = image_features(draft_variants, original=image)
+                return DecodeResult(data_list, method_name, features, passes), passes
+
+    return None, passes
 
-        if not data_list:
-            raise QRCodeDecodeError("Не удалось извлечь данные из QR-кодов")
 
+def decode_qr_image(
+    image_bytes: Union[bytes, Image.Image],
+    rankings: Optional[Dict[str, Sequence[str]]] = None,
+    time_budget: Optional[float] = None,
+) -> DecodeResult:
+    """
+    Декодирует QR-коды из изображения с учетом статистики методов.
+
+    Args:
+        image_bytes: Изображение в виде байтов или уже открытое изображение PIL
+            (например, отрисованная страница PDF)
+        rankings: Методы в порядке убывания успешности для каждого ключа
+            характеристик изображения (см. image_features)
+        time_budget: Время на декодирование в секундах; проверяется между попытками
+            (если None, берется из настроек, 0 - без ограничения)
+
+    Returns:
+        DecodeResult: Данные, успешный метод, характеристики изображения и число проходов
+
+    Raises:
+        QRCodeDecodeTimeoutError: если время истекло, а QR-код не найден
+        QRCodeDecodeError: если не удалось декодировать QR-коды
+    """
+    if time_budget is None:
+        time_budget = get_settings().decode_time_budget
+    deadline = Deadline(time_budget)
+
+    try:
+        # Проверяем доступность зависимостей
+        if not _dependencies_ok:
+            logger.error("Библиотеки для декодирования QR-кодов не установлены")
+            raise QRCodeDecodeError(
+                "Библиотеки для декодирования QR-кодов не установлены. Установите pyzbar."
+            )
+
+        # Открываем изображение
+        if isinstance(image_bytes, Image.Image):
+            image, image_bytes = image_bytes, None
+        else:
+            image = Image.open(io.BytesIO(image_bytes))
+        logger.info(
+            f"Открыто изображение: размер={image.size}, режим={image.mode}, формат={image.format}"
+        )
+
+        min_pixels = get_settings().decode_tiled_min_pixels
+        tiled = bool(min_pixels) and image.size[0] * image.size[1] >= min_pixels
+        passes = 0
+
+        # Сначала пробуем дешевые уменьшенные копии JPEG, полное разрешение - только
+        # при неудаче. Листы с этикетками не уменьшаются: мелкие коды на них теряются
+        if not tiled and image_bytes is not None:
+            result, passes = _decode_drafts(image_bytes, image, deadline)
+            if result is not None:
+                return result
+
+        # Варианты обработки строятся лениво: следующий - только если предыдущий не сработал
+        variants = ImageVariants(image)
+        features = image_features(variants)
+        order = (rankings or {}).get(features)
+
+        # Большие изображения (листы с этикетками) распознаются по плиткам
+        if tiled:
+            codes, passes = decode_qr_tiled(variants, deadline)
+            if codes:
+                logger.info(f"По плиткам распознано {len(codes)} QR-код(ов)")
+                return DecodeResult([code.data for code in codes], "tiled", features, passes)
+
+        # Движки распознавания: по очереди или наперегонки
+        engines = get_engines()
+        if get_settings().decode_race and len(engines) > 1:
+            result, engine_name, latencies = race_engines(engines, variants, order, deadline)
+        else:
+            result, engine_name, latencies = run_engines_sequential(
+                engines, variants, order, deadline
+            )
+
+        if result is None:
+            if deadline.expired():
+                logger.warning(
+                    f"Время на декодирование истекло ({time_budget} с) после {passes} попыток"
+                )
+                raise QRCodeDecodeTimeoutError(
+                    "Не удалось распознать QR-код за отведенное время. "
+                    "Попробуйте сделать более четкое фото."
+                )
+            raise QRCodeDecodeError("QR-код не найден на изображении")
+
+        passes += result.passes
         logger.info(
-            f"Успешно декодировано {len(data_list)} QR-код(ов) методом: {successful_method}"
+            f"Успешно декодировано {len(result.data)} QR-код(ов) методом: {result.method} "
+            f"(движок: {engine_name}, проходов: {passes}, изображение: {features})"
         )
-        return data_list
+        return DecodeResult(result.data, result.method, features, passes, engine_name, latencies)
 
     except QRCodeDecodeError:
         raise
@@ -240,6 +640,22 @@ def decode_qr_from_image(image_bytes: bytes) -> List[str]:
         raise QRCodeDecodeError(f"Не удалось декодировать QR-код: {e}") from e
 
 
+def decode_qr_from_image(image_bytes: bytes) -> List[str]:
+    """
+    Декодирует QR-коды из изображения.
+
+    Args:
+        image_bytes: Изображение в виде байтов
+
+    Returns:
+        List[str]: Список данных, извлеченных из QR-кодов
+
+    Raises:
+        QRCodeDecodeError: если не удалось декодировать QR-коды
+    """
+    return decode_qr_image(image_bytes).data
+
+
 def decode_qr_from_image_file(image_path: str) -> List[str]:
     """
     Декодирует QR-коды из файла изображения.
@@ -2,44 +2,201 @@
 Сервис для генерации QR-кодов.
 """
 
+import collections
 import io
-from typing import List
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 import qrcode
-from qrcode.image.pil import PilImage
+from PIL import Image
 
+from ..core.config import get_settings_or_defaults
 from ..core.exceptions import QRCodeGenerationError
 from ..core.logging_config import get_logger
+from ..utils.cache import LRUCache
+from ..utils.progress import ProgressTracker
 
 logger = get_logger(__name__)
 
+# Размер модуля QR-кода в пикселях при растеризации
+BOX_SIZE = 10
+
+
+class PackedMatrix(NamedTuple):
+    """Матрица модулей QR-кода, упакованная по битам (строки выровнены до байта, 1 - темный)."""
+
+    size: int
+    bits: bytes
+
+
+def pack_matrix(matrix: List[List[bool]]) -> PackedMatrix:
+    """
+    Упаковывает матрицу модулей в биты.
+
+    Args:
+        matrix: Квадратная матрица модулей (True - темный модуль)
+
+    Returns:
+        PackedMatrix: Упакованная матрица
+    """
+    size = len(matrix)
+    row_bytes = (size + 7) // 8
+    padding = "0" * (row_bytes * 8 - size)
+    bits = b"".join(
+        int("".join("1" if module else "0" for module in row) + padding, 2).to_bytes(
+            row_bytes, "big"
+        )
+        for row in matrix
+    )
+    return PackedMatrix(size, bits)
+
+
+def unpack_matrix(packed: PackedMatrix) -> List[List[bool]]:
+    """
+    Распаковывает матрицу модулей из битов.
+
+    Args:
+        packed: Упакованная матрица
+
+    Returns:
+        List[List[bool]]: Матрица модулей (True - темный модуль)
+    """
+    size = packed.size
+    row_bytes = (size + 7) // 8
+    matrix = []
+    for row in range(size):
+        chunk = packed.bits[row * row_bytes : (row + 1) * row_bytes]
+        bits = format(int.from_bytes(chunk, "big"), f"0{row_bytes * 8}b")
+        matrix.append([bit == "1" for bit in bits[:size]])
+    return matrix
+
+
+def matrix_to_image(packed: PackedMatrix, box_size: int = BOX_SIZE) -> Image.Image:
+    """
+    Растеризует упакованную матрицу в черно-белое изображение.
+
+    Args:
+        packed: Упакованная матрица модулей
+        box_size: Размер модуля в пикселях
+
+    Returns:
+        Image.Image: Изображение QR-кода в режиме "1"
+    """
+    # "1;I" - инвертированные биты: 1 в матрице дает черный пиксель
+    img = Image.frombytes("1", (packed.size, packed.size), packed.bits, "raw", "1;I")
+    pixels = packed.size * box_size
+    return img.resize((pixels, pixels), Image.Resampling.NEAREST)
+
+
+def _make_packed_matrix(data: str, error_correction: int, border: int) -> PackedMatrix:
+    """Строит QR-код (подбор версии, Рида-Соломона, маска) и упаковывает матрицу."""
+    qr = qrcode.QRCode(version=1, error_correction=error_correction, border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return pack_matrix(qr.get_matrix())
+
+
+# Ключ кэша матриц: (данные, уровень коррекции, рамка)
+MatrixKey = Tuple[str, int, int]
+
+# Примерные накладные расходы на запись кэша (ключ, кортеж, словари) в байтах
+_CACHE_ENTRY_OVERHEAD = 200
+
+# Кэш матриц QR-кодов (создается при первом обращении)
+_matrix_cache: Optional[LRUCache] = None
+
+
+def _matrix_entry_size(key: MatrixKey, packed: PackedMatrix) -> int:
+    """Оценивает размер записи кэша матриц в байтах."""
+    return len(key[0]) + len(packed.bits) + _CACHE_ENTRY_OVERHEAD
+
+
+def _get_matrix_cache() -> Optional[LRUCache]:
+    """Получает кэш матриц (None, если кэш отключен)."""
+    global _matrix_cache
+    if _matrix_cache is None:
+        max_bytes = get_settings_or_defaults().qr_cache_max_mb * 1024 * 1024
+        if max_bytes <= 0:
+            return None
+        _matrix_cache = LRUCache(max_bytes, sizeof=_matrix_entry_size)
+    return _matrix_cache
+
+
+def get_qr_cache_stats() -> Dict[str, int]:
+    """
+    Возвращает статистику кэша матриц QR-кодов текущего процесса.
+
+    Returns:
+        Dict[str, int]: hits, misses, evictions, entries, size, max_size
+    """
+    cache = _get_matrix_cache()
+    if cache is None:
+        return {"hits": 0, "misses": 0, "evictions": 0, "entries": 0, "size": 0, "max_size": 0}
+    return cache.stats()
+
+
+def clear_qr_cache() -> None:
+    """Очищает кэш матриц QR-кодов."""
+    cache = _get_matrix_cache()
+    if cache is not None:
+        cache.clear()
+
+
+def get_packed_matrix(
+    data: str, error_correction: int = qrcode.constants.ERROR_CORRECT_M, border: int = 4
+) -> PackedMatrix:
+    """
+    Получает упакованную матрицу QR-кода из кэша или строит ее.
+
+    Args:
+        data: Данные для кодирования в QR-код
+        error_correction: Уровень коррекции ошибок
+        border: Ширина белой рамки в модулях
+
+    Returns:
+        PackedMatrix: Упакованная матрица
+    """
+    cache = _get_matrix_cache()
+    key = (data, error_correction, border)
+    if cache is not None:
+        packed = cache.get(key)
+        if packed is not None:
+            return packed
+
+    packed = _make_packed_matrix(data, error_correction, border)
+    if cache is not None:
+        cache.put(key, packed)
+    return packed
+
+
+def _make_packed_chunk(
+    data_chunk: List[str], error_correction: int, border: int
+) -> List[PackedMatrix]:
+    """Строит матрицы для части списка данных (выполняется в процессе-воркере)."""
+    return [_make_packed_matrix(data, error_correction, border) for data in data_chunk]
+
 
 def generate_qr_code(
-    data: str, error_correction: int = qrcode.constants.ERROR_CORRECT_M
-) -> PilImage:
+    data: str, error_correction: int = qrcode.constants.ERROR_CORRECT_M, border: int = 4
+) -> Image.Image:
     """
     Генерирует QR-код из данных.
 
     Args:
         data: Данные для кодирования в QR-код
         error_correction: Уровень коррекции ошибок
+        border: Ширина белой рамки в модулях
 
     Returns:
-        PilImage: Изображение QR-кода
+        Image.Image: Изображение QR-кода
 
     Raises:
         QRCodeGenerationError: если не удалось сгенерировать QR-код
     """
     try:
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=error_correction,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color="black", back_color="white")
+        img = matrix_to_image(get_packed_matrix(data, error_correction, border))
         logger.debug(f"QR-код сгенерирован для данных длиной {len(data)} символов")
         return img
     except Exception as e:
@@ -47,36 +204,273 @@ def generate_qr_code(
         raise QRCodeGenerationError(f"Не удалось сгенерировать QR-код: {e}") from e
 
 
-def generate_qr_codes(data_list: List[str]) -> List[PilImage]:
+# Пул процессов для пакетной генерации (создается при первой большой пачке)
+_generation_pool: Optional[ProcessPoolExecutor] = None
+# Количество свободных ядер (задается в процессах-воркерах пула задач)
+_idle_cores_provider: Optional[Callable[[], int]] = None
+
+
+def set_idle_cores_provider(provider: Optional[Callable[[], int]]) -> None:
     """
-    Генерирует список QR-кодов из списка данных.
+    Задает функцию, возвращающую количество свободных ядер.
+
+    Процесс-воркер пула задач делит CPU с другими воркерами, поэтому
+    пакетная генерация в нем использует только ядра, не занятые задачами.
+
+    Args:
+        provider: Функция без аргументов (None - использовать все ядра)
+    """
+    global _idle_cores_provider
+    _idle_cores_provider = provider
+
+
+def _get_generation_workers(max_workers: Optional[int] = None) -> int:
+    """
+    Возвращает количество процессов для очередной пачки с учетом свободных ядер.
+
+    Args:
+        max_workers: Максимум процессов (если None, берется из настроек или по числу ядер)
+    """
+    if max_workers is None:
+        max_workers = get_settings_or_defaults().qr_parallel_workers or os.cpu_count() or 1
+    if _idle_cores_provider is not None:
+        max_workers = min(max_workers, _idle_cores_provider())
+    return max(max_workers, 1)
+
+
+def _get_generation_pool() -> ProcessPoolExecutor:
+    """Получает или создает пул процессов для пакетной генерации."""
+    global _generation_pool
+    if _generation_pool is None:
+        settings = get_settings_or_defaults()
+        # Процессы spawn-пула запускаются по мере необходимости, поэтому размер
+        # пула - только верхняя граница; фактически занято не больше частей,
+        # чем передается в пул одновременно
+        max_workers = settings.qr_parallel_workers or os.cpu_count() or 1
+        _generation_pool = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        logger.info(f"Пул процессов для генерации QR-кодов создан: воркеров={max_workers}")
+    return _generation_pool
+
+
+def shutdown_generation_pool() -> None:
+    """Останавливает пул процессов пакетной генерации."""
+    global _generation_pool
+    if _generation_pool is not None:
+        _generation_pool.shutdown(wait=True, cancel_futures=True)
+        _generation_pool = None
+
+
+def _map_chunks(
+    pool: ProcessPoolExecutor, chunks: List[List[str]], max_in_flight: int, *args: Any
+) -> Iterator[List[PackedMatrix]]:
+    """
+    Обрабатывает части в пуле, передавая в него не больше max_in_flight частей сразу.
+
+    Args:
+        pool: Пул процессов
+        chunks: Части списка данных
+        max_in_flight: Максимум одновременно обрабатываемых частей
+        *args: Дополнительные аргументы _make_packed_chunk
+
+    Yields:
+        List[PackedMatrix]: Результаты частей в исходном порядке
+    """
+    pending: "collections.deque[Future]" = collections.deque()
+    remaining = iter(chunks)
+    try:
+        for chunk in itertools.islice(remaining, max_in_flight):
+            pending.append(pool.submit(_make_packed_chunk, chunk, *args))
+        while pending:
+            result = pending.popleft().result()
+            for chunk in itertools.islice(remaining, 1):
+                pending.append(pool.submit(_make_packed_chunk, chunk, *args))
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def get_qr_matrix(
+    data: str, error_correction: int = qrcode.constants.ERROR_CORRECT_M, border: int = 4
+) -> List[List[bool]]:
+    """
+    Строит матрицу модулей QR-кода (с рамкой) без растеризации.
+
+    Args:
+        data: Данные для кодирования в QR-код
+        error_correction: Уровень коррекции ошибок
+        border: Ширина белой рамки в модулях
+
+    Returns:
+        List[List[bool]]: Матрица модулей (True - темный модуль)
+
+    Raises:
+        QRCodeGenerationError: если не удалось построить QR-код
+    """
+    try:
+        return unpack_matrix(get_packed_matrix(data, error_correction, border))
+    except Exception as e:
+        logger.error(f"Ошибка при построении матрицы QR-кода: {e}", exc_info=True)
+        raise QRCodeGenerationError(f"Не удалось сгенерировать QR-код: {e}") from e
+
+
+def generate_qr_matrices(
+    data_list: List[str],
+    chunk_size: Optional[int] = None,
+    parallel_threshold: Optional[int] = None,
+    progress: Optional[ProgressTracker] = None,
+) -> List[PackedMatrix]:
+    """
+    Строит упакованные матрицы модулей для списка данных.
+
+    Повторяющиеся данные строятся один раз, ранее построенные берутся из кэша.
+    Если новых уникальных значений много, они делятся на части и обрабатываются
+    в пуле процессов; результат возвращается в исходном порядке.
 
     Args:
         data_list: Список данных для кодирования
+        chunk_size: Размер части для процесса-воркера (если None, берется из настроек)
+        parallel_threshold: Минимальное количество новых значений для параллельной
+            генерации (если None, берется из настроек; 0 - всегда последовательно)
+        progress: Счетчик хода выполнения; элементы учитываются по мере построения
+            частей (повторы и значения из кэша - сразу)
 
     Returns:
-        List[PilImage]: Список изображений QR-кодов
+        List[PackedMatrix]: Список упакованных матриц
 
     Raises:
         QRCodeGenerationError: если не удалось сгенерировать QR-коды
     """
+    settings = get_settings_or_defaults()
+    if chunk_size is None:
+        chunk_size = settings.qr_chunk_size
+    if parallel_threshold is None:
+        parallel_threshold = settings.qr_parallel_threshold
+    error_correction = qrcode.constants.ERROR_CORRECT_M
+
+    border = 4
+    cache = _get_matrix_cache()
+
     try:
-        qr_images = []
-        for i, data in enumerate(data_list, 1):
-            img = generate_qr_code(data)
-            qr_images.append(img)
-            logger.debug(f"Сгенерирован QR-код {i}/{len(data_list)}")
-
-        logger.info(f"Успешно сгенерировано {len(qr_images)} QR-кодов")
-        return qr_images
-    except QRCodeGenerationError:
-        raise
+        # Берем готовые матрицы из кэша и собираем уникальные новые значения
+        known: Dict[str, Optional[PackedMatrix]] = {}
+        missing: List[str] = []
+        for data in data_list:
+            if data in known:
+                continue
+            packed = cache.get((data, error_correction, border)) if cache is not None else None
+            if packed is not None:
+                known[data] = packed
+            else:
+                known[data] = None
+                missing.append(data)
+
+        if progress is not None:
+            progress.advance(items=len(data_list) - len(missing))
+
+        workers = 1
+        if parallel_threshold and len(missing) >= parallel_threshold:
+            # Когда свободно одно ядро, пул процессов не ускоряет генерацию
+            workers = _get_generation_workers()
+        if workers > 1:
+            chunks = [missing[i : i + chunk_size] for i in range(0, len(missing), chunk_size)]
+            logger.info(
+                f"Параллельная генерация {len(missing)} QR-кодов: {len(chunks)} частей "
+                f"по {chunk_size}, процессов={workers}"
+            )
+            packed_chunks = _map_chunks(
+                _get_generation_pool(), chunks, workers, error_correction, border
+            )
+            built = []
+            for chunk in packed_chunks:
+                built.extend(chunk)
+                if progress is not None:
+                    progress.advance(items=len(chunk))
+        else:
+            built = []
+            for i, data in enumerate(missing, 1):
+                built.append(_make_packed_matrix(data, error_correction, border))
+                logger.debug(f"Сгенерирован QR-код {i}/{len(missing)}")
+                if progress is not None and (i % chunk_size == 0 or i == len(missing)):
+                    progress.advance(items=(i - 1) % chunk_size + 1)
+
+        for data, packed in zip(missing, built):
+            known[data] = packed
+            if cache is not None:
+                cache.put((data, error_correction, border), packed)
+
+        logger.debug(
+            f"Матрицы QR-кодов: всего={len(data_list)}, уникальных={len(known)}, "
+            f"построено={len(missing)}"
+        )
+        return [known[data] for data in data_list]
     except Exception as e:
         logger.error(f"Ошибка при генерации QR-кодов: {e}", exc_info=True)
         raise QRCodeGenerationError(f"Не удалось сгенерировать QR-коды: {e}") from e
 
 
-def qr_image_to_bytes(img: PilImage, format: str = "PNG") -> bytes:
+def generate_qr_codes(
+    data_list: List[str],
+    chunk_size: Optional[int] = None,
+    parallel_threshold: Optional[int] = None,
+    progress: Optional[ProgressTracker] = None,
+) -> List[Image.Image]:
+    """
+    Генерирует список QR-кодов из списка данных.
+
+    Args:
+        data_list: Список данных для кодирования
+        chunk_size: Размер части для процесса-воркера (если None, берется из настроек)
+        parallel_threshold: Минимальное количество элементов для параллельной генерации
+            (если None, берется из настроек; 0 - всегда последовательно)
+        progress: Счетчик хода выполнения (см. generate_qr_matrices)
+
+    Returns:
+        List[Image.Image]: Список изображений QR-кодов
+
+    Raises:
+        QRCodeGenerationError: если не удалось сгенерировать QR-коды
+    """
+    matrices = generate_qr_matrices(data_list, chunk_size, parallel_threshold, progress)
+    qr_images = [matrix_to_image(packed) for packed in matrices]
+    logger.info(f"Успешно сгенерировано {len(qr_images)} QR-кодов")
+    return qr_images
+
+
+def iter_qr_codes(
+    data_items: Iterable[str], batch_size: Optional[int] = None
+) -> Iterator[Image.Image]:
+    """
+    Лениво генерирует QR-коды из потока данных.
+
+    Данные читаются порциями по batch_size элементов; каждая порция генерируется
+    через generate_qr_codes (параллельно, если порция достаточно большая), а
+    изображения отдаются по одному и не накапливаются.
+
+    Args:
+        data_items: Итерируемый источник данных (список, генератор)
+        batch_size: Размер порции (если None, берется из настроек)
+
+    Yields:
+        Image.Image: Изображения QR-кодов в исходном порядке
+
+    Raises:
+        QRCodeGenerationError: если не удалось сгенерировать QR-коды
+    """
+    if batch_size is None:
+        batch_size = get_settings_or_defaults().stream_batch_size
+
+    iterator = iter(data_items)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield from generate_qr_codes(batch)
+
+
+def qr_image_to_bytes(img: Image.Image, format: str = "PNG") -> bytes:
     """
     Конвертирует изображение QR-кода в байты.
 
@@ -0,0 +1,119 @@
+"""
+Разбиение больших изображений на плитки и сборка найденных QR-кодов.
+
+Используется для распознавания листов с этикетками: изображение делится на
+перекрывающиеся плитки, коды из плиток переводятся в координаты исходного
+изображения, повторы из зон перекрытия удаляются, а результат сортируется
+в порядке чтения (по строкам сверху вниз, в строке - слева направо).
+"""
+
+from typing import Iterable, List, NamedTuple, Tuple
+
+
+class TileBox(NamedTuple):
+    """Границы плитки в пикселях исходного изображения (как в PIL crop)."""
+
+    left: int
+    top: int
+    right: int
+    bottom: int
+
+
+class DetectedCode(NamedTuple):
+    """QR-код, найденный на изображении, в координатах исходного изображения."""
+
+    data: str
+    left: int
+    top: int
+    width: int
+    height: int
+
+    @property
+    def center(self) -> Tuple[float, float]:
+        """Центр кода."""
+        return self.left + self.width / 2, self.top + self.height / 2
+
+
+def _tile_starts(length: int, tile_size: int, step: int) -> List[int]:
+    """Начала плиток вдоль одной оси, последняя плитка прижата к краю."""
+    if length <= tile_size:
+        return [0]
+    starts = list(range(0, length - tile_size, step))
+    starts.append(length - tile_size)
+    return starts
+
+
+def make_tiles(width: int, height: int, tile_size: int, overlap: int) -> List[TileBox]:
+    """
+    Разбивает изображение на перекрывающиеся плитки.
+
+    Код целиком попадает хотя бы в одну плитку, если его размер не больше
+    перекрытия.
+
+    Args:
+        width: Ширина изображения
+        height: Высота изображения
+        tile_size: Размер стороны плитки
+        overlap: Перекрытие соседних плиток
+
+    Returns:
+        List[TileBox]: Плитки по строкам сверху вниз
+    """
+    step = max(1, tile_size - overlap)
+    return [
+        TileBox(left, top, min(left + tile_size, width), min(top + tile_size, height))
+        for top in _tile_starts(height, tile_size, step)
+        for left in _tile_starts(width, tile_size, step)
+    ]
+
+
+def merge_detections(codes: Iterable[DetectedCode]) -> List[DetectedCode]:
+    """
+    Удаляет повторы кодов, найденных в нескольких плитках.
+
+    Коды считаются одним, если совпадают данные и центр одного лежит внутри
+    другого. Одинаковые данные в разных местах листа остаются отдельными кодами.
+
+    Args:
+        codes: Найденные коды
+
+    Returns:
+        List[DetectedCode]: Уникальные коды
+    """
+    unique: List[DetectedCode] = []
+    for code in codes:
+        x, y = code.center
+        duplicate = any(
+            other.data == code.data
+            and other.left <= x <= other.left + other.width
+            and other.top <= y <= other.top + other.height
+            for other in unique
+        )
+        if not duplicate:
+            unique.append(code)
+    return unique
+
+
+def reading_order(codes: Iterable[DetectedCode]) -> List[DetectedCode]:
+    """
+    Сортирует коды в порядке чтения.
+
+    Код относится к текущей строке, если его центр по вертикали ближе
+    половины высоты кода к центру первого кода строки.
+
+    Args:
+        codes: Найденные коды
+
+    Returns:
+        List[DetectedCode]: Коды по строкам сверху вниз, в строке - слева направо
+    """
+    rows: List[List[DetectedCode]] = []
+    for code in sorted(codes, key=lambda c: c.center[1]):
+        if rows:
+            first = rows[-1][0]
+            if abs(code.center[1] - first.center[1]) <= max(first.height, code.height) / 2:
+                rows[-1].append(code)
+                continue
+        rows.append([code])
+
+    return [code for row in rows for code in sorted(row, key=lambda c: c.center[0])]
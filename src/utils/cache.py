@@ -0,0 +1,107 @@
+"""
+LRU-кэш с ограничением по размеру.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Потокобезопасный LRU-кэш со счетчиками попаданий.
+
+    Размер записи вычисляется функцией sizeof (по умолчанию 1, т.е. лимит - это
+    количество записей). При превышении max_size вытесняются давно не
+    использованные записи.
+    """
+
+    def __init__(
+        self, max_size: int, sizeof: Optional[Callable[[Hashable, Any], int]] = None
+    ) -> None:
+        self._max_size = max_size
+        self._sizeof = sizeof or (lambda key, value: 1)
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Получает значение по ключу.
+
+        Args:
+            key: Ключ
+
+        Returns:
+            Optional[Any]: Значение или None, если ключа нет в кэше
+        """
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Сохраняет значение в кэше, вытесняя старые записи при необходимости.
+
+        Args:
+            key: Ключ
+            value: Значение
+        """
+        size = self._sizeof(key, value)
+        if size > self._max_size:
+            return
+
+        with self._lock:
+            if key in self._data:
+                self._size -= self._sizes[key]
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._sizes[key] = size
+            self._size += size
+
+            while self._size > self._max_size:
+                old_key, _ = self._data.popitem(last=False)
+                self._size -= self._sizes.pop(old_key)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Очищает кэш и счетчики."""
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает статистику кэша.
+
+        Returns:
+            Dict[str, int]: hits, misses, evictions, entries, size, max_size
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._data),
+                "size": self._size,
+                "max_size": self._max_size,
+            }
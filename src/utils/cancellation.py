@@ -0,0 +1,49 @@
+"""
+Отмена задач, выполняемых в процессах-воркерах.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from ..core.exceptions import JobCancelledError
+
+
+class CancelToken:
+    """
+    Признак отмены задачи, доступный процессам-воркерам.
+
+    Токен связан с временным файлом: пока файл существует, результат задачи
+    нужен. Владелец удаляет файл при отмене или выходе из контекста, а воркер
+    между порциями работы вызывает raise_if_cancelled() и прекращает работу.
+    Объект передается в воркер через pickle.
+    """
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(suffix=".job", prefix="qr_bot_")
+        os.close(fd)
+
+    def cancel(self) -> None:
+        """Отменяет задачу."""
+        Path(self.path).unlink(missing_ok=True)
+
+    @property
+    def cancelled(self) -> bool:
+        """Проверяет, была ли задача отменена."""
+        return not os.path.exists(self.path)
+
+    def raise_if_cancelled(self) -> None:
+        """
+        Прерывает работу, если задача отменена.
+
+        Raises:
+            JobCancelledError: если задача отменена
+        """
+        if self.cancelled:
+            raise JobCancelledError("Задача отменена")
+
+    def __enter__(self) -> "CancelToken":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.cancel()
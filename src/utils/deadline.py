@@ -0,0 +1,48 @@
+"""
+Ограничение времени выполнения операций.
+"""
+
+import time
+from typing import Optional
+
+
+class Deadline:
+    """
+    Крайний срок выполнения операции по монотонным часам.
+
+    Бюджет None или 0 означает отсутствие ограничения. Срок можно досрочно
+    завершить через cancel(), чтобы остановить параллельные операции.
+    """
+
+    def __init__(self, budget: Optional[float] = None):
+        self.budget = budget or None
+        self._expires_at = time.monotonic() + budget if budget else None
+        self._cancelled = False
+
+    def cancel(self) -> None:
+        """Досрочно завершает срок: expired() начинает возвращать True."""
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        """Проверяет, был ли срок завершен досрочно."""
+        return self._cancelled
+
+    def remaining(self) -> Optional[float]:
+        """
+        Возвращает оставшееся время.
+
+        Returns:
+            Optional[float]: Секунды до истечения (не меньше 0) или None без ограничения
+        """
+        if self._cancelled:
+            return 0.0
+        if self._expires_at is None:
+            return None
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """Проверяет, истек ли срок."""
+        if self._cancelled:
+            return True
+        return self._expires_at is not None and time.monotonic() >= self._expires_at
@@ -3,10 +3,23 @@
 """
 
 import io
-from typing import Optional
+from typing import List, Optional, Protocol, Sequence, TypeVar
 from pathlib import Path
 
 
+class PhotoSizeLike(Protocol):
+    """Размер фото: объект с шириной и высотой (например, telegram.PhotoSize)."""
+
+    width: int
+    height: int
+
+
+PhotoT = TypeVar("PhotoT", bound=PhotoSizeLike)
+
+# Расширения изображений, из которых распознаются QR-коды
+IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif", ".tif", ".tiff"]
+
+
 def format_file_size(size_bytes: int) -> str:
     """
     Форматирует размер файла в читаемый вид.
@@ -51,6 +64,32 @@ def is_excel_file(filename: str) -> bool:
     return extension in [".xlsx", ".xls"]
 
 
+def is_image_file(filename: str) -> bool:
+    """
+    Проверяет, является ли файл изображением.
+
+    Args:
+        filename: Имя файла
+
+    Returns:
+        bool: True если файл изображение
+    """
+    return get_file_extension(filename) in IMAGE_EXTENSIONS
+
+
+def is_pdf_file(filename: str) -> bool:
+    """
+    Проверяет, является ли файл PDF-документом.
+
+    Args:
+        filename: Имя файла
+
+    Returns:
+        bool: True если файл PDF
+    """
+    return get_file_extension(filename) == ".pdf"
+
+
 def create_bytes_io(data: bytes) -> io.BytesIO:
     """
     Создает BytesIO объект из байтов.
@@ -64,3 +103,28 @@ def create_bytes_io(data: bytes) -> io.BytesIO:
     buffer = io.BytesIO(data)
     buffer.seek(0)
     return buffer
+
+
+def select_photo_sizes(photos: Sequence[PhotoT], min_size: int) -> List[PhotoT]:
+    """
+    Выбирает размеры фото для поэтапного распознавания.
+
+    Первым идет наименьший размер, длинная сторона которого не меньше
+    min_size, затем все большие размеры по возрастанию.
+
+    Args:
+        photos: Размеры фото (объекты с атрибутами width и height)
+        min_size: Минимальная длинная сторона первой попытки (0 - только наибольший размер)
+
+    Returns:
+        List: Размеры фото в порядке попыток
+    """
+    ordered = sorted(photos, key=lambda photo: photo.width * photo.height)
+    if not ordered:
+        return []
+    if min_size <= 0:
+        return ordered[-1:]
+    for index, photo in enumerate(ordered):
+        if max(photo.width, photo.height) >= min_size:
+            return ordered[index:]
+    return ordered[-1:]
@@ -0,0 +1,111 @@
+"""
+Отслеживание хода выполнения долгих задач.
+"""
+
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+
+class ProgressInfo(NamedTuple):
+    """Ход выполнения задачи."""
+
+    items_done: int
+    items_total: Optional[int]
+    pages_done: int
+    elapsed: float
+
+    @property
+    def percent(self) -> Optional[int]:
+        """Процент выполнения (None, если общее количество неизвестно)."""
+        if not self.items_total:
+            return None
+        return min(100, self.items_done * 100 // self.items_total)
+
+    @property
+    def remaining(self) -> Optional[float]:
+        """Оценка оставшегося времени в секундах по средней скорости."""
+        if not self.items_total or not self.items_done:
+            return None
+        return self.elapsed / self.items_done * max(self.items_total - self.items_done, 0)
+
+
+# Получает ProgressInfo после каждой порции работы
+ProgressCallback = Callable[[ProgressInfo], None]
+
+
+class ProgressTracker:
+    """Считает выполненные элементы и страницы и сообщает о ходе работы."""
+
+    def __init__(self, callback: Optional[ProgressCallback], items_total: Optional[int] = None):
+        self._callback = callback
+        self._started = time.monotonic()
+        self.items_total = items_total
+        self.items_done = 0
+        self.pages_done = 0
+
+    def info(self) -> ProgressInfo:
+        """Возвращает текущий ход выполнения."""
+        return ProgressInfo(
+            self.items_done, self.items_total, self.pages_done, time.monotonic() - self._started
+        )
+
+    def advance(self, items: int = 0, pages: int = 0) -> None:
+        """
+        Учитывает выполненную порцию и вызывает callback.
+
+        Args:
+            items: Количество обработанных элементов
+            pages: Количество созданных страниц
+        """
+        self.items_done += items
+        self.pages_done += pages
+        if self._callback is not None:
+            self._callback(self.info())
+
+
+class ProgressFile:
+    """
+    Канал хода выполнения из процесса-воркера.
+
+    Объект передается в воркер через pickle как ProgressCallback: каждый вызов
+    атомарно перезаписывает временный файл последним ProgressInfo, а бот
+    периодически читает его через read().
+    """
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(suffix=".progress", prefix="qr_bot_")
+        os.close(fd)
+
+    def __call__(self, info: ProgressInfo) -> None:
+        partial_path = f"{self.path}.tmp"
+        with open(partial_path, "w", encoding="utf-8") as f:
+            json.dump(list(info), f)
+        os.replace(partial_path, self.path)
+
+    def read(self) -> Optional[ProgressInfo]:
+        """
+        Читает последний записанный ход выполнения.
+
+        Returns:
+            Optional[ProgressInfo]: Ход выполнения или None, если данных еще нет
+        """
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return ProgressInfo(*json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def close(self) -> None:
+        """Удаляет файлы канала."""
+        Path(self.path).unlink(missing_ok=True)
+        Path(f"{self.path}.tmp").unlink(missing_ok=True)
+
+    def __enter__(self) -> "ProgressFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,30 @@
+"""
+Общие фикстуры тестов.
+"""
+import pytest
+
+
+@pytest.fixture
+def db_session():
+    """Сессия пустой БД SQLite в памяти."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from src.database.models import Base
+
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def scheduler_db(db_session, monkeypatch):
+    """Сессия БД в памяти, через которую планировщик задач сохраняет статусы."""
+    # Модуль планировщика читает настройки БД при импорте, поэтому импортируется здесь
+    from src.services import job_scheduler
+
+    monkeypatch.setattr(job_scheduler, "get_db", lambda: iter([db_session]))
+    return db_session
@@ -3,10 +3,56 @@
 """
 import pytest
 import io
-from src.services.qr_service import generate_qr_code, generate_qr_codes
-from src.services.excel_service import read_data_from_excel
+import time
+import numpy as np
+from PIL import Image
+from src.services import qr_service
+from src.services.qr_service import generate_qr_code, generate_qr_codes, shutdown_generation_pool
+from src.services.excel_service import (
+    estimate_excel_rows,
+    iter_data_from_excel,
+    read_data_from_excel,
+)
+from src.services.pdf_service import (
+    create_qr_pdf,
+    create_qr_pdf_stream,
+    export_excel_qr_pdf,
+    export_qr_pdf,
+    matrix_to_rects,
+)
+from src.services.file_service import rows_to_csv, temporary_file_path
+from src.services.qr_service import (
+    clear_qr_cache,
+    generate_qr_matrices,
+    get_qr_cache_stats,
+    get_qr_matrix,
+    iter_qr_codes,
+)
+from src.services.image_preprocessing import (
+    ImageVariants,
+    binarize_otsu,
+    binarize_sauvola,
+    image_features,
+    iter_decode_variants,
+    iter_jpeg_drafts,
+    otsu_threshold,
+)
+from src.services.decode_stats import DecodeStats
+from src.services.decode_cache import DecodeCache, content_hash
+from src.services.tiling import DetectedCode, make_tiles, merge_detections, reading_order
+from src.utils.cache import LRUCache
+from src.utils.cancellation import CancelToken
+from src.utils.progress import ProgressFile, ProgressInfo
+from src.utils.deadline import Deadline
+from src.utils.helpers import is_image_file, is_pdf_file, select_photo_sizes
 from src.services.text_service import process_text_message
-from src.core.exceptions import QRCodeGenerationError, TextProcessingError
+from src.services.job_executor import JobExecutor
+from src.core.exceptions import (
+    ExcelProcessingError,
+    JobCancelledError,
+    QRCodeGenerationError,
+    TextProcessingError,
+)
 
 
 def test_generate_qr_code():
@@ -27,6 +73,248 @@ def test_generate_qr_codes():
         assert img is not None
 
 
+def test_generate_qr_codes_parallel_keeps_order(monkeypatch):
+    """Тест параллельной генерации: порядок совпадает с последовательной."""
+    data_list = [f"item-{i}" for i in range(7)]
+    # Пул используется и на машине с одним ядром
+    monkeypatch.setattr(qr_service, "_get_generation_workers", lambda: 2)
+    try:
+        parallel = generate_qr_codes(data_list, chunk_size=2, parallel_threshold=1)
+    finally:
+        shutdown_generation_pool()
+    serial = generate_qr_codes(data_list, parallel_threshold=0)
+    assert [img.tobytes() for img in parallel] == [img.tobytes() for img in serial]
+
+
+def test_generation_without_bot_settings(monkeypatch):
+    """Тест: генерация QR-кодов работает без настроек бота (без токена)."""
+    from src.core import config
+
+    monkeypatch.delenv("TELEGRAM_BOT_TOKEN", raising=False)
+    monkeypatch.setattr(config, "_settings", None)
+    monkeypatch.setattr(config, "_default_settings", None)
+    monkeypatch.setattr(qr_service, "_matrix_cache", None)
+
+    # Остальные настройки по-прежнему читаются из окружения и проверяются
+    monkeypatch.setenv("QR_CHUNK_SIZE", "7")
+    settings = config.get_settings_or_defaults()
+    assert settings.qr_chunk_size == 7
+    assert len(generate_qr_codes(["no token 1", "no token 2"])) == 2
+
+    monkeypatch.setattr(config, "_default_settings", None)
+    monkeypatch.setenv("QR_CHUNK_SIZE", "0")
+    with pytest.raises(config.ValidationError):
+        config.get_settings_or_defaults()
+
+
+def test_generation_workers_limited_by_idle_cores(monkeypatch):
+    """Тест: пакетная генерация в воркере использует только свободные ядра."""
+    import functools
+    import multiprocessing
+    from src.services import job_executor
+
+    busy_workers = multiprocessing.Value("i", 0)
+    monkeypatch.setattr(job_executor, "_busy_workers", busy_workers)
+    # Четыре ядра задаются явно, а не через os.cpu_count
+    idle_cores = functools.partial(job_executor._get_idle_cores, cpu_count=4)
+    monkeypatch.setattr(qr_service, "_idle_cores_provider", idle_cores)
+
+    busy_workers.value = 1
+    assert qr_service._get_generation_workers(max_workers=4) == 4
+    busy_workers.value = 3
+    assert qr_service._get_generation_workers(max_workers=4) == 2
+    busy_workers.value = 4
+    assert qr_service._get_generation_workers(max_workers=4) == 1
+
+
+def test_matrix_to_rects_covers_dark_modules():
+    """Тест векторизации: прямоугольники покрывают ровно темные модули."""
+    matrix = get_qr_matrix("https://example.com")
+    covered = [[False] * len(row) for row in matrix]
+    for col, row, width, height in matrix_to_rects(matrix):
+        for r in range(row, row + height):
+            for c in range(col, col + width):
+                assert not covered[r][c]
+                covered[r][c] = True
+    assert covered == matrix
+
+
+def test_create_qr_pdf_render_modes():
+    """Тест создания PDF в векторном и растровом режимах."""
+    data = ["test1", "test2", "test3"]
+    vector_pdf = create_qr_pdf(data, render_mode="vector").getvalue()
+    raster_pdf = create_qr_pdf(data, render_mode="raster").getvalue()
+    assert vector_pdf.startswith(b"%PDF")
+    assert raster_pdf.startswith(b"%PDF")
+    assert b"/Subtype /Image" not in vector_pdf
+    assert b"/Subtype /Image" in raster_pdf
+
+
+def test_create_qr_pdf_embeds_duplicates_once():
+    """Тест: повторяющиеся данные встраиваются в PDF одним изображением."""
+    data = ["dup", "other", "dup", "dup"]
+    pdf = create_qr_pdf(data, render_mode="raster").getvalue()
+    assert pdf.count(b"/Subtype /Image") == 2
+
+
+def test_create_qr_pdf_auto_render_mode():
+    """Тест режима auto: raster при большом количестве повторов, иначе vector."""
+    repeated = ["dup"] * 30 + ["other"]
+    auto_pdf = create_qr_pdf(repeated, render_mode="auto").getvalue()
+    assert auto_pdf.count(b"/Subtype /Image") == 2
+    assert len(auto_pdf) < len(create_qr_pdf(repeated, render_mode="vector").getvalue())
+
+    assert b"/Subtype /Image" not in create_qr_pdf(["a", "b", "a"], render_mode="auto").getvalue()
+    # Для генератора повторы заранее неизвестны
+    generated = create_qr_pdf_stream((item for item in repeated), render_mode="auto").getvalue()
+    assert b"/Subtype /Image" not in generated
+
+
+def test_export_qr_pdf_spools_large_output():
+    """Тест передачи PDF в памяти или через временный файл по порогу."""
+    data = ["spool 1", "spool 2"]
+    size = len(create_qr_pdf(data).getvalue())
+
+    with temporary_file_path(suffix=".pdf") as pdf_path:
+        pdf = export_qr_pdf(data, str(pdf_path), spool_threshold=size)
+        assert pdf.startswith(b"%PDF") and len(pdf) == size
+        # PDF выводится сразу в файл, без промежуточного буфера
+        assert pdf_path.read_bytes() == pdf
+
+        assert export_qr_pdf(data, str(pdf_path), spool_threshold=size - 1) is None
+        spooled = pdf_path.read_bytes()
+        assert spooled.startswith(b"%PDF") and len(spooled) == size
+    assert not pdf_path.exists()
+
+
+def test_export_excel_qr_pdf_streams_rows(tmp_path):
+    """Тест создания PDF из Excel одним вызовом: данные читаются потоково."""
+    pdf_path = tmp_path / "excel.pdf"
+    excel_file = _make_xlsx([[f"row {i}"] for i in range(7)] + [[None]])
+    count, pdf = export_excel_qr_pdf(excel_file, str(pdf_path), rows_per_page=5)
+    assert count == 7
+    assert pdf.startswith(b"%PDF") and b"/Count 2" in pdf
+
+    assert export_excel_qr_pdf(_make_xlsx([[None], [" "]]), str(pdf_path)) == (0, None)
+
+    # Ошибка чтения Excel не заменяется ошибкой генерации PDF
+    def rows():
+        yield "row 0"
+        raise ExcelProcessingError("Слишком много строк в файле")
+
+    with pytest.raises(ExcelProcessingError):
+        export_qr_pdf(rows(), str(pdf_path), batch_size=1)
+
+
+def test_export_qr_pdf_cancelled_leaves_no_file(tmp_path):
+    """Тест: отмененная задача не оставляет временный файл PDF."""
+    pdf_path = tmp_path / "cancelled.pdf"
+    with CancelToken() as cancel_token:
+        # Задача отменена в очереди: файл не создается
+        cancel_token.cancel()
+        with pytest.raises(JobCancelledError):
+            export_qr_pdf(["a"], str(pdf_path), cancel_token=cancel_token)
+        assert not pdf_path.exists()
+
+    with CancelToken() as cancel_token:
+
+        def items():
+            for i in range(12):
+                if i == 4:
+                    cancel_token.cancel()
+                yield f"item-{i}"
+
+        # Задача отменена во время генерации: недописанный файл удаляется
+        with pytest.raises(JobCancelledError):
+            export_qr_pdf(items(), str(pdf_path), batch_size=3, cancel_token=cancel_token)
+        assert not pdf_path.exists()
+
+
+def test_iter_qr_codes_is_lazy():
+    """Тест потоковой генерации: коды создаются по мере чтения."""
+    consumed = []
+
+    def source():
+        for i in range(5):
+            consumed.append(i)
+            yield f"item-{i}"
+
+    codes = iter_qr_codes(source(), batch_size=2)
+    next(codes)
+    assert consumed == [0, 1]
+    assert len(list(codes)) == 4
+
+
+def test_create_qr_pdf_stream_from_generator():
+    """Тест потокового создания PDF из генератора."""
+    data = (f"item-{i}" for i in range(12))
+    pdf = create_qr_pdf_stream(data, rows_per_page=5, batch_size=3).getvalue()
+    assert pdf.startswith(b"%PDF")
+    assert b"/Count 3" in pdf
+
+
+def test_create_qr_pdf_stream_cancel_between_batches():
+    """Тест отмены генерации PDF между порциями."""
+    with CancelToken() as cancel_token:
+
+        def items():
+            for i in range(12):
+                if i == 4:
+                    cancel_token.cancel()
+                yield f"item-{i}"
+
+        with pytest.raises(JobCancelledError):
+            create_qr_pdf_stream(items(), rows_per_page=5, batch_size=3, cancel_token=cancel_token)
+    assert cancel_token.cancelled
+
+
+def test_create_qr_pdf_stream_reports_progress():
+    """Тест хода выполнения генерации PDF: QR-коды, страницы и оценка времени."""
+    reports = []
+    data = [f"item-{i % 9}" for i in range(25)]
+    create_qr_pdf_stream(data, rows_per_page=5, batch_size=10, progress=reports.append)
+
+    assert [info.items_done for info in reports] == sorted(info.items_done for info in reports)
+    assert (reports[-1].items_done, reports[-1].items_total, reports[-1].pages_done) == (25, 25, 5)
+    assert reports[-1].percent == 100 and reports[-1].remaining == 0
+
+    info = ProgressInfo(items_done=25, items_total=100, pages_done=5, elapsed=10.0)
+    assert (info.percent, info.remaining) == (25, 30.0)
+    assert ProgressInfo(0, None, 0, 1.0).remaining is None
+
+    with ProgressFile() as progress_file:
+        assert progress_file.read() is None
+        progress_file(info)
+        assert progress_file.read() == info
+
+
+def test_lru_cache_evicts_by_size():
+    """Тест вытеснения записей LRU-кэша по суммарному размеру."""
+    cache = LRUCache(10, sizeof=lambda key, value: len(value))
+    cache.put("a", "xxxx")
+    cache.put("b", "xxxx")
+    assert cache.get("a") == "xxxx"
+    cache.put("c", "xxxx")
+    assert cache.get("b") is None
+    assert cache.get("a") == "xxxx"
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+    assert stats["size"] == 8
+
+
+def test_generate_qr_matrices_uses_cache():
+    """Тест кэширования матриц: повторные данные не перестраиваются."""
+    clear_qr_cache()
+    matrices = generate_qr_matrices(["sku-1", "sku-2", "sku-1"], parallel_threshold=0)
+    assert matrices[0] is matrices[2]
+    generate_qr_matrices(["sku-2"], parallel_threshold=0)
+    stats = get_qr_cache_stats()
+    assert stats["entries"] == 2
+    assert stats["hits"] == 1
+
+
 def test_process_text_single_line():
     """Тест обработки одной строки текста."""
     text = "single line"
@@ -45,6 +333,288 @@ def test_process_text_multiple_lines():
     assert lines == ["line1", "line2", "line3"]
 
 
+def test_iter_decode_variants_is_lazy():
+    """Тест ленивого построения вариантов изображения."""
+    variants = ImageVariants(generate_qr_code("lazy").convert("RGB"))
+    stages = iter_decode_variants(variants)
+
+    name, image = next(stages)
+    assert name == "grayscale" and image.mode == "L"
+    assert variants.built == ["grayscale"]
+
+    assert next(stages)[0] == "high_contrast_grayscale"
+    assert set(variants.built) == {
+        "grayscale",
+        "grayscale_contrast_enhancer",
+        "high_contrast_grayscale",
+    }
+
+
+def test_iter_decode_variants_order():
+    """Тест предпочтительного порядка и пропуска увеличения больших изображений."""
+    variants = ImageVariants(Image.new("L", (600, 600), 255))
+    names = [name for name, _ in iter_decode_variants(variants, order=["RGB", "unknown"])]
+
+    assert names[:2] == ["RGB", "grayscale"]
+    assert names.count("RGB") == 1
+    assert not any(name.startswith("resized_") for name in names)
+
+
+def test_image_variants_built_once_across_threads():
+    """Тест: вариант, запрошенный из нескольких потоков, строится один раз."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    variants = ImageVariants(Image.new("L", (600, 600), 128))
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: variants.get("sauvola_threshold"), range(8)))
+
+    assert all(result is results[0] for result in results)
+    assert set(variants.built) == {"grayscale", "grayscale_array", "sauvola_threshold"}
+
+
+def test_iter_decode_variants_stops_at_deadline():
+    """Тест остановки перебора вариантов после истечения времени."""
+    assert Deadline(0).remaining() is None and not Deadline(None).expired()
+
+    variants = ImageVariants(Image.new("L", (100, 100), 255))
+    deadline = Deadline(0.05)
+    assert next(iter_decode_variants(variants, deadline=deadline))[0] == "grayscale"
+
+    time.sleep(0.06)
+    assert deadline.expired() and deadline.remaining() == 0
+    assert list(iter_decode_variants(ImageVariants(variants.image), deadline=deadline)) == []
+
+
+def test_deadline_cancel():
+    """Тест досрочного завершения срока (отмена проигравших движков)."""
+    deadline = Deadline(None)
+    assert not deadline.cancelled and deadline.remaining() is None
+
+    deadline.cancel()
+    assert deadline.cancelled and deadline.expired() and deadline.remaining() == 0
+    variants = ImageVariants(Image.new("L", (10, 10)))
+    assert list(iter_decode_variants(variants, deadline=deadline)) == []
+
+
+def test_iter_jpeg_drafts_escalates_resolution():
+    """Тест уменьшенных копий JPEG от меньшей к большей."""
+    buffer = io.BytesIO()
+    Image.new("RGB", (2560, 1920), "white").save(buffer, "JPEG")
+    image_bytes = buffer.getvalue()
+    image = Image.open(io.BytesIO(image_bytes))
+
+    drafts = [
+        (scale, draft.size, draft.mode)
+        for scale, draft in iter_jpeg_drafts(image_bytes, image, 640)
+    ]
+    assert drafts == [(4, (640, 480), "L"), (2, (1280, 960), "L")]
+    assert list(iter_jpeg_drafts(image_bytes, image, 0)) == []
+
+    png = io.BytesIO()
+    Image.new("RGB", (2560, 1920), "white").save(png, "PNG")
+    assert list(iter_jpeg_drafts(png.getvalue(), Image.open(png), 640)) == []
+
+
+def test_make_tiles_cover_image_with_overlap():
+    """Тест разбиения изображения на перекрывающиеся плитки."""
+    tiles = make_tiles(2500, 1000, tile_size=1024, overlap=384)
+
+    assert [tile.left for tile in tiles] == [0, 640, 1280, 1476]
+    assert all(tile.top == 0 and tile.bottom == 1000 for tile in tiles)
+    assert tiles[-1].right == 2500
+    assert make_tiles(500, 400, tile_size=1024, overlap=384) == [(0, 0, 500, 400)]
+
+
+def test_merge_and_order_detections():
+    """Тест удаления повторов из зон перекрытия и порядка чтения."""
+    codes = [
+        DetectedCode("b", 600, 110, 100, 100),
+        DetectedCode("c", 100, 700, 100, 100),
+        DetectedCode("a", 100, 100, 100, 100),
+        DetectedCode("a", 102, 98, 100, 100),  # тот же код из соседней плитки
+        DetectedCode("a", 1100, 90, 100, 100),  # такой же код в другом месте
+    ]
+
+    merged = merge_detections(codes)
+    assert len(merged) == 4
+    assert [code.data for code in reading_order(merged)] == ["a", "b", "a", "c"]
+
+
+def test_decode_qr_image_tiled_sheet():
+    """Тест распознавания листа с этикетками по плиткам в порядке чтения."""
+    try:
+        from src.services import qr_decode_service
+    except ImportError as e:
+        pytest.skip(f"pyzbar недоступен: {e}")
+
+    # Лист больше порога распознавания по плиткам; коды пересекают границы плиток
+    sheet = Image.new("L", (3000, 3000), 255)
+    expected = []
+    for row, top in enumerate((300, 1900)):
+        for column, left in enumerate((200, 1300, 2400)):
+            data = f"label {row}-{column}"
+            # Коды одной строки немного смещены по вертикали
+            sheet.paste(generate_qr_code(data).convert("L"), (left, top + 15 * column))
+            expected.append(data)
+
+    result = qr_decode_service.decode_qr_image(sheet, time_budget=0)
+    assert result.method == "tiled"
+    assert result.data == expected
+
+
+def test_decode_pdf_document_pages_in_order(tmp_path):
+    """Тест распознавания PDF одной задачей: страницы по очереди, отмена между страницами."""
+    try:
+        from src.services import pdf_decode_service
+    except ImportError as e:
+        pytest.skip(f"pyzbar недоступен: {e}")
+    if not pdf_decode_service.PDFIUM_AVAILABLE:
+        pytest.skip("pypdfium2 не установлен")
+
+    pdf_path = tmp_path / "codes.pdf"
+    pdf_path.write_bytes(create_qr_pdf(["first", "second"], rows_per_page=1).getvalue())
+
+    page_count, outcomes = pdf_decode_service.decode_pdf_document(str(pdf_path), max_pages=1)
+    assert page_count == 2
+    assert [outcome.result.data for outcome in outcomes] == [["first"]]
+
+    with CancelToken() as cancel_token:
+        cancel_token.cancel()
+        with pytest.raises(JobCancelledError):
+            pdf_decode_service.decode_pdf_document(str(pdf_path), cancel_token=cancel_token)
+
+
+def test_otsu_threshold_separates_classes():
+    """Тест порога Otsu на двух классах яркости."""
+    gray = np.array([[40] * 10 + [200] * 6] * 4, dtype=np.uint8)
+    threshold = otsu_threshold(gray)
+
+    assert 40 <= threshold < 200
+    assert binarize_otsu(gray).tolist() == [[0] * 10 + [255] * 6] * 4
+
+
+def test_binarize_sauvola_uneven_lighting():
+    """Тест локального порога Sauvola на QR-коде с неравномерным освещением."""
+    image = np.asarray(generate_qr_code("uneven light").convert("L"), dtype=np.float64)
+    light = np.linspace(0.25, 1.0, image.shape[1])[None, :]
+    lit = (image * light + 40 * (1 - light)).astype(np.uint8)
+
+    binary = binarize_sauvola(lit)
+    assert binary.dtype == np.uint8
+    assert np.array_equal(binary > 127, image > 127)
+    assert not np.array_equal(binarize_otsu(lit) > 127, image > 127)
+
+
+def test_image_features():
+    """Тест ключа характеристик изображения."""
+    assert image_features(ImageVariants(Image.new("L", (100, 100), 20))) == "small:L:dark"
+    assert image_features(ImageVariants(Image.new("RGB", (800, 600), "white"))) == (
+        "medium:RGB:bright"
+    )
+    assert image_features(ImageVariants(Image.new("RGB", (2000, 1500), "gray"))) == (
+        "large:RGB:normal"
+    )
+
+
+def test_decode_stats_rankings_persist(db_session):
+    """Тест ранжирования методов декодирования и сохранения статистики в БД."""
+    db = db_session
+    stats = DecodeStats()
+    stats.record(db, "small:L:dark", "sauvola_threshold", passes=6)
+    stats.record(db, "small:L:dark", "sauvola_threshold", passes=1)
+    stats.record(db, "small:L:dark", "sauvola_threshold", 1, "pyzbar", {"pyzbar": 0.2})
+    stats.record(db, "small:L:dark", "grayscale", 1, "opencv", {"pyzbar": 0.4, "opencv": 0.3})
+
+    assert stats.get_rankings(db) == {"small:L:dark": ["sauvola_threshold", "grayscale"]}
+    assert stats.get_average_passes() == pytest.approx(9 / 4)
+    assert stats.get_engine_stats() == {
+        "pyzbar": (1, pytest.approx(0.3)),
+        "opencv": (1, pytest.approx(0.3)),
+    }
+    assert DecodeStats().get_rankings(db) == stats.get_rankings(db)
+
+
+def test_decode_cache_file_id_and_content_hash():
+    """Тест кэша результатов декодирования по file_unique_id и хэшу содержимого."""
+    cache = DecodeCache(max_entries=2)
+    digest = content_hash(b"photo")
+
+    assert cache.get_by_file_id("id-1") is None
+    cache.put("id-1", digest, ["payload"])
+    assert cache.get_by_file_id("id-1") == ["payload"]
+
+    # То же содержимое с новым ID находится по хэшу и запоминается
+    assert cache.get_by_file_id("id-2") is None
+    assert cache.get_by_content("id-2", digest) == ["payload"]
+    assert cache.get_by_file_id("id-2") == ["payload"]
+    assert cache.get_by_content("id-3", content_hash(b"other")) is None
+
+    cache.put("id-4", content_hash(b"a"), ["a"])
+    cache.put("id-5", content_hash(b"b"), ["b"])
+    assert cache.get_by_file_id("id-1") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def _make_xlsx(rows):
+    """Создает .xlsx файл в памяти."""
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def test_read_data_from_excel_column():
+    """Тест потокового чтения одной колонки Excel файла."""
+    excel_file = _make_xlsx([["a", 1], [None, 2], ["  ", 3], [123, 4.0], [" b ", None]])
+
+    assert read_data_from_excel(excel_file) == ["a", "123", "b"]
+    excel_file.seek(0)
+    assert read_data_from_excel(excel_file, column_index=1) == ["1", "2", "3", "4"]
+
+
+def test_iter_data_from_excel_limits():
+    """Тест лимита строк и проверки формата Excel файла."""
+    excel_file = _make_xlsx([[f"row {i}"] for i in range(5)])
+    assert list(iter_data_from_excel(excel_file, max_rows=5))[-1] == "row 4"
+
+    excel_file.seek(0)
+    with pytest.raises(ExcelProcessingError):
+        list(iter_data_from_excel(excel_file, max_rows=4))
+
+    with pytest.raises(ExcelProcessingError):
+        read_data_from_excel(io.BytesIO(b"not an excel file"))
+
+
+def test_estimate_excel_rows():
+    """Тест оценки количества строк Excel файла."""
+    assert estimate_excel_rows(_make_xlsx([[f"row {i}"] for i in range(7)])) == 7
+
+    # Размер листа в метаданных завышен до максимума Excel
+    import zipfile
+
+    source = zipfile.ZipFile(_make_xlsx([[f"row {i}"] for i in range(7)]))
+    inflated = io.BytesIO()
+    with zipfile.ZipFile(inflated, "w") as target:
+        for name in source.namelist():
+            content = source.read(name)
+            if name == "xl/worksheets/sheet1.xml":
+                content = content.replace(b'ref="A1:A7"', b'ref="A1:A1048576"')
+            target.writestr(name, content)
+    inflated.seek(0)
+    assert estimate_excel_rows(inflated, max_rows=100) == 7
+    inflated.seek(0)
+    assert estimate_excel_rows(inflated, max_rows=5) == 6
+
+    with pytest.raises(ExcelProcessingError):
+        estimate_excel_rows(io.BytesIO(b"not an excel file"))
+
+
 def test_process_text_empty():
     """Тест обработки пустого текста."""
     with pytest.raises(TextProcessingError):
@@ -56,3 +626,373 @@ def test_process_text_only_spaces():
     with pytest.raises(TextProcessingError):
         process_text_message("   \n  \n  ")
 
+
+async def test_job_executor_run_and_cancel():
+    """Тест выполнения и отмены задач в пуле воркеров."""
+    executor = JobExecutor(max_workers=1, pool_type="thread")
+    try:
+        assert await executor.run(sum, [1, 2, 3]) == 6
+
+        running = executor.submit(time.sleep, 0.2)
+        queued = executor.submit(time.sleep, 0.2)
+        assert executor.cancel(queued.job_id) is True
+        with pytest.raises(JobCancelledError):
+            await queued.result()
+        await running.result()
+
+        metrics = executor.get_metrics()
+        assert metrics["queue_depth"] == 0
+        assert metrics["completed"] == 2
+        assert metrics["cancelled"] == 1
+    finally:
+        executor.shutdown()
+
+
+async def test_job_scheduler_round_robin_and_persistence(scheduler_db):
+    """Тест очереди задач: лимиты, очередность по кругу и статусы в БД."""
+    import asyncio
+    from src.core.exceptions import JobQueueFullError
+    from src.database.models import JobStatus, ProcessingType
+    from src.database.repositories import JobRepository
+    from src.services import job_scheduler
+
+    db = scheduler_db
+
+    def create_job(user_id):
+        return JobRepository.create(db, user_id, user_id, ProcessingType.TEXT, "text").id
+
+    gate = asyncio.Event()
+    started = []
+
+    async def runner(job_id):
+        started.append(job_id)
+        if len(started) == 1:
+            await gate.wait()
+        if job_id == failing:
+            raise RuntimeError("сбой")
+
+    scheduler = job_scheduler.JobScheduler(
+        max_concurrent=1, per_user_concurrent=1, max_queued_per_user=3
+    )
+    try:
+        assert await scheduler.start(runner) == 0
+
+        a1, a2, a3, b1 = create_job(1), create_job(1), create_job(1), create_job(2)
+        failing = a3
+        assert await scheduler.submit(a1, 1) == 0
+        await asyncio.sleep(0)
+        assert await scheduler.submit(a2, 1) == 1
+        assert await scheduler.submit(a3, 1) == 2
+        # Задача второго пользователя обгоняет третью задачу первого
+        assert await scheduler.submit(b1, 2) == 2
+        with pytest.raises(JobQueueFullError):
+            scheduler.check_capacity(1)
+
+        gate.set()
+        for _ in range(100):
+            if not any(scheduler.get_metrics()[key] for key in ("queued", "running")):
+                break
+            await asyncio.sleep(0.01)
+
+        assert started == [a1, a2, b1, a3]
+        statuses = {job_id: JobRepository.get_by_id(db, job_id).status for job_id in started}
+        assert statuses == {
+            a1: JobStatus.DONE,
+            a2: JobStatus.DONE,
+            b1: JobStatus.DONE,
+            a3: JobStatus.FAILED,
+        }
+        assert JobRepository.get_unfinished(db) == []
+    finally:
+        await scheduler.shutdown()
+
+
+async def test_job_scheduler_limits_restart_attempts(scheduler_db):
+    """Тест: задача, прерванная перезапусками max_attempts раз, завершается с ошибкой."""
+    import asyncio
+    from src.database.models import JobStatus, ProcessingType
+    from src.database.repositories import JobRepository
+    from src.services import job_scheduler
+
+    db = scheduler_db
+
+    exhausted = JobRepository.create(db, 1, 1, ProcessingType.TEXT, "text").id
+    interrupted = JobRepository.create(db, 2, 2, ProcessingType.TEXT, "text").id
+    for _ in range(2):
+        JobRepository.set_status(db, exhausted, JobStatus.RUNNING)
+    JobRepository.set_status(db, interrupted, JobStatus.RUNNING)
+
+    started = []
+
+    async def runner(job_id):
+        started.append(job_id)
+
+    scheduler = job_scheduler.JobScheduler(max_concurrent=2, max_attempts=2)
+    try:
+        assert await scheduler.start(runner) == 1
+        for _ in range(100):
+            if not scheduler.get_metrics()["running"]:
+                break
+            await asyncio.sleep(0.01)
+
+        assert started == [interrupted]
+        failed = JobRepository.get_by_id(db, exhausted)
+        assert failed.status == JobStatus.FAILED and failed.attempts == 2
+        restarted = JobRepository.get_by_id(db, interrupted)
+        assert restarted.status == JobStatus.DONE and restarted.attempts == 2
+    finally:
+        await scheduler.shutdown()
+
+
+async def test_job_status_message_id_is_saved(db_session):
+    """Тест: ID нового сообщения о ходе обработки сохраняется в БД."""
+    from types import SimpleNamespace
+    from sqlalchemy.orm import Session
+    from src.bot.handlers import jobs
+    from src.database.models import ProcessingType
+    from src.database.repositories import JobRepository
+
+    db = db_session
+
+    class Bot:
+        async def edit_message_text(self, *args, **kwargs):
+            raise RuntimeError("сообщение удалено")
+
+        async def send_message(self, *args, **kwargs):
+            return SimpleNamespace(message_id=42)
+
+    job = JobRepository.create(db, 1, 1, ProcessingType.TEXT, "text", status_message_id=7)
+    job_id = job.id
+    await jobs._set_status_text(Bot(), db, job, "⏳ Задача в очереди, позиция: 1")
+
+    other = Session(bind=db.get_bind())
+    assert JobRepository.get_by_id(other, job_id).status_message_id == 42
+    other.close()
+
+
+async def test_job_scheduler_interactive_lane(scheduler_db):
+    """Тест полос очереди: легкие задачи не ждут больших."""
+    import asyncio
+    from src.services import job_scheduler
+
+    gate = asyncio.Event()
+    started = []
+
+    async def runner(job_id):
+        started.append(job_id)
+        await gate.wait()
+
+    scheduler = job_scheduler.JobScheduler(
+        max_concurrent=2,
+        per_user_concurrent=1,
+        max_queued_per_user=5,
+        interactive_max_cost=10,
+        interactive_reserved=1,
+    )
+    try:
+        await scheduler.start(runner)
+
+        # Большие задачи занимают только один слот из двух
+        assert await scheduler.submit(1, 1, cost=5000) == 0
+        assert await scheduler.submit(2, 2, cost=5000) == 1
+        # Легкая задача запускается сразу в зарезервированном слоте
+        assert await scheduler.submit(3, 3, cost=1) == 0
+        # Лимит на пользователя общий для полос: легкая задача пользователя
+        # с большой задачей ждет, но обгоняет большие в очереди
+        assert await scheduler.submit(4, 1, cost=3) == 1
+        assert scheduler.position(2) == 2
+        await asyncio.sleep(0)
+        assert started == [1, 3]
+
+        lanes = scheduler.get_metrics()["lanes"]
+        assert lanes[job_scheduler.LANE_BULK] == {"max_concurrent": 1, "queued": 1, "running": 1}
+        assert lanes[job_scheduler.LANE_INTERACTIVE]["queued"] == 1
+
+        gate.set()
+        for _ in range(100):
+            if not any(scheduler.get_metrics()[key] for key in ("queued", "running")):
+                break
+            await asyncio.sleep(0.01)
+        assert started == [1, 3, 4, 2]
+    finally:
+        await scheduler.shutdown()
+
+
+async def test_job_scheduler_cancel(scheduler_db):
+    """Тест отмены задачи в очереди и выполняемой задачи."""
+    import asyncio
+    from src.database.models import JobStatus, ProcessingType
+    from src.database.repositories import JobRepository
+    from src.services import job_scheduler
+
+    db = scheduler_db
+
+    started = []
+
+    async def runner(job_id):
+        started.append(job_id)
+        await asyncio.Event().wait()
+
+    scheduler = job_scheduler.JobScheduler(max_concurrent=1, interactive_reserved=0)
+    try:
+        await scheduler.start(runner)
+        jobs = [JobRepository.create(db, 1, 1, ProcessingType.TEXT, "text").id for _ in range(3)]
+        for job_id in jobs:
+            await scheduler.submit(job_id, user_id=job_id)
+        await asyncio.sleep(0)
+        assert started == [jobs[0]]
+        assert scheduler.position(jobs[2]) == 2
+
+        # Задача снимается с очереди, следующая сдвигается
+        assert await scheduler.cancel(jobs[1])
+        assert scheduler.position(jobs[2]) == 1
+
+        # Выполняемая задача прерывается, и слот переходит следующей
+        assert await scheduler.cancel(jobs[0])
+        await asyncio.sleep(0)
+        assert started == [jobs[0], jobs[2]]
+        assert not await scheduler.cancel(jobs[0])
+
+        statuses = [JobRepository.get_by_id(db, job_id).status for job_id in jobs]
+        assert statuses == [JobStatus.CANCELLED, JobStatus.CANCELLED, JobStatus.RUNNING]
+    finally:
+        await scheduler.shutdown()
+
+
+async def test_job_scheduler_shutdown_waits_for_running_jobs(scheduler_db):
+    """Тест: остановка планировщика дожидается отмененных задач."""
+    import asyncio
+    from src.database.models import JobStatus, ProcessingType
+    from src.database.repositories import JobRepository
+    from src.services import job_scheduler
+
+    cleaned_up = []
+
+    async def runner(job_id):
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await asyncio.sleep(0)
+            cleaned_up.append(job_id)
+
+    scheduler = job_scheduler.JobScheduler(max_concurrent=1)
+    await scheduler.start(runner)
+    job_id = JobRepository.create(scheduler_db, 1, 1, ProcessingType.TEXT, "text").id
+    await scheduler.submit(job_id, 1)
+    await asyncio.sleep(0)
+
+    await scheduler.shutdown()
+    assert cleaned_up == [job_id]
+    assert scheduler.get_metrics()["running"] == 0
+    # Прерванная задача остается в работе и будет запущена после перезапуска
+    assert JobRepository.get_by_id(scheduler_db, job_id).status == JobStatus.RUNNING
+
+
+async def test_throttled_message_editor_coalesces_updates():
+    """Тест редактора сообщений: не чаще интервала, отправляется последний текст."""
+    import asyncio
+    from src.bot.handlers.progress import ThrottledMessageEditor
+
+    edits = []
+
+    async def edit(text):
+        edits.append(text)
+
+    editor = ThrottledMessageEditor(edit, min_interval=0.2)
+    await editor.update("1")
+    await editor.update("2")
+    await editor.update("3")
+    assert edits == ["1"]
+
+    # Отложенный текст отправляется после интервала; новый интервал еще не истек
+    await asyncio.sleep(0.3)
+    assert edits == ["1", "3"]
+
+    await editor.update("4")
+    editor.close()
+    await asyncio.sleep(0.3)
+    assert edits == ["1", "3"]
+
+
+async def test_per_user_update_processor_keeps_user_order():
+    """Тест обработки обновлений: пользователи параллельно, обновления пользователя по порядку."""
+    import asyncio
+    from types import SimpleNamespace
+    from src.bot.update_processor import PerUserUpdateProcessor
+
+    processor = PerUserUpdateProcessor(max_concurrent_updates=4)
+    events = []
+
+    def make_update(user_id):
+        return SimpleNamespace(effective_user=SimpleNamespace(id=user_id), effective_chat=None)
+
+    async def handle(name, delay):
+        events.append(f"start {name}")
+        await asyncio.sleep(delay)
+        events.append(f"end {name}")
+
+    async with processor:
+        await asyncio.gather(
+            processor.process_update(make_update(1), handle("a1", 0.05)),
+            processor.process_update(make_update(1), handle("a2", 0)),
+            processor.process_update(make_update(2), handle("b1", 0)),
+            processor.process_update(make_update(1), handle("a3", 0)),
+        )
+
+    user_events = [event for event in events if " a" in event]
+    assert user_events == ["start a1", "end a1", "start a2", "end a2", "start a3", "end a3"]
+    # Обновление второго пользователя не ждет первого
+    assert events.index("end b1") < events.index("end a1")
+    assert processor.pending_updates == 0
+
+
+def test_select_photo_sizes_starts_from_preview():
+    """Тест выбора размеров фото: сначала копия от минимального размера, затем большие."""
+    from types import SimpleNamespace
+
+    photos = [SimpleNamespace(width=w, height=w * 3 // 4) for w in (90, 320, 800, 1280)]
+
+    assert [photo.width for photo in select_photo_sizes(photos, 640)] == [800, 1280]
+    assert select_photo_sizes(photos, 0) == photos[-1:]
+    assert select_photo_sizes(photos, 2000) == photos[-1:]
+    assert select_photo_sizes([], 640) == []
+
+
+def test_decodable_document_types():
+    """Тест определения изображений и PDF, отправленных файлом."""
+    assert is_image_file("scan.PNG") and is_image_file("photo.jpeg")
+    assert is_pdf_file("qr_codes.pdf") and not is_image_file("qr_codes.pdf")
+    assert not is_image_file("data.xlsx") and not is_pdf_file("data.xlsx")
+
+
+def test_rows_to_csv():
+    """Тест формирования CSV-файла с результатами альбома."""
+    data = rows_to_csv(("photo", "code", "data"), [(1, 1, "Привет, мир"), (2, 1, "b")])
+
+    assert data.startswith("\ufeff".encode("utf-8"))
+    assert data.decode("utf-8-sig").splitlines() == [
+        "photo,code,data",
+        '1,1,"Привет, мир"',
+        "2,1,b",
+    ]
+
+
+def test_processing_history_create_many(db_session):
+    """Тест сохранения истории альбома одной транзакцией."""
+    from src.database.models import ProcessingStatus, ProcessingType
+    from src.database.repositories import ProcessingHistoryRepository
+
+    entries = [
+        ("album (1/2)", 3, ProcessingStatus.SUCCESS, None),
+        ("album (2/2)", 0, ProcessingStatus.ERROR, "QR-код не найден"),
+    ]
+    created = ProcessingHistoryRepository.create_many(
+        db_session, 42, ProcessingType.QR_DECODE, entries
+    )
+
+    history = ProcessingHistoryRepository.get_by_user_id(db_session, 42)
+    assert created == 2
+    assert sorted((h.source_name, h.qr_codes_count, h.status) for h in history) == [
+        ("album (1/2)", 3, ProcessingStatus.SUCCESS),
+        ("album (2/2)", 0, ProcessingStatus.ERROR),
+    ]